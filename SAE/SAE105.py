@@ -1,21 +1,52 @@
 # Importation des modules nécessaires
 import re  # Pour les expressions régulières
-from collections import Counter, defaultdict  # Pour compter les occurrences et gérer des dictionnaires
+from collections import Counter, namedtuple, OrderedDict  # Pour compter les occurrences, décrire les paquets et le cache des graphiques
 import csv  # Pour lire et écrire des fichiers CSV
-import matplotlib.pyplot as plt  # Pour générer des graphiques
+import argparse  # Pour lire les options de la ligne de commande
+import shutil  # Pour concaténer les morceaux de CSV
+from concurrent.futures import ProcessPoolExecutor  # Pour répartir l'analyse sur plusieurs cœurs
+import matplotlib  # Pour générer des graphiques
+matplotlib.use("Agg")  # Rendu sans affichage, depuis les threads de l'application web
+from matplotlib.figure import Figure  # Une figure par rendu (pyplot n'est pas utilisable depuis plusieurs threads)
+import io  # Pour obtenir le PNG en mémoire
 import markdown  # Pour convertir du Markdown en HTML
-from flask import Flask, render_template_string, request  # Pour créer une application web
+from flask import Flask, render_template_string, request, make_response, Response, abort  # Pour créer une application web
 import os  # Pour interagir avec le système de fichiers
-
-# Création du dossier 'static' s'il n'existe pas
-# Ce dossier est utilisé pour stocker les images des graphiques générés
-if not os.path.exists("static"):
-    os.makedirs("static")
+import hashlib  # Pour calculer les ETag des pages
+from functools import lru_cache  # Pour garder en mémoire les pages déjà générées
+import pickle  # Pour sauvegarder l'état du mode suivi
+import threading  # Pour suivre le fichier pendant que l'application web tourne
+import time  # Pour attendre entre deux lectures du fichier suivi
+import asyncio  # Pour lire la sortie de tcpdump en direct
+import json  # Pour envoyer les mises à jour en direct au navigateur
+import sys  # Pour lire la capture sur l'entrée standard
+from stat import S_ISCHR, S_ISFIFO, S_ISSOCK  # Pour savoir si l'entrée standard est un tube ou un fichier
+from array import array  # Pour les histogrammes temporels (tableaux d'entiers préalloués)
+import sqlite3  # Pour l'index des paquets sur disque
+import html  # Pour échapper les valeurs saisies dans le formulaire
+import ipaddress  # Pour lire les plages CIDR des règles de détection
+import numpy as np  # Pour relire l'export en colonnes sans copie et calculer sur les histogrammes (installé avec matplotlib)
+from sketches import SpaceSaving, HyperLogLog  # Compteurs approximatifs à mémoire bornée
+from ipv4 import ip_to_int, int_to_ip, format_address, network_label, parse_network, IPv4Counter, IPv4Intervals, subnet_prefixes  # Adresses IPv4 en entiers
+from contextlib import contextmanager  # Pour chronométrer une étape avec un bloc with
+import cProfile  # Pour profiler une analyse à la demande
+import pstats  # Pour afficher le résumé du profil
+import gzip  # Pour lire les captures texte compressées
+import heapq  # Pour les sous-réseaux les plus actifs sans trier tous les sous-réseaux
+import bisect  # Pour insérer un flux dans le top des flux sans le retrier
+import itertools  # Pour publier les flux ouverts les plus récents
+from pcap_reader import capture_format, read_packets, split_capture, ipv4_text  # Lecture directe des captures pcap / pcapng
 
 # Définition des fichiers d'entrée et de sortie
 input_file = "DumpFile.txt"  # Fichier contenant les données de capture réseau
 markdown_output = "Resumé_Markdown.md"  # Fichier de sortie pour le résumé en Markdown
+report_pages_directory = "Resumé_alertes"  # Pages Markdown du détail des alertes
 csv_output = "Donnees_csv.csv"  # Fichier de sortie pour les données extraites au format CSV
+index_output = "Paquets.sqlite"  # Index SQLite de tous les paquets, utilisé par les filtres de l'application
+flows_output = "Flux_csv.csv"  # Fichier de sortie des flux TCP terminés
+columns_output = "Paquets_colonnes"  # Dossier de l'export en colonnes typées (un fichier .npy par colonne)
+checkpoint_output = "Suivi.checkpoint"  # État du mode suivi (position dans le fichier et agrégats)
+batch_cache_output = "Cache_analyses"  # Résultats de chaque fichier lors de l'analyse d'un répertoire
 
 # Modèle HTML pour l'application Flask
 html_template = """
@@ -30,225 +61,2508 @@ html_template = """
 <body>
     <div class="container mt-5">
         <h1 class="mb-4">Analyse du trafic réseau</h1>
-        <form method="POST" class="mb-4">
+        <form method="GET" class="mb-4">
             <div class="row">
                 <div class="col-md-6">
-                    <label for="ip_filter">Filtrer par adresse IP :</label>
-                    <input type="text" id="ip_filter" name="ip_filter" class="form-control mb-3">
+                    <label for="ip_filter">Filtrer par adresse IP ou sous-réseau (192.168.1.0/24) :</label>
+                    <input type="text" id="ip_filter" name="ip_filter" value="{{ ip_filter }}" class="form-control mb-3">
                 </div>
                 <div class="col-md-6">
                     <label for="port_filter">Filtrer par port :</label>
-                    <input type="text" id="port_filter" name="port_filter" class="form-control mb-3">
+                    <input type="text" id="port_filter" name="port_filter" value="{{ port_filter }}" class="form-control mb-3">
                 </div>
             </div>
             <button type="submit" class="btn btn-primary">Appliquer les filtres</button>
         </form>
+        {% if live %}
+        <div class="card mb-4">
+            <div class="card-body">
+                <h2 class="card-title">Trafic en direct</h2>
+                <p>
+                    Paquets : <span id="live_packets">0</span> (+<span id="live_tick">0</span>)
+                    — Activités suspectes : <span id="live_suspicious">0</span>
+                    — Latence : <span id="live_latency">-</span> ms
+                </p>
+                <div class="row">
+                    <div class="col-md-6"><h5>Top adresses IP</h5><ul id="live_ips"></ul></div>
+                    <div class="col-md-6"><h5>Top ports</h5><ul id="live_ports"></ul></div>
+                </div>
+            </div>
+        </div>
+        <script>
+            // Mises à jour poussées par le serveur (Server-Sent Events)
+            function fillList(id, items, label) {
+                const list = document.getElementById(id);
+                list.replaceChildren(...items.map(([key, count]) => {
+                    const item = document.createElement("li");
+                    item.textContent = `${label}${key} : ${count}`;
+                    return item;
+                }));
+            }
+            const source = new EventSource("/events");
+            source.onmessage = (event) => {
+                const update = JSON.parse(event.data);
+                document.getElementById("live_packets").textContent = update.packets_total;
+                document.getElementById("live_tick").textContent = update.packets_tick;
+                document.getElementById("live_suspicious").textContent = update.suspicious_total;
+                if (update.oldest_line_at) {
+                    // Latence de bout en bout : lecture de la ligne -> affichage
+                    document.getElementById("live_latency").textContent = Math.round(Date.now() - update.oldest_line_at * 1000);
+                }
+                fillList("live_ips", update.top_ips, "");
+                fillList("live_ports", update.top_ports, "Port ");
+            };
+        </script>
+        {% endif %}
         {{ content | safe }}
+        {% if page_count > 0 %}
+        <nav class="mt-3">
+            <ul class="pagination">
+                {% if page_number > 0 %}
+                <li class="page-item"><a class="page-link" href="{{ url_for('display_results', ip_filter=ip_filter, port_filter=port_filter, page=page_number - 1) }}">Précédente</a></li>
+                {% endif %}
+                <li class="page-item disabled"><span class="page-link">{{ page_label }}</span></li>
+                {% if page_number < page_count %}
+                <li class="page-item"><a class="page-link" href="{{ url_for('display_results', ip_filter=ip_filter, port_filter=port_filter, page=page_number + 1) }}">Suivante</a></li>
+                {% endif %}
+            </ul>
+        </nav>
+        {% endif %}
         <h2 class="mt-5">Visualisations</h2>
         <div class="d-flex flex-wrap justify-content-between">
             <div class="m-2">
-                <img src="/static/top_ips.png" alt="Top IPs" class="img-thumbnail">
+                <img src="{{ url_for('chart', name='top_ips', ip_filter=ip_filter, port_filter=port_filter) }}" alt="Top IPs" class="img-thumbnail">
                 <p class="text-center">Top 10 des adresses IP</p>
             </div>
             <div class="m-2">
-                <img src="/static/top_ports.png" alt="Top Ports" class="img-thumbnail">
+                <img src="{{ url_for('chart', name='top_ports', ip_filter=ip_filter, port_filter=port_filter) }}" alt="Top Ports" class="img-thumbnail">
                 <p class="text-center">Top 10 des ports</p>
             </div>
             <div class="m-2">
-                <img src="/static/port_distribution.png" alt="Port Distribution" class="img-thumbnail">
+                <img src="{{ url_for('chart', name='port_distribution', ip_filter=ip_filter, port_filter=port_filter) }}" alt="Port Distribution" class="img-thumbnail">
                 <p class="text-center">Répartition des ports</p>
             </div>
+            <div class="m-2">
+                <img src="{{ url_for('chart', name='top_subnets', ip_filter=ip_filter, port_filter=port_filter) }}" alt="Top Subnets" class="img-thumbnail">
+                <p class="text-center">Top 10 des sous-réseaux /24</p>
+            </div>
         </div>
     </div>
 </body>
 </html>
 """
 
-# Expressions régulières pour extraire les données
-ip_pattern = re.compile(r"(\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})")  # Pour capturer les adresses IP
-time_pattern = re.compile(r"(\d{2}:\d{2}:\d{2}\.\d{6})")  # Pour capturer les timestamps
-port_pattern = re.compile(r"(?<=\.)\d{1,5}(?=[:\s])")  # Pour capturer les numéros de port
-suspicious_ports = {22, 80, 443, 50019}  # Ports considérés comme suspects
+# Expression régulière unique pour découper une ligne tcpdump en un seul passage
+# Exemple : 11:42:04.766656 IP BP-Linux8.ssh > 192.168.190.130.50019: Flags [P.], seq ..., length 108
+# Les ports non numériques (ssh, https, ...) restent dans l'extrémité mais ne sont pas comptés comme ports
+# Une adresse IPv4 en tête d'un nom d'hôte (201.181.244.35.bc.googleusercontent.com) est comptée comme IP
+# Une extrémité se termine au ':' suivi d'un blanc : les adresses IPv6 (IP6 fe80::1.546 > ff02::1:2.547:) gardent leurs ':'
+packet_pattern = re.compile(
+    r"(?P<timestamp>\d{2}:\d{2}:\d{2}\.\d{6}) IP6? "
+    r"(?P<src>(?P<src_ip>\d{1,3}(?:\.\d{1,3}){3}(?!\d))?[^\s>]*?(?:\.(?:(?P<src_port>\d{1,5})|[A-Za-z][\w-]*))?) > "
+    r"(?P<dst>(?P<dst_ip>\d{1,3}(?:\.\d{1,3}){3}(?!\d))?\S*?(?:\.(?:(?P<dst_port>\d{1,5})|[A-Za-z][\w-]*))?):(?=\s|$)"
+    r"(?: Flags \[(?P<flags>[^\]]*)\])?"
+    r"(?:.*, length (?P<length>\d+))?"
+)
 
-# Collecte des données
-ip_counter = Counter()  # Compteur pour les occurrences de chaque adresse IP
-port_counter = Counter()  # Compteur pour les occurrences de chaque port
-suspicious_logs = []  # Liste pour stocker les lignes suspectes
-ip_time_intervals = defaultdict(lambda: {"first_seen": None, "last_seen": None})  # Pour stocker les intervalles de temps des IP
-activity_analysis = []  # Liste pour stocker les activités suspectes avec des détails
-
-# Analyse du fichier
-print("Analyse du fichier pour trouver les adresses IP, les ports et les activités suspectes...")
-with open(input_file, "r") as file:
-    for line in file:
-        # Extraction des données importantes
-        time_match = time_pattern.search(line)
-        timestamp = time_match.group(1) if time_match else "Inconnu"  # Récupère le timestamp
-        ips = ip_pattern.findall(line)  # Récupère toutes les adresses IP dans la ligne
-        ports = port_pattern.findall(line)  # Récupère tous les ports dans la ligne
-
-        # Comptabilisation des IPs et ports
-        if ips:
-            for ip in ips:
-                ip_counter.update([ip])  # Met à jour le compteur pour cette IP
-                if not ip_time_intervals[ip]["first_seen"]:
-                    ip_time_intervals[ip]["first_seen"] = timestamp  # Enregistre la première apparition
-                ip_time_intervals[ip]["last_seen"] = timestamp  # Met à jour la dernière apparition
-
-        if ports:
-            port_counter.update(ports)  # Met à jour le compteur pour chaque port
-
-        # Détection des activités suspectes
-        for port in ports:
-            if int(port) in suspicious_ports:  # Si le port est suspect
-                suspicious_logs.append(line.strip())  # Ajoute la ligne à la liste des logs suspects
-                activity_analysis.append({
-                    "timestamp": timestamp,
-                    "event": "Connexion suspecte détectée",
-                    "details": line.strip(),
-                    "reason": f"Port critique utilisé ({port})"
-                })  # Enregistre l'activité suspecte
+# Enregistrement compact pour un paquet (un tuple nommé n'a pas de __dict__)
+# Les ports et la longueur sont des entiers (None si absents)
+# src_ip/dst_ip sont les adresses IPv4 en entiers sur 32 bits, None pour un nom d'hôte, une adresse IPv6 ou une adresse invalide
+# seconds est le timestamp converti une fois pour toutes en secondes depuis minuit
+Packet = namedtuple("Packet", ["timestamp", "seconds", "src", "src_ip", "src_port", "dst", "dst_ip", "dst_port", "flags", "length", "line"])
 
-# Génération du fichier Markdown
-markdown_content = "# Analyse du trafic réseau\n\n"
-markdown_content += "## Top 10 des adresses IP\n"
-for ip, count in ip_counter.most_common(10):  # Pour les 10 IP les plus fréquentes
-    first_seen = ip_time_intervals[ip]["first_seen"]
-    last_seen = ip_time_intervals[ip]["last_seen"]
-    markdown_content += f"- **{ip}** : {count} occurrences (Première apparition : {first_seen}, Dernière apparition : {last_seen})\n"
-
-markdown_content += "\n## Top 10 des ports\n"
-for port, count in port_counter.most_common(10):  # Pour les 10 ports les plus utilisés
-    markdown_content += f"- **Port {port}** : {count} occurrences\n"
-
-markdown_content += "\n## Analyse détaillée des activités suspectes\n"
-if activity_analysis:  # Si des activités suspectes ont été détectées
-    for activity in activity_analysis:
-        markdown_content += f"- **{activity['timestamp']}** : {activity['event']}\n"
-        markdown_content += f"  - Détails : `{activity['details']}`\n"
-        markdown_content += f"  - Raison : {activity['reason']}\n\n"
-else:
-    markdown_content += "Aucune activité suspecte détectée.\n"
-
-# Écriture du fichier Markdown
-with open(markdown_output, "w") as md_file:
-    md_file.write(markdown_content)
-
-# Fonction pour extraire les données TCPDUMP
-def extract_tcpdump_data(file_path):
+# En-têtes du fichier CSV de sortie
+csv_headers = ['Temps', 'IP Source', 'IP Destination', 'Flag', 'Longueur du Paquet']
+flow_csv_headers = ['Protocole', 'Source', 'Destination', 'Début', 'Fin', 'Durée (s)', 'Paquets', 'Octets', 'SYN', 'État']
+
+# Conversion d'un timestamp HH:MM:SS.ffffff en secondes depuis minuit
+def timestamp_to_seconds(timestamp):
+    return int(timestamp[0:2]) * 3600 + int(timestamp[3:5]) * 60 + float(timestamp[6:])
+
+# Conversion inverse, pour l'affichage (HH:MM:SS.ffffff)
+def format_seconds(seconds):
+    microseconds = round(seconds * 1000000)
+    minutes, microseconds = divmod(microseconds, 60000000)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02}:{minutes:02}:{microseconds // 1000000:02}.{microseconds % 1000000:06}"
+
+# Fonction pour analyser une ligne et produire un enregistrement unique
+# Toutes les étapes suivantes (compteurs, intervalles, détection, CSV) travaillent sur cet enregistrement
+# Retourne None pour les lignes qui ne décrivent pas un paquet IP (ARP, lignes tronquées, ...)
+def parse_line(line):
+    match = packet_pattern.match(line)
+    if not match:
+        return None
+
+    timestamp, src, src_ip, src_port, dst, dst_ip, dst_port, flags, length = match.group(
+        "timestamp", "src", "src_ip", "src_port", "dst", "dst_ip", "dst_port", "flags", "length")
+
+    return Packet(
+        timestamp,
+        timestamp_to_seconds(timestamp),
+        src,
+        ip_to_int(src_ip) if src_ip else None,
+        int(src_port) if src_port else None,
+        dst,
+        ip_to_int(dst_ip) if dst_ip else None,
+        int(dst_port) if dst_port else None,
+        flags,
+        int(length) if length else None,
+        line.strip(),
+    )
+
+# Champs destinés au fichier CSV (uniquement pour les lignes avec des flags TCP)
+def csv_row(record):
+    length = record.length if record.length is not None else "N/A"
+    return [record.timestamp, record.src, record.dst, record.flags, length]
+
+# Générateur qui parcourt le fichier une seule fois, ligne par ligne
+# Une seule ligne est en mémoire à la fois, quelle que soit la taille de la capture
+# Les mesures de lecture (lignes, octets, erreurs, temps d'analyse) sont publiées toutes les metrics_flush_lines lignes
+def parse_dump(file):
+    lines = bytes_read = parse_errors = 0
+    seconds = 0.0
+    try:
+        for line in file:
+            start = time.perf_counter()
+            record = parse_line(line)
+            seconds += time.perf_counter() - start
+            lines += 1
+            bytes_read += len(line)
+            if record is None:
+                parse_errors += 1
+            else:
+                yield record
+            if lines >= metrics_flush_lines:
+                add_parse_metrics(lines, bytes_read, parse_errors, seconds)
+                lines = bytes_read = parse_errors = 0
+                seconds = 0.0
+    finally:
+        add_parse_metrics(lines, bytes_read, parse_errors, seconds)
+
+# Captures pcap / pcapng : les paquets décodés par pcap_reader sont mis sous la même forme que les lignes tcpdump
+# Le timestamp est l'heure locale du paquet, comme dans la sortie de tcpdump -r
+# La ligne est reconstituée (sans numéros de séquence) pour l'index, les exemples des alertes et l'application web
+ip_protocol_names = {1: "ICMP", 6: "TCP", 17: "UDP", 58: "ICMP6"}
+
+# prefix est l'heure HH:MM:SS de second (secondes depuis minuit), calculée une fois par seconde par parse_pcap
+def pcap_record(prefix, second, microseconds, packet):
+    version, src_ip, src_port, dst_ip, dst_port, protocol, flags, length = packet
+    timestamp = f"{prefix}.{microseconds:06d}"
+    if version == 4:
+        label, src_text, dst_text = "IP", ipv4_text(src_ip), ipv4_text(dst_ip)
+    else:
+        label, src_text, dst_text = "IP6", src_ip, dst_ip
+    src = src_text if src_port is None else f"{src_text}.{src_port}"
+    dst = dst_text if dst_port is None else f"{dst_text}.{dst_port}"
+    if flags is not None:
+        line = f"{timestamp} {label} {src} > {dst}: Flags [{flags}], length {length}"
+    else:
+        line = f"{timestamp} {label} {src} > {dst}: {ip_protocol_names.get(protocol, f'ip-proto-{protocol}')}, length {length}"
+    if version == 6:  # Comme pour les lignes tcpdump, seules les adresses IPv4 sont comptées comme IP
+        src_ip = dst_ip = None
+    return Packet(timestamp, second + microseconds / 1000000, src, src_ip, src_port, dst, dst_ip, dst_port, flags, length, line)
+
+# Générateur des paquets d'une capture pcap / pcapng (entre start et end avec l'état de split_capture, ou en entier)
+# Les mesures sont celles de parse_dump : trames lues, octets capturés, trames non IP, temps de décodage
+def parse_pcap(file_path, start=None, end=None, state=None):
+    frames = bytes_read = parse_errors = 0
+    seconds = 0.0
+    utc_offset = None  # Décalage de l'heure locale, lu au premier paquet
+    last_second, prefix = None, None
+    try:
+        last = time.perf_counter()
+        for epoch_seconds, microseconds, captured, packet in read_packets(file_path, start, end, state):
+            frames += 1
+            bytes_read += captured
+            record = None
+            if packet is None:
+                parse_errors += 1
+            else:
+                if utc_offset is None:
+                    utc_offset = time.localtime(epoch_seconds).tm_gmtoff
+                second = (epoch_seconds + utc_offset) % 86400
+                if second != last_second:
+                    hours, minutes = divmod(second // 60, 60)
+                    last_second, prefix = second, f"{hours:02}:{minutes:02}:{second % 60:02}"
+                record = pcap_record(prefix, second, microseconds, packet)
+            seconds += time.perf_counter() - last  # Lecture, décodage et mise en forme, sans le temps des consommateurs
+            if frames >= metrics_flush_lines:
+                add_parse_metrics(frames, bytes_read, parse_errors, seconds)
+                frames = bytes_read = parse_errors = 0
+                seconds = 0.0
+            if record is not None:
+                yield record
+            last = time.perf_counter()
+    finally:
+        add_parse_metrics(frames, bytes_read, parse_errors, seconds)
+
+# Capture texte, compressée avec gzip ou non
+def open_text_dump(file_path, compressed):
+    if compressed:
+        return gzip.open(file_path, "rt", encoding="utf8")
+    return open(file_path, "r", encoding="utf8")
+
+# Flags TCP de tcpdump -> bits de l'en-tête TCP
+tcp_flag_bits = {"F": 1, "S": 2, "R": 4, "P": 8, ".": 16, "U": 32, "E": 64, "W": 128}
+
+# Flags tcpdump ("S.", "P.", "F.", ...) -> masque ; il y a peu de combinaisons différentes
+@lru_cache(maxsize=None)
+def flags_to_mask(flags):
+    return sum(tcp_flag_bits.get(flag, 0) for flag in flags)
+
+# Mesures internes, exposées au format Prometheus sur /metrics
+# - compteurs : lignes lues, paquets reconnus, lignes non reconnues, octets lus, succès des caches...
+# - étapes : nombre d'appels et temps cumulé de chaque étape de l'analyse (parse, compteurs, CSV, index, rapport...)
+# - requêtes : histogramme du temps de rendu de chaque route de l'application web
+# Les étapes appelées pour chaque paquet cumulent leur temps dans des variables locales, publiées par lot
+metrics_state = {
+    "lock": threading.Lock(),
+    "counters": Counter(),  # Nom -> valeur
+    "stages": {},  # Étape -> [nombre d'appels, secondes]
+    "requests": {},  # Route -> [compteurs par seuil de request_buckets, nombre de requêtes, secondes]
+}
+request_buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)  # Seuils (s) de l'histogramme des requêtes
+metrics_flush_lines = 10000  # Nombre de lignes lues entre deux publications des mesures de lecture
+
+def add_counter(name, value=1):
+    with metrics_state["lock"]:
+        metrics_state["counters"][name] += value
+
+def add_stage_times(stage_times):
+    with metrics_state["lock"]:
+        for stage, (calls, seconds) in stage_times.items():
+            totals = metrics_state["stages"].setdefault(stage, [0, 0.0])
+            totals[0] += calls
+            totals[1] += seconds
+
+@contextmanager
+def timed_stage(stage):
+    start = time.perf_counter()
     try:
-        with open(file_path, encoding="utf8") as file:
-            lines = file.readlines()
-    except FileNotFoundError:
+        yield
+    finally:
+        add_stage_times({stage: (1, time.perf_counter() - start)})
+
+# Mesures de lecture d'un lot de lignes (octets : caractères lus, identiques aux octets pour une capture ASCII)
+def add_parse_metrics(lines, bytes_read, parse_errors, seconds):
+    with metrics_state["lock"]:
+        counters = metrics_state["counters"]
+        counters["lines_read"] += lines
+        counters["bytes_read"] += bytes_read
+        counters["parse_errors"] += parse_errors
+        counters["packets_parsed"] += lines - parse_errors
+        totals = metrics_state["stages"].setdefault("parse", [0, 0.0])
+        totals[0] += lines
+        totals[1] += seconds
+
+def observe_request(route, seconds):
+    with metrics_state["lock"]:
+        buckets, _, _ = observed = metrics_state["requests"].setdefault(route, [[0] * len(request_buckets), 0, 0.0])
+        for position, bound in enumerate(request_buckets):
+            if seconds <= bound:
+                buckets[position] += 1
+        observed[1] += 1
+        observed[2] += seconds
+
+# Copie des compteurs et des étapes, renvoyée par les processus de l'analyse parallèle puis fusionnée
+def metrics_snapshot():
+    with metrics_state["lock"]:
+        return {"counters": Counter(metrics_state["counters"]), "stages": {stage: tuple(totals) for stage, totals in metrics_state["stages"].items()}}
+
+def merge_metrics(snapshot):
+    with metrics_state["lock"]:
+        metrics_state["counters"].update(snapshot["counters"])
+    add_stage_times(snapshot["stages"])
+
+# Un processus de l'analyse parallèle peut traiter plusieurs plages : ses mesures repartent de zéro à chaque plage
+def reset_metrics():
+    with metrics_state["lock"]:
+        metrics_state["counters"].clear()
+        metrics_state["stages"].clear()
+        metrics_state["requests"].clear()
+
+# Profil cProfile d'un bloc, enregistré dans profile_path (lisible avec pstats ou snakeviz) ; rien si profile_path est vide
+# Seul le thread courant est profilé (en analyse parallèle : le processus principal, donc surtout la fusion)
+@contextmanager
+def profiled(profile_path, top=25):
+    if not profile_path:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(profile_path)
+        print(f"Profil enregistré dans {profile_path}")
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(top)
+
+# Collecte des données
+# Les agrégats sont regroupés dans un dictionnaire pour pouvoir être fusionnés entre processus
+# Avec sketch_settings ({"capacity": ..., "precision": ...}), les compteurs d'IP et de ports sont approximatifs
+# (Space-Saving, mémoire bornée) et les sources / destinations distinctes sont estimées par HyperLogLog
+# rules est la liste des règles de détection (default_rules si None), compilées pour ces agrégats
+def new_aggregates(sketch_settings=None, rules=None):
+    aggregates = new_exact_aggregates()
+    aggregates["rules"] = compile_rules(default_rules if rules is None else rules)
+    if sketch_settings:
+        return {
+            **aggregates,
+            "ip_counter": SpaceSaving(sketch_settings["capacity"]),
+            "port_counter": SpaceSaving(sketch_settings["capacity"]),
+            "distinct_sources": HyperLogLog(sketch_settings["precision"]),  # Adresses IP sources distinctes
+            "distinct_destinations": HyperLogLog(sketch_settings["precision"]),  # Adresses IP destinations distinctes
+        }
+    return aggregates
+
+def new_exact_aggregates():
+    return {
+        "ip_counter": IPv4Counter(),  # Compteur pour les occurrences de chaque adresse IP (entiers sur 32 bits)
+        "port_counter": Counter(),  # Compteur pour les occurrences de chaque port
+        "ip_time_intervals": IPv4Intervals(),  # Première et dernière apparition de chaque adresse IP
+        "alerts": {},  # Alertes regroupées : (règle, source, destination, port) -> occurrences
+        "alerts_dropped": 0,  # Occurrences ignorées une fois max_alerts atteint
+        "rule_hits": Counter(),  # Occurrences par règle, y compris celles qui n'ont pas pu être regroupées
+        "flows": OrderedDict(),  # Flux TCP ouverts, du moins récemment actif au plus récent
+        "closing_flows": OrderedDict(),  # Flux fermés (RST ou FIN des deux côtés) en attente des derniers paquets
+        "flow_check": None,  # Seconde de la dernière recherche de flux inactifs
+        "finished_flows": [],  # Flux terminés pas encore écrits dans le CSV des flux
+        "flow_count": 0,  # Nombre de flux terminés
+        "top_flows": [],  # Flux terminés les plus volumineux (octets décroissants, top_flows_kept au plus)
+        "traffic_per_second": new_histogram(1),  # Paquets et octets par seconde
+        "traffic_per_minute": new_histogram(60),  # Paquets et octets par minute
+    }
+
+# Histogrammes temporels
+# Un histogramme couvre une journée (les timestamps tcpdump n'ont pas de date) avec un tableau préalloué par mesure
+seconds_per_day = 86400
+busiest_minutes_listed = 10  # Minutes détaillées dans la section du rapport sur l'activité dans le temps
+
+def new_histogram(bucket_seconds):
+    size = seconds_per_day // bucket_seconds
+    return {
+        "bucket_seconds": bucket_seconds,  # Largeur d'une case en secondes
+        "packets": array("Q", [0]) * size,  # Nombre de paquets par case
+        "bytes": array("Q", [0]) * size,  # Somme des champs length par case
+    }
+
+def merge_histogram(histogram, partial):
+    for name in ("packets", "bytes"):
+        histogram_values(histogram[name])[:] += histogram_values(partial[name])  # Addition dans le tableau lui-même
+
+# Vue numpy d'un tableau de cases (array du module array), sans copie
+# Les calculs sur une journée entière (86400 cases) se font ainsi en une opération vectorisée
+def histogram_values(values):
+    return np.frombuffer(values, dtype=values.typecode) if isinstance(values, array) else np.asarray(values)
+
+# Somme glissante sur window cases : résultat[i] = somme des cases i-window+1 à i
+def rolling_sum(values, window):
+    cumulative = np.cumsum(histogram_values(values), dtype=np.uint64)
+    sums = cumulative.copy()
+    sums[window:] -= cumulative[:-window]
+    return sums
+
+# Fenêtre de window cases la plus chargée : (première case, total)
+# À total égal, la fenêtre la plus tardive est retenue pour qu'elle commence sur une case active
+def busiest_window(values, window):
+    sums = histogram_values(values) if window == 1 else rolling_sum(values, window)
+    end = len(sums) - 1 - int(np.argmax(sums[::-1]))
+    return max(end - window + 1, 0), int(sums[end])
+
+# Pics de trafic : cases dont le nombre de paquets dépasse factor fois la moyenne des cases actives
+def find_bursts(values, factor=3.0, limit=10):
+    values = histogram_values(values)
+    active = values[values > 0]
+    if not active.size:
+        return []
+    threshold = factor * int(active.sum()) / active.size
+    buckets = np.flatnonzero(values > threshold)
+    counts = values[buckets].astype(np.int64)
+    order = np.argsort(-counts, kind="stable")[:limit]  # Du plus chargé au moins chargé, dans l'ordre du temps à égalité
+    return [(int(buckets[position]), int(counts[position])) for position in order]
+
+# Cases les plus chargées, dans l'ordre du temps : (case, nombre de paquets)
+def busiest_buckets(values, limit):
+    values = histogram_values(values)
+    order = np.argsort(-values.astype(np.int64), kind="stable")[:limit]
+    return [(int(bucket), int(values[bucket])) for bucket in sorted(order) if values[bucket]]
+
+# Première et dernière case non vide (None si l'histogramme est vide)
+def active_range(values):
+    active = np.flatnonzero(histogram_values(values))
+    return (int(active[0]), int(active[-1])) if active.size else None
+
+# Consommateur : comptabilisation des IPs et ports
+def update_counters(aggregates, record):
+    ip_counter = aggregates["ip_counter"]
+    if record.src_ip is not None:
+        ip_counter.add(record.src_ip)  # Met à jour le compteur pour chaque IP
+    if record.dst_ip is not None:
+        ip_counter.add(record.dst_ip)
+    port_counter = aggregates["port_counter"]
+    if record.src_port is not None:
+        port_counter[record.src_port] += 1  # Met à jour le compteur pour chaque port
+    if record.dst_port is not None:
+        port_counter[record.dst_port] += 1
+
+# Consommateur : histogrammes par seconde et par minute
+def update_histograms(aggregates, record):
+    second = int(record.seconds)
+    length = record.length or 0
+    per_second = aggregates["traffic_per_second"]
+    per_second["packets"][second] += 1
+    per_second["bytes"][second] += length
+    per_minute = aggregates["traffic_per_minute"]
+    per_minute["packets"][second // 60] += 1
+    per_minute["bytes"][second // 60] += length
+
+# Consommateur : première et dernière apparition de chaque IP (en secondes)
+def update_time_intervals(aggregates, record):
+    ip_time_intervals = aggregates["ip_time_intervals"]
+    if record.src_ip is not None:
+        ip_time_intervals.add(record.src_ip, record.seconds)
+    if record.dst_ip is not None:
+        ip_time_intervals.add(record.dst_ip, record.seconds)
+    ip_counter = aggregates["ip_counter"]
+    if isinstance(ip_counter, SpaceSaving) and ip_time_intervals.size_bound() > 2 * ip_counter.capacity:
+        prune_time_intervals(aggregates)
+
+# En mode approximatif, seules les IP suivies par le compteur gardent leur intervalle
+# Une IP sortie puis revenue dans le compteur a une première apparition approximative
+def prune_time_intervals(aggregates):
+    aggregates["ip_time_intervals"].retain(aggregates["ip_counter"].counts)
+
+# Consommateur (mode approximatif) : sources et destinations distinctes
+def update_distinct_counts(aggregates, record):
+    if record.src_ip is not None:
+        aggregates["distinct_sources"].add(record.src_ip)
+    if record.dst_ip is not None:
+        aggregates["distinct_destinations"].add(record.dst_ip)
+
+# Règles de détection des activités suspectes
+# Une règle est un dictionnaire ; toutes les conditions présentes doivent être vraies :
+# - "cidr" : plages d'adresses ["10.0.0.0/8", ...] (source ou destination)
+# - "ports" : ports ou plages de ports [22, "6000-6063", ...] (source ou destination)
+# - "flags" / "not_flags" : flags TCP présents / absents ("S" et "." : SYN sans ACK)
+# - "distinct_ports" et "window" : une source touche plus de distinct_ports ports de destination en window secondes
+# "name" identifie la règle, "reason" est affiché dans le rapport. Un fichier JSON (--rules) contient une liste de règles.
+default_rules = [
+    {"name": "Port critique", "ports": [22, 80, 443, 50019], "reason": "Port critique utilisé"},
+    {"name": "Scan de ports", "flags": "S", "not_flags": ".", "distinct_ports": 20, "window": 1,
+     "reason": "Plus de 20 ports de destination en SYN en une seconde"},
+]
+rule_keys = {"name", "reason", "cidr", "ports", "flags", "not_flags", "distinct_ports", "window"}
+max_alerts = 10000  # Nombre maximal d'alertes regroupées gardées en mémoire
+alerts_per_page = 100  # Nombre d'alertes détaillées par page du rapport
+rule_sample_size = 5  # Nombre de lignes d'exemple par règle dans le résumé
+
+def load_rules(rules_path):
+    with open(rules_path, encoding="utf8") as rules_file:
+        rules = json.load(rules_file)
+    compile_rules(rules)  # Vérifie les règles avant de lancer l'analyse
+    return rules
+
+# Ports et plages de ports -> table de 65536 octets (1 = port concerné)
+def compile_ports(ports):
+    table = bytearray(65536)
+    for port in ports:
+        low, _, high = str(port).partition("-")
+        low, high = int(low), int(high or low)
+        if not 0 <= low <= high <= 65535:
+            raise ValueError(f"Plage de ports invalide : {port}")
+        table[low:high + 1] = b"\x01" * (high - low + 1)
+    return table
+
+# Plages CIDR -> liste de (masque, ensemble des réseaux) : un test d'appartenance par longueur de préfixe
+def compile_networks(cidrs):
+    networks = {}
+    for cidr in cidrs:
+        network = ipaddress.IPv4Network(cidr, strict=False)
+        networks.setdefault(int(network.netmask), set()).add(int(network.network_address))
+    return list(networks.items())
+
+def compile_rules(rules):
+    compiled = []
+    for rule in rules:
+        unknown = set(rule) - rule_keys
+        if "name" not in rule or unknown:
+            raise ValueError(f"Règle invalide {rule} : 'name' obligatoire, clés inconnues {sorted(unknown)}")
+        compiled.append({
+            "name": rule["name"],
+            "reason": rule.get("reason", rule["name"]),
+            "ports": compile_ports(rule["ports"]) if "ports" in rule else None,
+            "networks": compile_networks(rule["cidr"]) if "cidr" in rule else None,
+            "flags": flags_to_mask(rule.get("flags", "")),
+            "not_flags": flags_to_mask(rule.get("not_flags", "")),
+            "distinct_ports": rule.get("distinct_ports"),
+            "window": rule.get("window", 1),
+            "rate_state": {"window": None, "ports": {}},  # Ports touchés par source dans la fenêtre courante
+        })
+    return compiled
+
+def in_networks(address, networks):
+    if address is None:
+        return False
+    return any(address & mask in prefixes for mask, prefixes in networks)
+
+# Règle de débit : vrai quand la source dépasse le seuil dans la fenêtre courante (une fois par fenêtre)
+def rate_exceeded(rule, record):
+    if record.dst_port is None:
+        return False
+    state = rule["rate_state"]
+    window = int(record.seconds // rule["window"])
+    if state["window"] != window:
+        state["window"] = window
+        state["ports"] = {}  # Les paquets sont dans l'ordre du temps : les fenêtres passées sont oubliées
+    ports = state["ports"].setdefault(record.src_ip or record.src, set())
+    if len(ports) > rule["distinct_ports"]:
+        return False  # Alerte déjà levée pour cette source dans cette fenêtre
+    ports.add(record.dst_port)
+    return len(ports) > rule["distinct_ports"]
+
+# Regroupe les occurrences d'une même alerte au lieu d'une entrée par ligne
+def raise_alert(aggregates, rule, record, port):
+    aggregates["rule_hits"][rule["name"]] += 1
+    alerts = aggregates["alerts"]
+    destination = None if rule["distinct_ports"] is not None else record.dst_ip or record.dst
+    key = (rule["name"], record.src_ip or record.src, destination, port)
+    alert = alerts.get(key)
+    if alert is not None:
+        alert["count"] += 1
+        alert["last_seen"] = record.timestamp
+    elif len(alerts) < max_alerts:
+        alerts[key] = {
+            "rule": rule["name"],
+            "reason": rule["reason"],
+            "source": format_address(key[1]),
+            "destination": format_address(destination),
+            "port": port,
+            "count": 1,
+            "first_seen": record.timestamp,
+            "last_seen": record.timestamp,
+            "example": record.line,
+        }
+    else:
+        aggregates["alerts_dropped"] += 1
+
+# Consommateur : détection des activités suspectes
+def detect_suspicious_activity(aggregates, record):
+    for rule in aggregates["rules"]:
+        if rule["flags"] or rule["not_flags"]:
+            if record.flags is None:
+                continue
+            mask = flags_to_mask(record.flags)
+            if mask & rule["flags"] != rule["flags"] or mask & rule["not_flags"]:
+                continue
+        port = None
+        if rule["ports"] is not None:
+            if record.dst_port is not None and rule["ports"][record.dst_port]:
+                port = record.dst_port
+            elif record.src_port is not None and rule["ports"][record.src_port]:
+                port = record.src_port
+            else:
+                continue
+        networks = rule["networks"]
+        if networks is not None and not (in_networks(record.src_ip, networks) or in_networks(record.dst_ip, networks)):
+            continue
+        if rule["distinct_ports"] is not None and not rate_exceeded(rule, record):
+            continue
+        raise_alert(aggregates, rule, record, port)
+
+# Fusionne les alertes d'agrégats partiels (dans l'ordre du fichier)
+def merge_alerts(aggregates, partial):
+    alerts = aggregates["alerts"]
+    for key, alert in partial["alerts"].items():
+        if key in alerts:
+            alerts[key]["count"] += alert["count"]
+            alerts[key]["last_seen"] = alert["last_seen"]
+        elif len(alerts) < max_alerts:
+            alerts[key] = dict(alert)
+        else:
+            aggregates["alerts_dropped"] += alert["count"]
+    aggregates["alerts_dropped"] += partial["alerts_dropped"]
+    aggregates["rule_hits"].update(partial["rule_hits"])
+
+# Table des flux TCP
+# Un flux est identifié par le protocole et ses deux extrémités hôte.port, dans les deux sens
+# Les flux inactifs depuis flow_idle_timeout secondes sont terminés, ce qui borne la mémoire sur une longue capture
+flow_idle_timeout = 120  # Secondes sans paquet avant de terminer un flux ouvert
+flow_closing_timeout = 5  # Secondes gardées après la fermeture pour les derniers ACK
+max_flows = 100000  # Nombre maximal de flux ouverts (le moins récemment actif est terminé au-delà)
+top_flows_size = 10  # Nombre de flux dans la section « Top des flux »
+top_flows_kept = 1000  # Flux terminés les plus volumineux gardés en mémoire (section du rapport et API /api/flows)
+
+def new_flow(record):
+    return {
+        "protocol": "TCP",
+        "source": record.src,  # Extrémité qui a envoyé le premier paquet vu
+        "destination": record.dst,
+        "start": record.seconds,
+        "end": record.seconds,
+        "packets": 0,
+        "bytes": 0,
+        "flags": 0,  # Union des flags vus
+        "fin": 0,  # 1 : FIN de la source, 2 : FIN de la destination
+    }
+
+# Un flux terminé est mis en attente d'écriture et peut entrer dans le top des flux
+def finish_flow(aggregates, flow):
+    aggregates["finished_flows"].append(flow)
+    aggregates["flow_count"] += 1
+    top_flows = aggregates["top_flows"]
+    if len(top_flows) < top_flows_kept or flow["bytes"] > top_flows[-1]["bytes"]:
+        bisect.insort(top_flows, flow, key=lambda top_flow: -top_flow["bytes"])  # Après les flux de même taille
+        del top_flows[top_flows_kept:]
+
+# Termine les flux inactifs (les plus anciens sont en tête des tables) ; now = None termine tous les flux
+def expire_flows(aggregates, now):
+    for table, timeout in ((aggregates["flows"], flow_idle_timeout), (aggregates["closing_flows"], flow_closing_timeout)):
+        while table:
+            key, flow = next(iter(table.items()))
+            if now is not None and flow["end"] > now - timeout and len(table) <= max_flows:
+                break
+            del table[key]
+            finish_flow(aggregates, flow)
+
+# Consommateur : reconstitution des flux TCP (les paquets sans flags ne sont pas du TCP)
+def update_flows(aggregates, record):
+    if record.flags is None:
+        return
+    key = (record.src, record.dst) if record.src < record.dst else (record.dst, record.src)
+    flows = aggregates["flows"]
+    closing_flows = aggregates["closing_flows"]
+    flow = flows.get(key)
+    if flow is not None:
+        flows.move_to_end(key)
+    else:
+        flow = closing_flows.get(key)
+        if flow is not None:
+            closing_flows.move_to_end(key)
+        else:
+            flow = flows[key] = new_flow(record)
+    mask = flags_to_mask(record.flags)
+    flow["end"] = record.seconds
+    flow["packets"] += 1
+    flow["bytes"] += record.length or 0
+    flow["flags"] |= mask
+    if mask & tcp_flag_bits["F"]:
+        flow["fin"] |= 1 if record.src == flow["source"] else 2
+    if key in flows and (mask & tcp_flag_bits["R"] or flow["fin"] == 3):
+        closing_flows[key] = flows.pop(key)  # Fermeture : le flux sera terminé après flow_closing_timeout
+
+    second = int(record.seconds)
+    if second != aggregates["flow_check"] or len(flows) > max_flows:
+        aggregates["flow_check"] = second
+        expire_flows(aggregates, record.seconds)
+
+def flow_state(flow):
+    if flow["flags"] & tcp_flag_bits["R"]:
+        return "réinitialisé"
+    if flow["fin"] == 3:
+        return "fermé"
+    return "expiré"  # Inactif trop longtemps ou encore ouvert à la fin de la capture
+
+def flow_row(flow):
+    return [
+        flow["protocol"], flow["source"], flow["destination"],
+        format_seconds(flow["start"]), format_seconds(flow["end"]), round(flow["end"] - flow["start"], 6),
+        flow["packets"], flow["bytes"], "oui" if flow["flags"] & tcp_flag_bits["S"] else "non", flow_state(flow),
+    ]
+
+# Écrit les flux terminés ; avec finish, les flux encore ouverts sont terminés (fin de l'analyse)
+def write_finished_flows(aggregates, flow_writer, finish=False):
+    if finish:
+        expire_flows(aggregates, None)
+    for flow in aggregates["finished_flows"]:
+        flow_writer.writerow(flow_row(flow))
+    aggregates["finished_flows"].clear()
+
+# Index SQLite des paquets
+# Les adresses IPv4 sont des entiers : un filtre sur un sous-réseau est une plage (BETWEEN) lue dans l'index
+# Les index sont créés après le chargement, ce qui est beaucoup plus rapide qu'une mise à jour ligne par ligne
+index_batch_size = 10000  # Nombre de paquets insérés à la fois
+index_columns = ["timestamp", "seconds", "src", "src_ip", "src_port", "dst", "dst_ip", "dst_port", "flags", "length", "line"]
+index_table = (
+    "packets (id INTEGER PRIMARY KEY, timestamp TEXT, seconds REAL, src TEXT, src_ip INTEGER, src_port INTEGER,"
+    " dst TEXT, dst_ip INTEGER, dst_port INTEGER, flags TEXT, length INTEGER, line TEXT)"
+)
+
+def create_packet_index(db_path):
+    if os.path.exists(db_path):
+        os.remove(db_path)  # L'index est reconstruit à chaque analyse
+    connection = sqlite3.connect(db_path)
+    connection.execute("PRAGMA journal_mode = OFF")  # Chargement en masse : pas de journal
+    connection.execute("PRAGMA synchronous = OFF")
+    connection.execute(f"CREATE TABLE {index_table}")
+    return connection
+
+# Contenu de l'index, réglé par la ligne de commande : sans les lignes brutes (--no-index-lines), la colonne line
+# reste vide et l'index est nettement plus petit ; l'application web reconstitue alors les lignes (index_line)
+index_settings = {"lines": True}
+
+# Applique les réglages de l'index dans un processus de l'analyse parallèle
+def configure_index(settings):
+    index_settings.update(settings)
+
+def insert_packets(connection, records):
+    columns = index_columns
+    if not index_settings["lines"]:
+        columns = index_columns[:-1]
+        records = [record[:-1] for record in records]  # line est le dernier champ du Packet
+    connection.executemany(
+        f"INSERT INTO packets ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+        records,
+    )
+
+def create_index_columns(connection):
+    for column in ["src_ip", "dst_ip", "src_port", "dst_port", "seconds"]:
+        connection.execute(f"CREATE INDEX IF NOT EXISTS idx_{column} ON packets ({column})")
+
+def finalize_packet_index(connection):
+    create_index_columns(connection)
+    connection.commit()
+    connection.close()
+
+# Ouvre un index existant pour y ajouter des paquets (mode suivi)
+# Le journal WAL permet à l'application web de lire pendant les insertions
+def open_packet_index(db_path):
+    connection = sqlite3.connect(db_path, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode = WAL")
+    connection.execute(f"CREATE TABLE IF NOT EXISTS {index_table}")
+    create_index_columns(connection)
+    return connection
+
+# Export en colonnes typées, écrit par lots pendant l'analyse
+# Les lignes sont celles du CSV (paquets avec des flags) ; une IP absente (nom d'hôte) ou un port absent vaut 0
+# Chaque colonne est un fichier .npy dont l'en-tête a une taille fixe : il est réécrit avec le nombre de lignes
+# à chaque vidage et les données sont ajoutées en fin de fichier. numpy.load(..., mmap_mode="r") relit sans copie
+column_types = {  # Nom de la colonne -> (code du module array, type numpy)
+    "seconds": ("d", "f8"),  # Secondes depuis minuit
+    "src_ip": ("I", "u4"),  # Adresses IPv4 en entier
+    "dst_ip": ("I", "u4"),
+    "src_port": ("H", "u2"),
+    "dst_port": ("H", "u2"),
+    "flags": ("B", "u1"),  # Masque des flags TCP (bits de l'en-tête TCP)
+    "length": ("I", "u4"),
+}
+column_byte_order = "<" if sys.byteorder == "little" else ">"  # Les tableaux sont écrits dans l'ordre de la machine
+npy_header_size = 128  # Taille fixe de l'en-tête .npy (multiple de 64)
+
+def npy_header(dtype, rows):
+    header = repr({"descr": column_byte_order + dtype, "fortran_order": False, "shape": (rows,)})
+    header = header.ljust(npy_header_size - 11) + "\n"
+    return b"\x93NUMPY\x01\x00" + (npy_header_size - 10).to_bytes(2, "little") + header.encode("latin1")
+
+# Ouvre l'export ; avec append, les colonnes existantes sont complétées (mode suivi)
+def open_column_export(directory, append=False):
+    os.makedirs(directory, exist_ok=True)
+    export = {"directory": directory, "rows": 0, "files": {}, "batches": {}}
+    rows = []
+    for name, (typecode, dtype) in column_types.items():
+        path = os.path.join(directory, f"{name}.npy")
+        if append and os.path.exists(path):
+            column_file = open(path, "r+b")
+            column_file.seek(0, os.SEEK_END)
+        else:
+            column_file = open(path, "w+b")
+            column_file.write(npy_header(dtype, 0))
+        export["files"][name] = column_file
+        export["batches"][name] = array(typecode)
+        rows.append((column_file.tell() - npy_header_size) // export["batches"][name].itemsize)
+    # Après un arrêt en plein vidage, les colonnes sont ramenées à la même longueur
+    export["rows"] = min(rows)
+    for name, column_file in export["files"].items():
+        column_file.truncate(npy_header_size + export["rows"] * export["batches"][name].itemsize)
+        column_file.seek(0, os.SEEK_END)
+    return export
+
+def add_column_row(export, record):
+    batches = export["batches"]
+    batches["seconds"].append(record.seconds)
+    batches["src_ip"].append(record.src_ip or 0)
+    batches["dst_ip"].append(record.dst_ip or 0)
+    batches["src_port"].append(record.src_port or 0)
+    batches["dst_port"].append(record.dst_port or 0)
+    batches["flags"].append(flags_to_mask(record.flags))
+    batches["length"].append(record.length or 0)
+    if len(batches["seconds"]) >= index_batch_size:
+        flush_column_export(export)
+
+# Écrit les lots en attente puis met à jour le nombre de lignes dans les en-têtes
+def flush_column_export(export):
+    export["rows"] += len(export["batches"]["seconds"])
+    for name, batch in export["batches"].items():
+        column_file = export["files"][name]
+        batch.tofile(column_file)
+        del batch[:]
+        column_file.seek(0)
+        column_file.write(npy_header(column_types[name][1], export["rows"]))
+        column_file.seek(0, os.SEEK_END)
+        column_file.flush()
+
+def close_column_export(export):
+    flush_column_export(export)
+    for column_file in export["files"].values():
+        column_file.close()
+
+# Ajoute à la fin de l'export les colonnes d'un autre export (morceaux de l'analyse parallèle)
+def append_column_export(export, part_directory):
+    flush_column_export(export)
+    part_rows = None
+    for name, column_file in export["files"].items():
+        with open(os.path.join(part_directory, f"{name}.npy"), "rb") as part_file:
+            part_file.seek(npy_header_size)
+            start = column_file.tell()
+            shutil.copyfileobj(part_file, column_file)
+            part_rows = (column_file.tell() - start) // export["batches"][name].itemsize
+    export["rows"] += part_rows
+    flush_column_export(export)  # Rien en attente : réécrit seulement les en-têtes
+
+# Relit l'export : un tableau numpy projeté en mémoire par colonne, sans copie
+def load_column_export(directory):
+    return {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r") for name in column_types}
+
+# Envoie chaque enregistrement à tous les consommateurs, écrit les lignes CSV et alimente l'index et l'export en colonnes
+# Le temps de chaque étape est cumulé localement (un appel à perf_counter par étape) et publié à chaque lot
+def consume_records(records, aggregates, writer, index_connection, column_export, flow_writer):
+    consumers = [update_counters, update_histograms, update_time_intervals, detect_suspicious_activity, update_flows]
+    stages = ["counters", "histograms", "time_intervals", "rules", "flows"]
+    if "distinct_sources" in aggregates:
+        consumers.append(update_distinct_counts)
+        stages.append("distinct_counts")
+    seconds = [0.0] * len(consumers)
+    csv_seconds = columns_seconds = 0.0
+    written = 0
+    batch = []
+
+    def publish_stage_times():
+        stage_times = {stage: (len(batch), stage_seconds) for stage, stage_seconds in zip(stages, seconds)}
+        stage_times["csv"] = (written, csv_seconds)
+        stage_times["columns"] = (written, columns_seconds)
+        add_stage_times(stage_times)
+
+    for record in records:
+        start = time.perf_counter()
+        for position, consumer in enumerate(consumers):
+            consumer(aggregates, record)
+            now = time.perf_counter()
+            seconds[position] += now - start
+            start = now
+        if record.flags is not None:
+            writer.writerow(csv_row(record))  # Écriture de la ligne CSV au fil de l'eau
+            now = time.perf_counter()
+            csv_seconds += now - start
+            add_column_row(column_export, record)
+            columns_seconds += time.perf_counter() - now
+            written += 1
+        batch.append(record)  # Les champs du Packet correspondent aux colonnes de l'index
+        if len(batch) >= index_batch_size:
+            publish_stage_times()
+            seconds = [0.0] * len(consumers)
+            csv_seconds = columns_seconds = 0.0
+            written = 0
+            with timed_stage("index"):
+                insert_packets(index_connection, batch)
+            with timed_stage("flows_csv"):
+                write_finished_flows(aggregates, flow_writer)
+            batch = []
+    publish_stage_times()
+    with timed_stage("index"):
+        insert_packets(index_connection, batch)
+    with timed_stage("flows_csv"):
+        write_finished_flows(aggregates, flow_writer)
+
+# Analyse du fichier en un seul passage
+# Chaque enregistrement est transmis à tous les consommateurs, y compris l'écriture du CSV
+# Le fichier peut être une sortie texte de tcpdump ou une capture pcap / pcapng, compressée avec gzip ou non
+def analyse_dump(file_path, csv_filename, index_filename, columns_directory, flows_filename, sketch_settings=None, rules=None):
+    aggregates = new_aggregates(sketch_settings, rules)
+    if not os.path.exists(file_path):
+        print(f"Le fichier n'existe pas à l'emplacement {os.path.abspath(file_path)}")
+        return aggregates
+    file_format, compressed = capture_format(file_path)
+
+    with open(csv_filename, mode='w', newline='', encoding='utf8') as csv_file, \
+            open(flows_filename, mode='w', newline='', encoding='utf8') as flows_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(csv_headers)
+        flow_writer = csv.writer(flows_file)
+        flow_writer.writerow(flow_csv_headers)
+        index_connection = create_packet_index(index_filename)
+        column_export = open_column_export(columns_directory)
+        if file_format == "text":
+            with open_text_dump(file_path, compressed) as dump_file:
+                consume_records(parse_dump(dump_file), aggregates, writer, index_connection, column_export, flow_writer)
+        else:
+            consume_records(parse_pcap(file_path), aggregates, writer, index_connection, column_export, flow_writer)
+        with timed_stage("flows_csv"):
+            write_finished_flows(aggregates, flow_writer, finish=True)
+        with timed_stage("index"):
+            finalize_packet_index(index_connection)
+        with timed_stage("columns"):
+            close_column_export(column_export)
+
+    return aggregates
+
+# Découpe le fichier en plages d'octets qui commencent et finissent sur un saut de ligne
+def split_dump(file_path, chunk_count):
+    file_size = os.path.getsize(file_path)
+    boundaries = [0]
+    with open(file_path, "rb") as file:
+        for i in range(1, chunk_count):
+            file.seek(file_size * i // chunk_count)
+            file.readline()  # Avance jusqu'à la fin de la ligne en cours
+            position = file.tell()
+            if boundaries[-1] < position < file_size:
+                boundaries.append(position)
+    boundaries.append(file_size)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+# Lit uniquement les lignes comprises dans une plage d'octets
+def read_chunk_lines(file, start, end):
+    file.seek(start)
+    position = start
+    while position < end:
+        raw_line = file.readline()
+        if not raw_line:
+            break
+        position += len(raw_line)
+        yield raw_line.decode("utf8")
+
+# Travail d'un processus : analyse d'une plage et écriture d'un morceau de CSV, d'index, d'export en colonnes et de flux
+# Retourne des agrégats partiels qui seront fusionnés dans l'ordre des plages
+# Les flux encore ouverts à la fin de la plage sont terminés : un flux à cheval sur deux plages compte deux fois
+# Les mesures de la plage sont renvoyées avec les agrégats
+# capture_state est l'état de lecture d'une capture pcap / pcapng au début de la plage (None pour une capture texte)
+def analyse_chunk(file_path, start, end, capture_state, csv_part, index_part, columns_part, flows_part, sketch_settings, rules):
+    reset_metrics()
+    aggregates = new_aggregates(sketch_settings, rules)
+    with open(file_path, "rb") as dump_file, open(csv_part, mode='w', newline='', encoding='utf8') as csv_file, \
+            open(flows_part, mode='w', newline='', encoding='utf8') as flows_file:
+        writer = csv.writer(csv_file)
+        flow_writer = csv.writer(flows_file)
+        index_connection = create_packet_index(index_part)
+        column_export = open_column_export(columns_part)
+        if capture_state is None:
+            records = parse_dump(read_chunk_lines(dump_file, start, end))
+        else:
+            records = parse_pcap(file_path, start, end, capture_state)
+        consume_records(records, aggregates, writer, index_connection, column_export, flow_writer)
+        write_finished_flows(aggregates, flow_writer, finish=True)
+        index_connection.commit()
+        index_connection.close()
+        close_column_export(column_export)
+    return aggregates, metrics_snapshot()
+
+# Fusionne des agrégats partiels dans les agrégats globaux
+# Les plages sont fusionnées dans l'ordre du fichier : le résultat est identique à une analyse séquentielle
+def merge_aggregates(aggregates, partial):
+    aggregates["ip_counter"].update(partial["ip_counter"])
+    aggregates["port_counter"].update(partial["port_counter"])
+    aggregates["ip_time_intervals"].update(partial["ip_time_intervals"])
+    merge_alerts(aggregates, partial)
+    aggregates["flow_count"] += partial["flow_count"]
+    top_flows = aggregates["top_flows"] + partial["top_flows"]
+    top_flows.sort(key=lambda flow: flow["bytes"], reverse=True)
+    aggregates["top_flows"] = top_flows[:top_flows_kept]
+    merge_histogram(aggregates["traffic_per_second"], partial["traffic_per_second"])
+    merge_histogram(aggregates["traffic_per_minute"], partial["traffic_per_minute"])
+    if "distinct_sources" in aggregates:
+        aggregates["distinct_sources"].update(partial["distinct_sources"])
+        aggregates["distinct_destinations"].update(partial["distinct_destinations"])
+        prune_time_intervals(aggregates)
+    return aggregates
+
+# Analyse du fichier en parallèle sur plusieurs processus
+# Une règle de débit peut manquer une rafale coupée en deux par la limite entre deux plages
+# Une capture compressée ne peut pas être découpée : elle est analysée sur un seul processus
+def analyse_dump_parallel(file_path, csv_filename, index_filename, columns_directory, flows_filename, workers, sketch_settings=None, rules=None):
+    aggregates = new_aggregates(sketch_settings, rules)
+    if not os.path.exists(file_path):
         print(f"Le fichier n'existe pas à l'emplacement {os.path.abspath(file_path)}")
+        return aggregates
+    file_format, compressed = capture_format(file_path)
+    if compressed:
+        print("Capture compressée : analyse sur un seul processus.")
+        return analyse_dump(file_path, csv_filename, index_filename, columns_directory, flows_filename, sketch_settings, rules)
+
+    # Plusieurs plages par processus pour équilibrer la charge
+    if file_format == "text":
+        ranges = [(start, end, None) for start, end in split_dump(file_path, workers * 4)]
+    else:
+        ranges = split_capture(file_path, workers * 4)  # Les plages commencent sur un enregistrement
+    csv_parts = [f"{csv_filename}.{index}.part" for index in range(len(ranges))]
+    index_parts = [f"{index_filename}.{index}.part" for index in range(len(ranges))]
+    columns_parts = [f"{columns_directory}.{index}.part" for index in range(len(ranges))]
+    flows_parts = [f"{flows_filename}.{index}.part" for index in range(len(ranges))]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=configure_index, initargs=(dict(index_settings),)) as executor:
+        partials = executor.map(
+            analyse_chunk,
+            [file_path] * len(ranges),
+            [start for start, _, _ in ranges],
+            [end for _, end, _ in ranges],
+            [capture_state for _, _, capture_state in ranges],
+            csv_parts,
+            index_parts,
+            columns_parts,
+            flows_parts,
+            [sketch_settings] * len(ranges),
+            [rules] * len(ranges),
+        )
+        for partial, partial_metrics in partials:  # Les résultats arrivent dans l'ordre des plages
+            merge_aggregates(aggregates, partial)
+            merge_metrics(partial_metrics)
+
+    # Reconstitution des fichiers finaux à partir des morceaux
+    merge_start = time.perf_counter()
+    merge_output_parts(list(zip(csv_parts, index_parts, columns_parts, flows_parts)), csv_filename, index_filename, columns_directory, flows_filename)
+    add_stage_times({"merge": (1, time.perf_counter() - merge_start)})
+
+    return aggregates
+
+# Reconstitue le CSV, l'index, l'export en colonnes et le CSV des flux à partir de morceaux (csv, index, colonnes, flux),
+# dans l'ordre de la liste. Les morceaux de l'analyse parallèle n'ont pas d'en-tête et sont supprimés ; ceux du cache
+# d'un répertoire (cached) sont des résultats complets d'analyse_dump : leur en-tête est sauté et ils sont gardés.
+def merge_output_parts(parts, csv_filename, index_filename, columns_directory, flows_filename, cached=False):
+    for output, headers, position in ((csv_filename, csv_headers, 0), (flows_filename, flow_csv_headers, 3)):
+        with open(output, mode='w', newline='', encoding='utf8') as output_file:
+            csv.writer(output_file).writerow(headers)
+            for part in parts:
+                with open(part[position], newline='', encoding='utf8') as part_file:
+                    if cached:
+                        part_file.readline()
+                    shutil.copyfileobj(part_file, output_file)
+                if not cached:
+                    os.remove(part[position])
+
+    # Index : les morceaux sont recopiés dans l'ordre
+    index_connection = create_packet_index(index_filename)
+    for _, index_part, _, _ in parts:
+        index_connection.execute("ATTACH DATABASE ? AS part", (index_part,))
+        index_connection.execute(
+            f"INSERT INTO packets ({', '.join(index_columns)}) SELECT {', '.join(index_columns)} FROM part.packets ORDER BY id"
+        )
+        index_connection.commit()
+        index_connection.execute("DETACH DATABASE part")
+        if not cached:
+            os.remove(index_part)
+    finalize_packet_index(index_connection)
+
+    column_export = open_column_export(columns_directory)
+    for _, _, columns_part, _ in parts:
+        append_column_export(column_export, columns_part)
+        if not cached:
+            shutil.rmtree(columns_part)
+    close_column_export(column_export)
+
+# Analyse d'un répertoire de captures (une capture par heure, par exemple)
+# Chaque fichier est analysé une seule fois par un processus ; son résultat (agrégats, CSV, index, colonnes, flux) est
+# gardé dans cache_directory avec un manifeste : chemin, taille, date de modification, empreinte SHA-256 du contenu
+# et réglages de l'analyse. Un fichier dont la taille et la date n'ont pas changé est relu depuis le cache ; si seule
+# la date a changé, l'empreinte est recalculée et le résultat est réutilisé si le contenu est identique.
+# Les résultats sont fusionnés dans l'ordre des noms de fichiers ; un flux à cheval sur deux fichiers compte pour deux.
+batch_cache_version = 1  # À changer quand la forme des agrégats change : les résultats en cache sont alors recalculés
+hash_chunk_size = 1 << 20  # Octets lus à la fois pour l'empreinte d'un fichier
+
+def file_digest(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(hash_chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# Fichiers du cache d'une capture ; le nom du dossier dépend du chemin complet
+def cache_entry(cache_directory, file_path):
+    name = hashlib.sha1(os.path.abspath(file_path).encode("utf8")).hexdigest()[:16]
+    directory = os.path.join(cache_directory, f"{name}_{os.path.basename(file_path)}")
+    return {
+        "directory": directory,
+        "manifest": os.path.join(directory, "manifest.json"),
+        "aggregates": os.path.join(directory, "agregats.pickle"),
+        "parts": (os.path.join(directory, csv_output), os.path.join(directory, index_output),
+                  os.path.join(directory, columns_output), os.path.join(directory, flows_output)),
+    }
+
+def read_manifest(entry):
+    try:
+        with open(entry["manifest"], encoding="utf8") as manifest_file:
+            return json.load(manifest_file)
+    except (OSError, ValueError):
         return None
 
-    data = []
-
-    for line in lines:
-        if "Flags" in line:  # Vérifie la présence d'un flag dans la ligne
-            parts = line.split()
-            if len(parts) >= 9:  # Vérifie qu'il y a suffisamment d'informations
-                timestamp = parts[0]
-                src_ip = parts[2]
-                dst_ip = parts[4]
-                flag = parts[6]
-
-                # Recherche de la longueur du paquet à partir de "length"
-                length = "N/A"
-                if "length" in line:  # Vérifie si "length" est présent dans la ligne
-                    try:
-                        length_index = parts.index("length") + 1
-                        if length_index < len(parts):
-                            length = parts[length_index]  # Récupère la valeur après "length"
-                    except ValueError:
-                        length = "N/A"  # Si "length" n'est pas dans parts, on garde "N/A"
-
-                # Ajout des données dans la liste
-                data.append([timestamp, src_ip, dst_ip, flag, length])
+def write_manifest(entry, manifest):
+    temporary_path = entry["manifest"] + ".tmp"
+    with open(temporary_path, "w", encoding="utf8") as manifest_file:
+        json.dump(manifest, manifest_file, ensure_ascii=False, indent=2)
+    os.replace(temporary_path, entry["manifest"])  # Le manifeste est écrit en dernier : il valide l'entrée
+
+# Le résultat en cache vaut pour ce fichier tant que la taille et la date de modification n'ont pas changé
+def cache_is_fresh(manifest, file_path, settings):
+    stat = os.stat(file_path)
+    return (manifest is not None and manifest["settings"] == settings and manifest["path"] == os.path.abspath(file_path)
+            and manifest["size"] == stat.st_size and manifest["mtime_ns"] == stat.st_mtime_ns)
 
+# Analyse d'un fichier dans son entrée du cache (exécutée par un processus de l'analyse du répertoire)
+# Retourne (réutilisé depuis le cache, mesures du processus)
+def analyse_cached_file(file_path, cache_directory, settings, sketch_settings, rules):
+    reset_metrics()
+    entry = cache_entry(cache_directory, file_path)
+    stat = os.stat(file_path)  # Avant l'empreinte : une modification pendant la lecture invalidera l'entrée
+    digest = file_digest(file_path)
+    manifest = read_manifest(entry)
+    if manifest is not None and manifest["settings"] == settings and manifest["size"] == stat.st_size and manifest["sha256"] == digest:
+        write_manifest(entry, {**manifest, "path": os.path.abspath(file_path), "mtime_ns": stat.st_mtime_ns})
+        return True, metrics_snapshot()
+
+    if os.path.exists(entry["manifest"]):
+        os.remove(entry["manifest"])
+    os.makedirs(entry["directory"], exist_ok=True)
+    csv_part, index_part, columns_part, flows_part = entry["parts"]
+    aggregates = analyse_dump(file_path, csv_part, index_part, columns_part, flows_part, sketch_settings, rules)
+    with open(entry["aggregates"], "wb") as aggregates_file:
+        pickle.dump(aggregates, aggregates_file, protocol=pickle.HIGHEST_PROTOCOL)
+    write_manifest(entry, {"path": os.path.abspath(file_path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                           "sha256": digest, "settings": settings})
+    return False, metrics_snapshot()
+
+# Captures d'un répertoire, dans l'ordre des noms (fichiers cachés et sous-dossiers ignorés)
+def directory_captures(directory):
+    return [os.path.join(directory, name) for name in sorted(os.listdir(directory))
+            if not name.startswith(".") and os.path.isfile(os.path.join(directory, name))]
+
+# Adresses IP suivies par un compteur, en tableau trié (pour comparer deux fichiers)
+def counter_addresses(ip_counter):
+    if isinstance(ip_counter, IPv4Counter):
+        ip_counter.flush()
+        return ip_counter.keys
+    return np.array(sorted(ip_counter.counts), dtype=np.uint32)
+
+# Résumé d'un fichier et écarts avec le fichier précédent (None pour le premier)
+def file_summary(file_path, aggregates, cached, previous):
+    per_second = aggregates["traffic_per_second"]
+    addresses = counter_addresses(aggregates["ip_counter"])
+    summary = {
+        "name": os.path.basename(file_path),
+        "cached": cached,
+        "packets": int(histogram_values(per_second["packets"]).sum()),
+        "bytes": int(histogram_values(per_second["bytes"]).sum()),
+        "alerts": sum(aggregates["rule_hits"].values()),
+        "addresses": addresses,
+        "top_ip": aggregates["ip_counter"].most_common(1),
+        "new_ips": None,
+        "gone_ips": None,
+    }
+    if previous is not None:
+        summary["new_ips"] = len(np.setdiff1d(addresses, previous["addresses"], assume_unique=True))
+        summary["gone_ips"] = len(np.setdiff1d(previous["addresses"], addresses, assume_unique=True))
+    return summary
+
+def analyse_directory(directory, csv_filename, index_filename, columns_directory, flows_filename, cache_directory, workers, sketch_settings=None, rules=None):
+    aggregates = new_aggregates(sketch_settings, rules)
+    captures = directory_captures(directory)
+    if not captures:
+        print(f"Aucune capture dans le répertoire {os.path.abspath(directory)}")
+        return aggregates, []
+    settings = {"version": batch_cache_version, "sketch_settings": sketch_settings, "rules": default_rules if rules is None else rules,
+                "index_lines": index_settings["lines"]}
+    entries = [cache_entry(cache_directory, file_path) for file_path in captures]
+    cached = [cache_is_fresh(read_manifest(entry), file_path, settings) for file_path, entry in zip(captures, entries)]
+    stale = [file_path for file_path, fresh in zip(captures, cached) if not fresh]
+
+    os.makedirs(cache_directory, exist_ok=True)
+    if stale:
+        reused = {}  # Fichier -> résultat réutilisé (date changée, contenu identique)
+        with ProcessPoolExecutor(max_workers=workers, initializer=configure_index, initargs=(dict(index_settings),)) as executor:
+            results = executor.map(analyse_cached_file, stale, [cache_directory] * len(stale), [settings] * len(stale),
+                                   [sketch_settings] * len(stale), [rules] * len(stale))
+            for file_path, (from_cache, file_metrics) in zip(stale, results):
+                reused[file_path] = from_cache
+                merge_metrics(file_metrics)
+        cached = [fresh or reused[file_path] for file_path, fresh in zip(captures, cached)]
+    print(f"{len(captures)} captures : {len(captures) - cached.count(True)} analysées, {cached.count(True)} relues depuis le cache")
+
+    merge_start = time.perf_counter()
+    summaries = []
+    for file_path, entry, from_cache in zip(captures, entries, cached):
+        with open(entry["aggregates"], "rb") as aggregates_file:
+            partial = pickle.load(aggregates_file)
+        summaries.append(file_summary(file_path, partial, from_cache, summaries[-1] if summaries else None))
+        merge_aggregates(aggregates, partial)
+    merge_output_parts([entry["parts"] for entry in entries], csv_filename, index_filename, columns_directory, flows_filename, cached=True)
+    add_stage_times({"merge": (1, time.perf_counter() - merge_start)})
+    return aggregates, summaries
+
+# Mode suivi : état sauvegardé sur disque
+# L'état contient la position atteinte dans le fichier, l'inode du fichier et les agrégats
+# Un état d'une version précédente (agrégats de forme différente) est ignoré : l'analyse repart du début
+checkpoint_version = 2  # 2 : adresses IPv4 en entiers
+
+def load_checkpoint(checkpoint_path, file_path):
+    if os.path.exists(checkpoint_path) and os.path.exists(file_path):
+        with open(checkpoint_path, "rb") as checkpoint_file:
+            state = pickle.load(checkpoint_file)
+        stat = os.stat(file_path)
+        # Même fichier et pas tronqué : on reprend là où on s'était arrêté
+        if state.get("version") == checkpoint_version and state["file_path"] == os.path.abspath(file_path) and state["inode"] == stat.st_ino and state["offset"] <= stat.st_size:
+            return state
+    return None
+
+def save_checkpoint(checkpoint_path, state):
+    temporary_path = checkpoint_path + ".tmp"
+    with open(temporary_path, "wb") as checkpoint_file:
+        pickle.dump(state, checkpoint_file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary_path, checkpoint_path)  # Remplacement atomique
+
+# Lit les lignes complètes ajoutées depuis la position enregistrée
+# Une ligne sans saut de ligne final est en cours d'écriture par tcpdump : elle sera lue au tour suivant
+def read_appended_lines(file, state):
+    file.seek(state["offset"])
+    for raw_line in file:
+        if not raw_line.endswith(b"\n"):
+            break
+        state["offset"] += len(raw_line)
+        yield raw_line.decode("utf8")
+
+# Nouvel état de suivi : CSV, index, export en colonnes et flux repartent de zéro
+# Les flux encore ouverts restent dans l'état et sont écrits quand ils se terminent
+def new_follow_state(file_path, csv_filename, index_filename, columns_directory, flows_filename, sketch_settings=None, rules=None):
+    with open(csv_filename, mode='w', newline='', encoding='utf8') as csv_file:
+        csv.writer(csv_file).writerow(csv_headers)
+    with open(flows_filename, mode='w', newline='', encoding='utf8') as flows_file:
+        csv.writer(flows_file).writerow(flow_csv_headers)
+    finalize_packet_index(create_packet_index(index_filename))
+    close_column_export(open_column_export(columns_directory))
+    return {"version": checkpoint_version, "file_path": os.path.abspath(file_path), "inode": None, "offset": 0, "aggregates": new_aggregates(sketch_settings, rules)}
+
+# Suit un fichier de capture qui grandit et met à jour les résultats au fil de l'eau
+def follow_dump(file_path, csv_filename, index_filename, columns_directory, flows_filename, checkpoint_path, interval, sketch_settings=None, rules=None):
+    state = load_checkpoint(checkpoint_path, file_path)
+    if state is None:
+        state = new_follow_state(file_path, csv_filename, index_filename, columns_directory, flows_filename, sketch_settings, rules)  # Premier lancement
+    else:
+        print(f"Reprise du suivi à l'octet {state['offset']}")
+        state["aggregates"]["rules"] = compile_rules(default_rules if rules is None else rules)  # Les règles ont pu changer
+
+    generate_markdown(state["aggregates"], markdown_output)
+    publish_chart_data(state["aggregates"])
+    publish_api_data(state["aggregates"])
+    index_connection = open_packet_index(index_filename)
+    column_export = open_column_export(columns_directory, append=True)
+    try:
+        while True:
+            if os.path.exists(file_path):
+                stat = os.stat(file_path)
+                if state["inode"] is not None and (stat.st_ino != state["inode"] or stat.st_size < state["offset"]):
+                    # Rotation ou troncature du fichier : on repart de zéro
+                    print("Le fichier suivi a été remplacé ou tronqué, nouvelle analyse depuis le début.")
+                    index_connection.close()
+                    close_column_export(column_export)
+                    state = new_follow_state(file_path, csv_filename, index_filename, columns_directory, flows_filename, sketch_settings, rules)
+                    index_connection = open_packet_index(index_filename)
+                    column_export = open_column_export(columns_directory, append=True)
+                state["inode"] = stat.st_ino
+                if stat.st_size > state["offset"]:
+                    with open(file_path, "rb") as dump_file, open(csv_filename, mode='a', newline='', encoding='utf8') as csv_file, \
+                            open(flows_filename, mode='a', newline='', encoding='utf8') as flows_file:
+                        writer = csv.writer(csv_file)
+                        consume_records(parse_dump(read_appended_lines(dump_file, state)), state["aggregates"], writer, index_connection, column_export, csv.writer(flows_file))
+                    index_connection.commit()
+                    flush_column_export(column_export)
+                    save_checkpoint(checkpoint_path, state)  # Après l'écriture du CSV, de l'index et des colonnes
+                    generate_markdown(state["aggregates"], markdown_output)
+                    publish_chart_data(state["aggregates"])
+                    publish_api_data(state["aggregates"])
+            time.sleep(interval)
+    finally:
+        index_connection.close()
+        close_column_export(column_export)
+
+# Mode direct : lecture de tcpdump avec asyncio et envoi des mises à jour au navigateur
+# Le lecteur analyse chaque ligne dès son arrivée ; les mises à jour sont regroupées par intervalle (tick)
+# La dernière mise à jour est publiée dans live_state : l'application web la lit sans jamais bloquer le lecteur
+live_state = {
+    "enabled": False,  # Vrai quand l'application tourne en mode direct
+    "sequence": 0,  # Numéro de la dernière mise à jour publiée
+    "update": None,  # Dernière mise à jour (dictionnaire sérialisable en JSON)
+    "condition": threading.Condition(),  # Réveille les clients en attente d'une mise à jour
+}
+
+# Sources de lignes : entrée standard, sous-processus tcpdump ou rejeu d'une capture enregistrée
+# connect_read_pipe n'accepte que les tubes, sockets et terminaux : une capture redirigée depuis un fichier
+# (< capture.txt) est lue ligne par ligne dans un thread de l'exécuteur par défaut
+async def read_stdin_lines():
+    loop = asyncio.get_running_loop()
+    mode = os.fstat(sys.stdin.fileno()).st_mode
+    if not (S_ISFIFO(mode) or S_ISSOCK(mode) or S_ISCHR(mode)):
+        while line := await loop.run_in_executor(None, sys.stdin.readline):
+            yield line
+        return
+    reader = asyncio.StreamReader()
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+    while line := await reader.readline():
+        yield line.decode("utf8", errors="replace")
+
+async def read_tcpdump_lines(interface):
+    # -l : sortie ligne par ligne, -n : adresses et ports numériques
+    process = await asyncio.create_subprocess_exec("tcpdump", "-l", "-n", "-i", interface, stdout=asyncio.subprocess.PIPE)
+    try:
+        while line := await process.stdout.readline():
+            yield line.decode("utf8", errors="replace")
+    finally:
+        if process.returncode is None:
+            process.terminate()
+
+async def replay_dump_lines(file_path, speed):
+    # Rejoue une capture en respectant l'écart entre les timestamps (divisé par speed)
+    previous = None
+    with open(file_path, "r", encoding="utf8") as dump_file:
+        for line in dump_file:
+            match = packet_pattern.match(line)
+            if match and speed > 0:
+                current = timestamp_to_seconds(match.group("timestamp"))
+                if previous is not None and current > previous:
+                    await asyncio.sleep((current - previous) / speed)
+                previous = current
+            else:
+                await asyncio.sleep(0)  # Laisse la main au tick même sans pause
+            yield line
+
+# Publie une mise à jour et réveille les clients connectés
+def publish_live_update(update):
+    with live_state["condition"]:
+        live_state["sequence"] += 1
+        update["sequence"] = live_state["sequence"]
+        live_state["update"] = update
+        live_state["condition"].notify_all()
+
+# Rapport Markdown et données des graphiques et de l'API après un tick
+def publish_live_report(aggregates):
+    generate_markdown(aggregates, markdown_output)
+    publish_chart_data(aggregates)
+    publish_api_data(aggregates)
+
+# Analyse en direct : chaque ligne est analysée à son arrivée puis regroupée jusqu'au prochain tick
+async def live_capture(lines, csv_filename, index_filename, columns_directory, flows_filename, tick, sketch_settings=None, rules=None):
+    aggregates = new_aggregates(sketch_settings, rules)
+    pending = []  # Paquets reçus depuis le dernier tick
+    oldest_line_at = [None]  # Heure de lecture de la plus ancienne ligne en attente
+    finished = asyncio.Event()
+    loop = asyncio.get_running_loop()
+
+    async def reader():
+        async for line in lines:
+            start = time.perf_counter()
+            record = parse_line(line)
+            add_parse_metrics(1, len(line), record is None, time.perf_counter() - start)
+            if record is not None:
+                if not pending:
+                    oldest_line_at[0] = time.time()
+                pending.append(record)
+        finished.set()
+
+    with open(csv_filename, mode='w', newline='', encoding='utf8') as csv_file, \
+            open(flows_filename, mode='w', newline='', encoding='utf8') as flows_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(csv_headers)
+        flow_writer = csv.writer(flows_file)
+        flow_writer.writerow(flow_csv_headers)
+        finalize_packet_index(create_packet_index(index_filename))
+        index_connection = open_packet_index(index_filename)
+        column_export = open_column_export(columns_directory)
+        reader_task = asyncio.create_task(reader())
+        packets_total = 0
+        try:
+            while not finished.is_set() or pending:
+                try:
+                    await asyncio.wait_for(finished.wait(), timeout=tick)
+                except asyncio.TimeoutError:
+                    pass
+                batch = pending[:]
+                pending.clear()
+                batch_oldest_line_at = oldest_line_at[0]
+                if batch:
+                    consume_records(batch, aggregates, writer, index_connection, column_export, flow_writer)
+                    index_connection.commit()
+                    flush_column_export(column_export)
+                    csv_file.flush()
+                    flows_file.flush()
+                    # Rapport et données publiées dans un thread : la boucle continue de lire les lignes pendant ce temps
+                    # (le lecteur ne touche qu'à pending, les agrégats ne changent pas avant la fin du rapport)
+                    await loop.run_in_executor(None, publish_live_report, aggregates)
+                packets_total += len(batch)
+                published_at = time.time()
+                publish_live_update({
+                    "packets_total": packets_total,
+                    "packets_tick": len(batch),
+                    "top_ips": [(int_to_ip(ip), count) for ip, count in aggregates["ip_counter"].most_common(5)],
+                    "top_ports": aggregates["port_counter"].most_common(5),
+                    "suspicious_total": len(aggregates["alerts"]),
+                    "oldest_line_at": batch_oldest_line_at if batch else None,
+                    "published_at": published_at,
+                    # Latence côté serveur : lecture de la ligne la plus ancienne -> publication
+                    "server_latency_ms": round((published_at - batch_oldest_line_at) * 1000, 1) if batch else None,
+                })
+            write_finished_flows(aggregates, flow_writer, finish=True)  # Fin de la capture
+        finally:
+            reader_task.cancel()
+            index_connection.close()
+            close_column_export(column_export)
+    return aggregates
+
+# Histogramme par seconde d'une adresse IP ou d'un port, calculé à partir de l'index des paquets
+# Seules les lignes de cette clé sont lues : la capture n'est pas relue
+def key_histogram(db_path, kind, key):
+    histogram = new_histogram(1)
+    src_column, dst_column = ("src_ip", "dst_ip") if kind == "ip" else ("src_port", "dst_port")
+    connection = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        rows = connection.execute(
+            f"SELECT CAST(seconds AS INTEGER), COUNT(*), TOTAL(length) FROM packets"
+            f" WHERE {src_column} = ? OR {dst_column} = ? GROUP BY 1",
+            (key, key),
+        )
+        for second, packets, total_bytes in rows:
+            histogram["packets"][second] = packets
+            histogram["bytes"][second] = int(total_bytes)
+    finally:
+        connection.close()
+    return histogram
+
+# Affichage d'une case d'histogramme (HH:MM:SS, ou HH:MM pour les minutes)
+def format_bucket(bucket, bucket_seconds):
+    text = format_seconds(bucket * bucket_seconds)[:8]
+    return text[:5] if bucket_seconds == 60 else text
+
+# Section Markdown sur l'évolution du trafic dans le temps
+def time_series_markdown(aggregates, index_filename, top_n=5):
+    per_second = aggregates["traffic_per_second"]
+    per_minute = aggregates["traffic_per_minute"]
+    markdown_content = "\n## Activité dans le temps\n"
+    period = active_range(per_second["packets"])
+    if period is None:
+        return markdown_content + "Aucun paquet horodaté.\n"
+
+    busiest_second, busiest_packets = busiest_window(per_second["packets"], 1)
+    window_start, window_packets = busiest_window(per_second["packets"], 10)
+    markdown_content += f"- **Période** : {format_bucket(period[0], 1)} → {format_bucket(period[1], 1)}\n"
+    markdown_content += (f"- **Seconde la plus chargée** : {format_bucket(busiest_second, 1)} "
+                         f"({busiest_packets} paquets, {per_second['bytes'][busiest_second]} octets)\n")
+    markdown_content += (f"- **Fenêtre de 10 s la plus chargée** : {format_bucket(window_start, 1)} → "
+                         f"{format_bucket(window_start + 9, 1)} ({window_packets} paquets)\n")
+    bursts = find_bursts(per_second["packets"])
+    if bursts:
+        markdown_content += "- **Pics de trafic** (plus de 3 fois la moyenne par seconde) : "
+        markdown_content += ", ".join(f"{format_bucket(second, 1)} ({packets} paquets)" for second, packets in bursts)
+        markdown_content += "\n"
+
+    # Seules les minutes les plus chargées sont listées : la série complète est servie par /api/time_series?resolution=60
+    first_minute, last_minute = active_range(per_minute["packets"])
+    markdown_content += f"\n### Les {busiest_minutes_listed} minutes les plus chargées\n"
+    markdown_content += (f"- **Minutes actives** : {int(np.count_nonzero(histogram_values(per_minute['packets'])))} "
+                         f"entre {format_bucket(first_minute, 60)} et {format_bucket(last_minute, 60)}\n")
+    for minute, _ in busiest_buckets(per_minute["packets"], busiest_minutes_listed):
+        markdown_content += (f"- **{format_bucket(minute, 60)}** : {per_minute['packets'][minute]} paquets, "
+                             f"{per_minute['bytes'][minute]} octets\n")
+
+    # Pic par seconde et minute la plus chargée pour les adresses IP et ports les plus actifs
+    if index_filename and os.path.exists(index_filename):
+        markdown_content += f"\n### Pics des {top_n} adresses IP et ports les plus actifs\n"
+        keys = [("ip", ip, int_to_ip(ip)) for ip, _ in aggregates["ip_counter"].most_common(top_n)]
+        keys += [("port", port, f"Port {port}") for port, _ in aggregates["port_counter"].most_common(top_n)]
+        for kind, key, label in keys:
+            packets = key_histogram(index_filename, kind, key)["packets"]
+            peak_second, peak_packets = busiest_window(packets, 1)
+            minute_start, minute_packets = busiest_window(packets, 60)
+            markdown_content += (f"- **{label}** : pic à {format_bucket(peak_second, 1)} ({peak_packets} paquets/s), "
+                                 f"minute la plus chargée à partir de {format_bucket(minute_start, 1)} ({minute_packets} paquets)\n")
+    return markdown_content
+
+# Section Markdown des flux TCP les plus volumineux
+def top_flows_markdown(aggregates):
+    markdown_content = f"\n## Top {top_flows_size} des flux TCP\n"
+    markdown_content += f"- **Flux terminés** : {aggregates['flow_count']}\n"
+    markdown_content += f"- **Flux encore ouverts** : {len(aggregates['flows']) + len(aggregates['closing_flows'])}\n"
+    for flow in aggregates["top_flows"][:top_flows_size]:
+        duration = flow["end"] - flow["start"]
+        markdown_content += f"- **{flow['source']} → {flow['destination']}** : {flow['bytes']} octets, {flow['packets']} paquets,"
+        markdown_content += f" {duration:.3f} s à partir de {format_seconds(flow['start'])} ({flow_state(flow)})\n"
+    return markdown_content
+
+# Écriture d'un fichier Markdown sous un nom temporaire puis remplacement atomique :
+# l'application web ne lit jamais un fichier à moitié écrit
+def write_markdown_file(output_file, write_content):
+    temporary_path = output_file + ".tmp"
+    with open(temporary_path, "w", encoding="utf8") as md_file:
+        write_content(md_file)
+    os.replace(temporary_path, output_file)
+
+def alert_markdown(alert):
+    target = f" → {alert['destination']}" if alert["destination"] else ""
+    port = f" (port {alert['port']})" if alert["port"] is not None else ""
+    markdown_content = f"- **{alert['rule']}** : {alert['source']}{target}{port}, {alert['count']} paquets"
+    markdown_content += f" (de {alert['first_seen']} à {alert['last_seen']})\n"
+    markdown_content += f"  - Exemple : `{alert['example']}`\n"
+    markdown_content += f"  - Raison : {alert['reason']}\n\n"
+    return markdown_content
+
+def alert_page_path(page_number):
+    return os.path.join(report_pages_directory, f"page_{page_number}.md")
+
+# Nombre de pages de détail des alertes écrites par la dernière analyse
+def alert_page_count():
+    page_count = 0
+    while os.path.exists(alert_page_path(page_count + 1)):
+        page_count += 1
+    return page_count
+
+# Empreinte du contenu de chaque page d'alertes écrite par ce processus : numéro de page -> SHA-1
+alert_page_digests = {}
+
+# Détail des alertes, alerts_per_page par page ; les pages en trop d'une analyse précédente sont supprimées
+# Seules les pages nouvelles ou modifiées sont réécrites : en mode suivi ou direct, la plupart des pages
+# ne changent pas d'une mise à jour à l'autre. Le nombre de pages n'apparaît pas dans les pages pour la même raison
+# (l'application web l'affiche à côté de la navigation)
+def write_alert_pages(alerts):
+    os.makedirs(report_pages_directory, exist_ok=True)
+    page_count = (len(alerts) + alerts_per_page - 1) // alerts_per_page
+    for page_number in range(1, page_count + 1):
+        page_alerts = alerts[(page_number - 1) * alerts_per_page:page_number * alerts_per_page]
+        content = f"## Activités suspectes, page {page_number}\n" + "".join(alert_markdown(alert) for alert in page_alerts)
+        digest = hashlib.sha1(content.encode("utf8")).hexdigest()
+        if alert_page_digests.get(page_number) == digest and os.path.exists(alert_page_path(page_number)):
+            continue
+        write_markdown_file(alert_page_path(page_number), lambda md_file: md_file.write(content))
+        alert_page_digests[page_number] = digest
+    stale_page = page_count + 1
+    while os.path.exists(alert_page_path(stale_page)):
+        os.remove(alert_page_path(stale_page))
+        stale_page += 1
+    for page_number in [page_number for page_number in alert_page_digests if page_number > page_count]:
+        del alert_page_digests[page_number]
+    return page_count
+
+# Résumé par règle : nombre d'alertes, sources distinctes et quelques lignes d'exemple
+def rule_summaries(alerts):
+    summaries = {}
+    for alert in alerts:  # Les alertes sont triées par nombre de paquets décroissant
+        summary = summaries.setdefault(alert["rule"], {"reason": alert["reason"], "alerts": 0, "sources": set(), "examples": []})
+        summary["alerts"] += 1
+        summary["sources"].add(alert["source"])
+        if len(summary["examples"]) < rule_sample_size:
+            summary["examples"].append(alert["example"])
+    return summaries
+
+# Section Markdown de l'analyse d'un répertoire : un point par fichier, avec les écarts avec le fichier précédent
+def files_markdown(summaries):
+    markdown_content = f"## Fichiers analysés ({len(summaries)})\n"
+    previous = None
+    for summary in summaries:
+        markdown_content += f"- **{summary['name']}**{' (cache)' if summary['cached'] else ''} : {summary['packets']} paquets"
+        if previous is not None and previous["packets"]:
+            markdown_content += f" ({(summary['packets'] - previous['packets']) / previous['packets']:+.1%})"
+        markdown_content += f", {summary['bytes']} octets, {summary['alerts']} paquets suspects"
+        if previous is not None:
+            markdown_content += f" ({summary['alerts'] - previous['alerts']:+d})"
+        markdown_content += f", {len(summary['addresses'])} adresses IP"
+        if previous is not None:
+            markdown_content += f" ({summary['new_ips']} nouvelles, {summary['gone_ips']} disparues)"
+        if summary["top_ip"]:
+            ip, count = summary["top_ip"][0]
+            markdown_content += f", IP la plus active : {int_to_ip(ip)} ({count})"
+        markdown_content += "\n"
+        previous = summary
+    return markdown_content + "\n"
+
+# Génération du fichier Markdown
+# Le rapport est écrit section par section dans le fichier ; le détail des alertes est réparti sur des pages
+# Sans index (modes suivi et direct), les pics par adresse IP et par port ne sont pas calculés
+# file_summaries (analyse d'un répertoire) ajoute le résumé de chaque fichier
+def generate_markdown(aggregates, output_file, index_filename=None, file_summaries=None):
+    start = time.perf_counter()
+    ip_counter = aggregates["ip_counter"]
+    port_counter = aggregates["port_counter"]
+    ip_time_intervals = aggregates["ip_time_intervals"]
+    alerts = sorted(aggregates["alerts"].values(), key=lambda alert: alert["count"], reverse=True)
+    page_count = write_alert_pages(alerts)  # Avant le résumé, qui sert de version aux pages
+
+    def write_report(md_file):
+        md_file.write("# Analyse du trafic réseau\n\n")
+        if isinstance(ip_counter, SpaceSaving):
+            md_file.write("## Mode approximatif\n")
+            md_file.write(f"- Compteurs limités à {ip_counter.capacity} clés : chaque total peut être surestimé")
+            md_file.write(f" d'au plus {ip_counter.error_bound()} (IP) et {port_counter.error_bound()} (ports)\n")
+            sources = aggregates["distinct_sources"]
+            md_file.write(f"- Adresses IP sources distinctes : environ {sources.count()} (± {sources.relative_error():.1%})\n")
+            md_file.write(f"- Adresses IP destinations distinctes : environ {aggregates['distinct_destinations'].count()}\n\n")
+        if file_summaries:
+            md_file.write(files_markdown(file_summaries))
+        md_file.write("## Top 10 des adresses IP\n")
+        for ip, count in ip_counter.most_common(10):  # Pour les 10 IP les plus fréquentes
+            first_seen, last_seen = (format_seconds(seconds) for seconds in ip_time_intervals.get(ip))
+            md_file.write(f"- **{int_to_ip(ip)}** : {count} occurrences (Première apparition : {first_seen}, Dernière apparition : {last_seen})\n")
+
+        md_file.write("\n## Sous-réseaux les plus actifs\n")
+        for prefix_length, subnets in subnet_rollups(ip_counter).items():
+            top = ", ".join(f"{network_label(network, prefix_length)} ({count})" for network, count in top_subnets(subnets, 5))
+            md_file.write(f"- **/{prefix_length}** : {top or 'aucun'}\n")
+
+        md_file.write("\n## Top 10 des ports\n")
+        for port, count in port_counter.most_common(10):  # Pour les 10 ports les plus utilisés
+            md_file.write(f"- **Port {port}** : {count} occurrences\n")
+
+        md_file.write(time_series_markdown(aggregates, index_filename))
+        md_file.write(top_flows_markdown(aggregates))
+
+        md_file.write("\n## Analyse détaillée des activités suspectes\n")
+        if alerts:  # Si des activités suspectes ont été détectées
+            md_file.write(f"{len(alerts)} alertes, détaillées sur {page_count} pages (par nombre de paquets décroissant).\n\n")
+            for rule, summary in rule_summaries(alerts).items():
+                md_file.write(f"### {rule}\n")
+                md_file.write(f"- **Raison** : {summary['reason']}\n")
+                md_file.write(f"- **Alertes** : {summary['alerts']} ({aggregates['rule_hits'][rule]} paquets, {len(summary['sources'])} sources)\n")
+                md_file.write("- **Exemples** :\n")
+                for example in summary["examples"]:
+                    md_file.write(f"  - `{example}`\n")
+                md_file.write("\n")
+            if aggregates["alerts_dropped"]:
+                md_file.write(f"{aggregates['alerts_dropped']} occurrences non regroupées (limite de {max_alerts} alertes atteinte).\n")
+        else:
+            md_file.write("Aucune activité suspecte détectée.\n")
+
+    write_markdown_file(output_file, write_report)
+    add_stage_times({"report": (1, time.perf_counter() - start)})
+
+# Graphiques rendus à la demande par l'application web
+# Les données sans filtre sont publiées par l'analyse ; avec un filtre, elles sont lues dans l'index
+# subnets garde les totaux par sous-réseau de toute l'analyse : le total d'un /8, /16 ou /24 filtré est lu sans requête
+chart_state = {"top_ips": [], "top_ports": [], "top_subnets": [], "subnets": {}}  # Dernières données publiées (remplacées d'un bloc)
+
+def publish_chart_data(aggregates):
+    subnets = subnet_rollups(aggregates["ip_counter"])
+    chart_state.update({
+        "top_ips": [(int_to_ip(ip), count) for ip, count in aggregates["ip_counter"].most_common(10)],
+        "top_ports": aggregates["port_counter"].most_common(10),
+        "top_subnets": [(network_label(network, 24), count) for network, count in top_subnets(subnets[24], 10)],
+        "subnets": subnets,
+    })
+
+# Regroupements par sous-réseau : longueur de préfixe -> {réseau (adresse >> (32 - longueur)) : occurrences}
+# En mode approximatif, seules les adresses suivies par le compteur sont regroupées
+def subnet_rollups(ip_counter):
+    if isinstance(ip_counter, IPv4Counter):
+        return {prefix_length: ip_counter.subnets(prefix_length) for prefix_length in subnet_prefixes}
+    rollups = {prefix_length: Counter() for prefix_length in subnet_prefixes}
+    for ip, count in ip_counter.items():
+        for prefix_length in subnet_prefixes:
+            rollups[prefix_length][ip >> (32 - prefix_length)] += count
+    return rollups
+
+def top_subnets(subnets, n):
+    return heapq.nsmallest(n, subnets.items(), key=lambda item: (-item[1], item[0]))
+
+def draw_top_ips(axes, items):
+    ips, counts = zip(*items) if items else ([], [])
+    axes.bar(ips, counts)
+    axes.set_xlabel("IP Addresses")
+    axes.set_ylabel("Occurrences")
+    axes.set_title("Top 10 IP Addresses")
+    axes.tick_params(axis="x", labelrotation=45)
+
+def draw_top_subnets(axes, items):
+    networks, counts = zip(*items) if items else ([], [])
+    axes.bar(networks, counts, color="green")
+    axes.set_xlabel("Sous-réseaux /24")
+    axes.set_ylabel("Occurrences")
+    axes.set_title("Top 10 des sous-réseaux /24")
+    axes.tick_params(axis="x", labelrotation=45)
+
+def draw_top_ports(axes, items):
+    ports, counts = zip(*items) if items else ([], [])
+    ports = [str(port) for port in ports]  # Les ports sont des entiers : on les affiche comme des étiquettes
+    axes.bar(ports, counts, color='orange')
+    axes.set_xlabel('Ports')
+    axes.set_ylabel('Nombre d\'occurrences')
+    axes.set_title('Top 10 des ports')
+    axes.tick_params(axis="x", labelrotation=45)
+
+def draw_port_distribution(axes, items):
+    if items:
+        axes.pie([count for _, count in items], labels=[f"Port {port}" for port, _ in items], autopct='%1.1f%%', startangle=140)
+    axes.set_title("Port Distribution")
+
+# Nom du graphique -> (fonction de dessin, données utilisées, taille de la figure)
+charts = {
+    "top_ips": (draw_top_ips, "top_ips", (6.4, 4.8)),
+    "top_ports": (draw_top_ports, "top_ports", (10, 6)),
+    "port_distribution": (draw_port_distribution, "top_ports", (8, 8)),
+    "top_subnets": (draw_top_subnets, "top_subnets", (6.4, 4.8)),
+}
+
+# Rendu d'un graphique en PNG avec le moteur Agg
+def render_chart(name, items, filter_label):
+    draw, _, size = charts[name]
+    figure = Figure(figsize=size)
+    axes = figure.subplots()
+    draw(axes, items)
+    if filter_label:
+        axes.set_title(f"{axes.get_title()} ({filter_label})")
+    figure.tight_layout()
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format="png")
+    return buffer.getvalue()
+
+# Cache des graphiques sur disque, limité en taille et vidé du moins récemment utilisé au plus récent
+# Le nom d'un fichier est le hachage du graphique, du filtre et des données : un graphique n'est dessiné
+# que si ses données ont changé, sinon il est relu sur le disque
+chart_cache_directory = os.path.join("static", "charts")
+chart_cache_max_bytes = 20 * 1024 * 1024  # Taille maximale du cache des graphiques
+chart_cache_state = {"files": None, "size": 0, "lock": threading.Lock()}  # files : nom -> taille, du plus ancien au plus récent
+
+# Relit le contenu du cache au premier appel ; la date de modification donne l'ordre d'utilisation
+# Le dossier est créé à ce moment-là et non à l'import du module
+def load_chart_cache():
+    os.makedirs(chart_cache_directory, exist_ok=True)
+    entries = [entry for entry in os.scandir(chart_cache_directory) if entry.name.endswith(".png")]
+    entries.sort(key=lambda entry: entry.stat().st_mtime_ns)
+    chart_cache_state["files"] = OrderedDict((entry.name, entry.stat().st_size) for entry in entries)
+    chart_cache_state["size"] = sum(chart_cache_state["files"].values())
+
+# Retourne le PNG d'un graphique et son hachage (utilisé comme ETag)
+def cached_chart(name, ip_filter, port_filter, items):
+    key = hashlib.sha1(repr((name, ip_filter, port_filter, items)).encode("utf8")).hexdigest()
+    filename = key + ".png"
+    path = os.path.join(chart_cache_directory, filename)
+    with chart_cache_state["lock"]:
+        if chart_cache_state["files"] is None:
+            load_chart_cache()
+        files = chart_cache_state["files"]
+        if filename in files:
+            try:
+                with open(path, "rb") as png_file:
+                    png = png_file.read()
+                files.move_to_end(filename)
+                os.utime(path)  # L'ordre d'utilisation est conservé d'un lancement à l'autre
+                add_counter("chart_cache_hits")
+                return png, key
+            except FileNotFoundError:  # Fichier supprimé à la main : on le redessine
+                chart_cache_state["size"] -= files.pop(filename)
+
+    filter_label = ", ".join(part for part in (ip_filter, f"port {port_filter}" if port_filter else "") if part)
+    with timed_stage("charts"):
+        png = render_chart(name, items, filter_label)
+    add_counter("chart_cache_misses")
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "wb") as png_file:
+        png_file.write(png)
+    os.replace(temporary_path, path)
+
+    with chart_cache_state["lock"]:
+        files = chart_cache_state["files"]
+        if filename not in files:
+            files[filename] = len(png)
+            chart_cache_state["size"] += len(png)
+        while chart_cache_state["size"] > chart_cache_max_bytes and len(files) > 1:
+            evicted, evicted_size = files.popitem(last=False)
+            chart_cache_state["size"] -= evicted_size
+            try:
+                os.remove(os.path.join(chart_cache_directory, evicted))
+            except FileNotFoundError:
+                pass
+    return png, key
+
+# Recherche dans l'index des paquets
+packets_per_page = 100  # Nombre maximal de paquets affichés pour un filtre
+filter_cache_size = 128  # Nombre maximal de filtres dont le total et le début des pages sont gardés en mémoire
+
+# Construit la clause WHERE correspondant aux filtres du formulaire
+# Chaque condition porte sur une colonne indexée
+# Le filtre d'adresse est une adresse, un préfixe ("192.168.") ou une plage CIDR ("10.0.0.0/8") : ValueError sinon
+# Le filtre de port est un port de 0 à 65535 : ValueError sinon
+def build_packet_filter(ip_filter, port_filter):
+    conditions = []
+    params = []
+    if ip_filter:
+        low, high, _ = parse_network(ip_filter)
+        if low == high:
+            conditions.append("(src_ip = ? OR dst_ip = ?)")
+            params += [low, low]
+        else:
+            # Sous-réseau : parcours d'une plage de l'index
+            conditions.append("(src_ip BETWEEN ? AND ? OR dst_ip BETWEEN ? AND ?)")
+            params += [low, high] * 2
+    if port_filter:
+        if not valid_port_filter(port_filter):
+            raise ValueError(f"Port invalide : {port_filter}")
+        conditions.append("(src_port = ? OR dst_port = ?)")
+        params += [int(port_filter), int(port_filter)]
+    return " AND ".join(conditions) or "1", params
+
+# Paquets d'un filtre, calculés une seule fois par version de l'index : nombre, première et dernière apparition
+# et repères de pagination (marks), lus en un seul passage sur les id du filtre
+# - filtre étroit (count² < packets_per_page * nombre de paquets) : marks contient tous les id et une page est lue
+#   directement par ses id ;
+# - filtre large : marks contient un id sur packets_per_page ; une page est lue en parcourant la table dans l'ordre
+#   des id à partir du repère qui la précède (pagination par clé, id >= repère), soit environ
+#   packets_per_page * total / count lignes.
+# Une page lit ainsi de l'ordre de sqrt(packets_per_page * total) lignes au plus, quel que soit son numéro,
+# au lieu de relire toutes les pages précédentes avec OFFSET.
+@lru_cache(maxsize=filter_cache_size)
+def packet_filter_state(db_path, ip_filter, port_filter, version):
+    where, params = build_packet_filter(ip_filter, port_filter)
+    connection = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)  # Lecture seule
+    try:
+        ids = array("q", (row[0] for row in connection.execute(f"SELECT id FROM packets WHERE {where} ORDER BY id", params)))
+        total = connection.execute("SELECT MAX(id) FROM packets").fetchone()[0] or 0
+        first_seen = last_seen = None
+        if ids:
+            first_seen = connection.execute("SELECT timestamp FROM packets WHERE id = ?", (ids[0],)).fetchone()[0]
+            last_seen = connection.execute("SELECT timestamp FROM packets WHERE id = ?", (ids[-1],)).fetchone()[0]
+    finally:
+        connection.close()
+    stride = 1 if len(ids) * len(ids) < packets_per_page * total else packets_per_page
+    return {
+        "where": where,
+        "params": params,
+        "count": len(ids),
+        "first_seen": first_seen,
+        "last_seen": last_seen,
+        "stride": stride,  # Écart en paquets entre deux repères
+        "marks": ids if stride == 1 else ids[::stride],  # Id des paquets 0, stride, 2 * stride... du filtre
+    }
+
+# Ligne d'un paquet de l'index enregistré sans les lignes brutes (même forme que pour les captures pcap)
+def index_line(timestamp, src, dst, flags, length):
+    details = [f"Flags [{flags}]"] if flags is not None else []
+    if length is not None:
+        details.append(f"length {length}")
+    return f"{timestamp} {'IP6' if ':' in src else 'IP'} {src} > {dst}: {', '.join(details)}"
+
+# Retourne le nombre de paquets, la première et la dernière apparition et une page de paquets correspondants
+# Un numéro de page au-delà de la dernière est ramené à la dernière page avant la lecture (page_number dans le résultat)
+# version (voir current_version) sert de clé au cache des filtres
+def query_packet_index(db_path, ip_filter, port_filter, page_number=0, limit=packets_per_page, version=None):
+    state = packet_filter_state(db_path, ip_filter, port_filter, version)
+    count = state["count"]
+    page_number = min(page_number, max((count + limit - 1) // limit - 1, 0))
+    offset = page_number * limit
+    lines = []
+    if count:
+        columns = "timestamp, src, dst, flags, length, line"
+        connection = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)  # Lecture seule
+        try:
+            if state["stride"] == 1:
+                page_ids = list(state["marks"][offset:offset + limit])
+                rows = connection.execute(
+                    f"SELECT {columns} FROM packets WHERE id IN ({', '.join('?' * len(page_ids))}) ORDER BY id", page_ids
+                )
+            else:
+                mark, skipped = divmod(offset, state["stride"])
+                rows = connection.execute(
+                    f"SELECT {columns} FROM packets NOT INDEXED WHERE {state['where']} AND id >= ? ORDER BY id LIMIT ? OFFSET ?",
+                    state["params"] + [state["marks"][mark], limit, skipped],
+                )
+            lines = [line if line is not None else index_line(*fields) for *fields, line in rows]
+        finally:
+            connection.close()
+    return {"count": count, "first_seen": state["first_seen"], "last_seen": state["last_seen"], "lines": lines,
+            "offset": offset, "page_number": page_number}
+
+# Mise en forme du résultat d'une recherche en Markdown
+def packet_query_markdown(ip_filter, port_filter, result):
+    markdown_content = "## Résultats du filtre\n"
+    markdown_content += f"- **Adresse IP** : {html.escape(ip_filter) or 'toutes'}\n"
+    markdown_content += f"- **Port** : {port_filter or 'tous'}\n"
+    markdown_content += f"- **Paquets correspondants** : {result['count']}\n"
+    if ip_filter:
+        low, _, prefix_length = parse_network(ip_filter)
+        subnets = chart_state["subnets"].get(prefix_length)
+        if subnets is not None:  # /8, /16 ou /24 : total publié par l'analyse
+            markdown_content += (f"- **Occurrences du sous-réseau {network_label(low >> (32 - prefix_length), prefix_length)}** "
+                                 f"(analyse complète, sans le filtre de port) : {subnets.get(low >> (32 - prefix_length), 0)}\n")
+    if result["count"]:
+        markdown_content += f"- **Première apparition** : {result['first_seen']}\n"
+        markdown_content += f"- **Dernière apparition** : {result['last_seen']}\n"
+    if result["lines"]:
+        first = result["offset"] + 1
+        markdown_content += f"\n### Paquets {first} à {result['offset'] + len(result['lines'])}\n"
+        for line in result["lines"]:
+            markdown_content += f"- `{line}`\n"
+    return markdown_content
+
+def valid_ip_filter(ip_filter):
+    try:
+        parse_network(ip_filter)
+        return True
+    except ValueError:
+        return False
+
+# Port du formulaire : chiffres ASCII seulement (isdigit accepte "²" ou "①", que int refuse) et au plus 65535
+def valid_port_filter(port_filter):
+    return re.fullmatch(r"[0-9]{1,5}", port_filter) is not None and int(port_filter) <= 65535
+
+# Cache des pages générées
+# Une page dépend des filtres et de la version des fichiers produits par l'analyse (rapport et index)
+response_cache_size = 128  # Nombre maximal de pages gardées en mémoire
+response_cache_state = {"version": None}  # Version des fichiers pour laquelle le cache est valide
+
+# Version des fichiers sources : date de modification et taille du rapport et de l'index
+def source_version():
+    version = []
+    for path in (markdown_output, index_output):
+        if os.path.exists(path):
+            stat = os.stat(path)
+            version.append((path, stat.st_mtime_ns, stat.st_size))
+    return tuple(version)
+
+# Version courante des fichiers ; les caches sont vidés quand l'analyse a réécrit le rapport ou l'index
+# cache_clear remet à zéro les statistiques des caches : elles sont d'abord ajoutées aux mesures
+def current_version():
+    version = source_version()
+    if version != response_cache_state["version"]:
+        for name, cache in (("page_cache", render_results), ("chart_query_cache", query_chart_data), ("filter_cache", packet_filter_state)):
+            info = cache.cache_info()
+            add_counter(f"{name}_hits", info.hits)
+            add_counter(f"{name}_misses", info.misses)
+            cache.cache_clear()
+        response_cache_state["version"] = version
+    return version
+
+# Génère la page pour un couple de filtres et un numéro de page, avec son ETag
+# Page 0 : résumé (ou première page de paquets filtrés) ; pages suivantes : détail des alertes ou paquets filtrés
+# Seule la page demandée est lue et convertie : le temps de rendu ne dépend pas de la taille de la capture
+# Le résultat est mis en cache : les rafraîchissements suivants ne relisent ni le rapport ni l'index
+# version ne sert que de clé : une nouvelle analyse donne une nouvelle entrée
+@lru_cache(maxsize=response_cache_size)
+def render_results(ip_filter, port_filter, page_number, version):
+    page_count = 0
+    page_label = ""
+    if port_filter and not valid_port_filter(port_filter):
+        markdown_text = f"Port invalide : {html.escape(port_filter)}\n"
+    elif ip_filter and not valid_ip_filter(ip_filter):
+        markdown_text = f"Filtre d'adresse invalide : {html.escape(ip_filter)} (adresse, préfixe 192.168. ou plage CIDR 10.0.0.0/8)\n"
+    elif ip_filter or port_filter:
+        # Les filtres interrogent l'index de toute la capture, une page de paquets à la fois
+        result = query_packet_index(index_output, ip_filter, port_filter, page_number, version=version)
+        page_number = result["page_number"]  # Au-delà de la dernière page : on affiche la dernière
+        page_count = (result["count"] + packets_per_page - 1) // packets_per_page - 1  # Numéro de la dernière page
+        markdown_text = packet_query_markdown(ip_filter, port_filter, result)
+        page_label = f"Page {page_number + 1} sur {page_count + 1}"
+    else:
+        page_count = alert_page_count()
+        page_number = min(page_number, page_count)  # Au-delà de la dernière page d'alertes : on affiche la dernière
+        page_label = f"Alertes, page {page_number} sur {page_count}" if page_number else "Résumé"
+        path = alert_page_path(page_number) if page_number else markdown_output
+        with open(path, "r", encoding="utf8") as md_file:
+            markdown_text = md_file.read()
+
+    html_content = markdown.markdown(markdown_text)  # Convertit le Markdown en HTML
+
+    page = render_template_string(
+        html_template, content=html_content, ip_filter=ip_filter, port_filter=port_filter, live=live_state["enabled"],
+        page_number=min(page_number, max(page_count, 0)), page_count=page_count, page_label=page_label,
+    )
+    etag = hashlib.sha1(page.encode("utf8")).hexdigest()
+    return page, etag
+
+# Top 10 des IP, des ports et des sous-réseaux /24 parmi les paquets correspondant aux filtres (pour les graphiques)
+# Comme pour les compteurs de l'analyse, la source et la destination de chaque paquet sont comptées
+@lru_cache(maxsize=response_cache_size)
+def query_chart_data(db_path, ip_filter, port_filter, version):
+    where, params = build_packet_filter(ip_filter, port_filter)
+    connection = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        data = {}
+        for name, src_column, dst_column in (("top_ips", "src_ip", "dst_ip"), ("top_ports", "src_port", "dst_port"),
+                                             ("top_subnets", "src_ip >> 8", "dst_ip >> 8")):
+            data[name] = connection.execute(
+                f"SELECT key, COUNT(*) AS total FROM ("
+                f"SELECT {src_column} AS key FROM packets WHERE {where} "
+                f"UNION ALL SELECT {dst_column} FROM packets WHERE {where}"
+                f") WHERE key IS NOT NULL GROUP BY key ORDER BY total DESC, key LIMIT 10",
+                params + params,
+            ).fetchall()
+    finally:
+        connection.close()
+    data["top_ips"] = [(int_to_ip(ip), count) for ip, count in data["top_ips"]]
+    data["top_subnets"] = [(network_label(network, 24), count) for network, count in data["top_subnets"]]
     return data
 
-# Fonction pour sauvegarder les données dans un fichier CSV
-def save_to_csv(data, csv_filename):
-    headers = ['Temps', 'IP Source', 'IP Destination', 'Flag', 'Longueur du Paquet']
-
-    with open(csv_filename, mode='w', newline='', encoding='utf8') as file:
-        writer = csv.writer(file)
-        writer.writerow(headers)
-        writer.writerows(data)
-
-# Extraction des données TCPDUMP et sauvegarde en CSV
-tcpdump_data = extract_tcpdump_data(input_file)
-if tcpdump_data:
-    save_to_csv(tcpdump_data, csv_output)
-
-# Génération de graphiques
-# Graphique pour les 10 IP les plus fréquentes
-top_ips = ip_counter.most_common(10)
-ips, counts = zip(*top_ips) if top_ips else ([], [])
-plt.bar(ips, counts)
-plt.xlabel("IP Addresses")
-plt.ylabel("Occurrences")
-plt.title("Top 10 IP Addresses")
-plt.xticks(rotation=45)
-plt.tight_layout()
-plt.savefig("static/top_ips.png")  # Sauvegarde du graphique
-plt.close()
-
-# Graphique en camembert pour la répartition des ports
-port_distribution = port_counter.most_common(10)
-labels = [f"Port {port}" for port, _ in port_distribution]
-sizes = [count for _, count in port_distribution]
-
-if sizes:
-    plt.figure(figsize=(8, 8))
-    plt.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=140)
-    plt.title("Port Distribution")
-    plt.savefig("static/port_distribution.png")  # Sauvegarde du graphique
-    plt.close()
-
-# Fonction pour générer le graphique des Top 10 des ports
-def plot_top_ports(port_counter, output_file):
-    top_ports = port_counter.most_common(10)
-    ports, counts = zip(*top_ports)
-
-    plt.figure(figsize=(10, 6))
-    plt.bar(ports, counts, color='orange')
-    plt.xlabel('Ports')
-    plt.ylabel('Nombre d\'occurrences')
-    plt.title('Top 10 des ports')
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    plt.savefig(output_file)
-    plt.close()
-
-# Générer le graphique des Top 10 des ports
-plot_top_ports(port_counter, "static/top_ports.png")
+# API JSON pour les scripts et l'écran de supervision
+# L'analyse publie un instantané de ses agrégats (remplacé d'un bloc, comme chart_state) ; chaque requête filtre, trie
+# et découpe en pages une liste de l'instantané, sans relire la capture. Les réponses sont mises en cache pour
+# l'instantané courant, compressées avec gzip si le client l'accepte et servies avec un ETag.
+api_max_items = 10000  # Adresses IP, sous-réseaux par longueur de préfixe et flux ouverts publiés (les plus actifs)
+api_default_per_page = 50
+api_max_per_page = 1000
+api_gzip_min_size = 1024  # Les réponses plus petites ne sont pas compressées
+api_state = {"snapshot": None, "version": 0}  # Dernier instantané publié
+
+# Nom -> (champs de tri, tri par défaut, filtres acceptés) ; les paramètres page, per_page, sort et order sont communs
+api_endpoints = {
+    "ips": (("count", "ip", "first_seen", "last_seen"), "count", ("ip", "min_count")),
+    "ports": (("count", "port"), "count", ("port", "min_count")),
+    "subnets": (("count", "subnet"), "count", ("prefix", "ip", "min_count")),
+    "time_series": (("time", "packets", "bytes"), "time", ("resolution", "start", "end")),
+    "flows": (("bytes", "packets", "start", "end", "duration"), "bytes", ("ip", "port", "state")),
+    "alerts": (("count", "first_seen", "last_seen", "rule"), "count", ("ip", "port", "rule")),
+}
+api_ascending_fields = {"ip", "port", "subnet", "time", "rule"}  # Ordre par défaut croissant pour ces champs
+time_filter_pattern = re.compile(r"\d{2}:\d{2}(?::\d{2})?")  # HH:MM ou HH:MM:SS
+
+def flow_item(flow, state):
+    return {
+        "source": flow["source"],
+        "destination": flow["destination"],
+        "start": format_seconds(flow["start"]),
+        "end": format_seconds(flow["end"]),
+        "duration": round(flow["end"] - flow["start"], 6),
+        "packets": flow["packets"],
+        "bytes": flow["bytes"],
+        "syn": bool(flow["flags"] & tcp_flag_bits["S"]),
+        "state": state,
+    }
+
+# Copie des agrégats utiles à l'API ; appelée par l'analyse (dans le même thread), après chaque mise à jour
+# Seules des copies brutes sont faites ici : les listes JSON sont construites à la première requête (api_items)
+def publish_api_data(aggregates):
+    ip_counter = aggregates["ip_counter"]
+    top_ips = ip_counter.most_common(api_max_items)
+    per_second = aggregates["traffic_per_second"]
+    period = active_range(per_second["packets"])
+    open_flows = list(itertools.islice(reversed(aggregates["flows"].values()), api_max_items))  # Les plus récemment actifs
+    if "distinct_sources" in aggregates:
+        distinct_ips = {"sources": aggregates["distinct_sources"].count(), "destinations": aggregates["distinct_destinations"].count()}
+    else:
+        distinct_ips = len(ip_counter)
+    snapshot = {
+        "version": api_state["version"] + 1,
+        "summary": {
+            "packets": int(histogram_values(per_second["packets"]).sum()),
+            "bytes": int(histogram_values(per_second["bytes"]).sum()),
+            "first_packet": format_bucket(period[0], 1) if period else None,
+            "last_packet": format_bucket(period[1], 1) if period else None,
+            "approximate": isinstance(ip_counter, SpaceSaving),
+            "distinct_ips": distinct_ips,
+            "alerts": len(aggregates["alerts"]),
+            "alerts_dropped": aggregates["alerts_dropped"],
+            "rule_hits": dict(aggregates["rule_hits"]),
+            "finished_flows": aggregates["flow_count"],
+            "open_flows": len(aggregates["flows"]) + len(aggregates["closing_flows"]),
+        },
+        "raw": {
+            "ips": (top_ips, aggregates["ip_time_intervals"].lookup(ip for ip, _ in top_ips)),
+            "ports": aggregates["port_counter"].most_common(),
+            "subnets": subnet_rollups(ip_counter),
+            "time_series": {
+                1: (array("I", per_second["packets"]), array("Q", per_second["bytes"])),
+                60: (array("I", aggregates["traffic_per_minute"]["packets"]), array("Q", aggregates["traffic_per_minute"]["bytes"])),
+            },
+            # Les flux terminés ne changent plus ; les flux ouverts sont copiés
+            "flows": [(flow, flow_state(flow)) for flow in aggregates["top_flows"]]
+                     + [(dict(flow), "en fermeture") for flow in aggregates["closing_flows"].values()]
+                     + [(dict(flow), "ouvert") for flow in open_flows],
+            "alerts": [dict(alert) for alert in aggregates["alerts"].values()],
+        },
+        "items": {},  # Nom (ou ("time_series", résolution)) -> liste JSON, construite à la première requête
+    }
+    api_state["snapshot"] = snapshot
+    api_state["version"] = snapshot["version"]
+    info = api_response.cache_info()  # Les réponses de l'instantané précédent ne servent plus
+    add_counter("api_cache_hits", info.hits)
+    add_counter("api_cache_misses", info.misses)
+    api_response.cache_clear()
+
+# Étiquettes HH:MM:SS des cases d'un histogramme (1 : par seconde, 60 : par minute), calculées une fois
+@lru_cache(maxsize=None)
+def bucket_labels(resolution):
+    return [format_seconds(bucket * resolution)[:8] for bucket in range(seconds_per_day // resolution)]
+
+# Points de la série temporelle sur la période active
+def time_series_items(histograms, resolution):
+    packets, total_bytes = histograms
+    period = active_range(packets)
+    if period is None:
+        return []
+    labels = bucket_labels(resolution)
+    return [{"time": labels[bucket], "packets": packets[bucket], "bytes": total_bytes[bucket]}
+            for bucket in range(period[0], period[1] + 1)]
+
+def ip_items(raw):
+    top_ips, intervals = raw
+    return [
+        {"ip": int_to_ip(ip), "count": count,
+         "first_seen": format_seconds(interval[0]) if interval else None,
+         "last_seen": format_seconds(interval[1]) if interval else None}
+        for (ip, count), interval in zip(top_ips, intervals)
+    ]
+
+def subnet_items(rollups):
+    return [
+        {"subnet": network_label(network, prefix_length), "prefix": prefix_length, "count": count}
+        for prefix_length, subnets in rollups.items()
+        for network, count in top_subnets(subnets, api_max_items)
+    ]
+
+api_item_builders = {
+    "ips": ip_items,
+    "ports": lambda ports: [{"port": port, "count": count} for port, count in ports],
+    "subnets": subnet_items,
+    "flows": lambda flows: [flow_item(flow, state) for flow, state in flows],
+    "alerts": lambda alerts: alerts,
+}
+
+# Liste JSON d'un instantané ; deux requêtes simultanées peuvent la construire deux fois, sans autre conséquence
+def api_items(snapshot, name, resolution=None):
+    key = (name, resolution) if resolution else name
+    items = snapshot["items"].get(key)
+    if items is None:
+        if resolution:
+            items = time_series_items(snapshot["raw"][name][resolution], resolution)
+        else:
+            items = api_item_builders[name](snapshot["raw"][name])
+        snapshot["items"][key] = items
+    return items
+
+# Adresse et port d'une extrémité hôte.port (port None pour un nom de service)
+def split_endpoint(endpoint):
+    host, _, port = endpoint.rpartition(".")
+    return (host, int(port)) if port.isdigit() else (endpoint, None)
+
+# Adresses et ports examinés par les filtres ip et port de chaque liste
+api_addresses = {
+    "ips": lambda item: (item["ip"],),
+    "subnets": lambda item: (item["subnet"].partition("/")[0],),
+    "flows": lambda item: (split_endpoint(item["source"])[0], split_endpoint(item["destination"])[0]),
+    "alerts": lambda item: (item["source"], item["destination"]),
+}
+api_ports = {
+    "ports": lambda item: (item["port"],),
+    "flows": lambda item: (split_endpoint(item["source"])[1], split_endpoint(item["destination"])[1]),
+    "alerts": lambda item: (item["port"],),
+}
+
+# Port ("22") ou plage de ports ("6000-6063") -> (premier, dernier) ; ValueError sinon
+def parse_port_range(text):
+    low, _, high = text.partition("-")
+    if not low.isdigit() or not (high or low).isdigit() or not int(low) <= int(high or low) <= 65535:
+        raise ValueError(f"Port ou plage de ports invalide : {text}")
+    return int(low), int(high or low)
+
+def positive_integer(params, name, default):
+    value = params.get(name, str(default))
+    if not value.isdigit() or int(value) < 1:
+        raise ValueError(f"{name} doit être un entier positif : {value}")
+    return int(value)
+
+# Filtres -> liste de prédicats sur les éléments d'une liste
+def api_predicates(name, params):
+    predicates = []
+    if "ip" in params:
+        low, high, _ = parse_network(params["ip"])
+        addresses = api_addresses[name]
+        predicates.append(lambda item: any(address is not None and low <= address <= high
+                                           for address in map(ip_to_int, addresses(item))))
+    if "port" in params:
+        first, last = parse_port_range(params["port"])
+        ports = api_ports[name]
+        predicates.append(lambda item: any(port is not None and first <= port <= last for port in ports(item)))
+    if "min_count" in params:
+        min_count = positive_integer(params, "min_count", 1)
+        predicates.append(lambda item: item["count"] >= min_count)
+    if name == "subnets":
+        prefix_length = positive_integer(params, "prefix", 24)
+        if prefix_length not in subnet_prefixes:
+            raise ValueError(f"prefix doit valoir {', '.join(map(str, subnet_prefixes))}")
+        predicates.append(lambda item: item["prefix"] == prefix_length)
+    for field in ("rule", "state"):
+        if field in params:
+            predicates.append(lambda item, field=field: item[field] == params[field])
+    for field, keep in (("start", lambda time, limit: time[:len(limit)] >= limit), ("end", lambda time, limit: time[:len(limit)] <= limit)):
+        if field in params:
+            if not time_filter_pattern.fullmatch(params[field]):
+                raise ValueError(f"{field} doit être au format HH:MM ou HH:MM:SS : {params[field]}")
+            predicates.append(lambda item, keep=keep, limit=params[field]: keep(item["time"], limit))
+    return predicates
+
+# Clé de tri : adresses dans l'ordre numérique, valeurs absentes en dernier
+def api_sort_key(field):
+    if field == "ip":
+        return lambda item: ip_to_int(item["ip"])
+    if field == "subnet":
+        return lambda item: ip_to_int(item["subnet"].partition("/")[0])
+    return lambda item: (item[field] is None, item[field] if item[field] is not None else 0)
+
+# Réponse d'une route de l'API : (statut, corps JSON, corps compressé ou None, ETag)
+# params est un tuple de (nom, valeur) ; version ne sert que de clé de cache
+@lru_cache(maxsize=response_cache_size)
+def api_response(name, params, version):
+    snapshot = api_state["snapshot"]
+    params = dict(params)
+    try:
+        if name == "summary":
+            payload = {"version": snapshot["version"], **snapshot["summary"]}
+        else:
+            sort_fields, default_sort, filters = api_endpoints[name]
+            unknown = set(params) - set(filters) - {"page", "per_page", "sort", "order"}
+            if unknown:
+                raise ValueError(f"Paramètres inconnus : {', '.join(sorted(unknown))}")
+            sort = params.get("sort", default_sort)
+            if sort not in sort_fields:
+                raise ValueError(f"sort doit valoir {', '.join(sort_fields)}")
+            order = params.get("order", "asc" if sort in api_ascending_fields else "desc")
+            if order not in ("asc", "desc"):
+                raise ValueError("order doit valoir asc ou desc")
+            page = positive_integer(params, "page", 1)
+            per_page = min(positive_integer(params, "per_page", api_default_per_page), api_max_per_page)
+            if name == "time_series":
+                resolution = positive_integer(params, "resolution", 60)
+                if resolution not in snapshot["raw"]["time_series"]:
+                    raise ValueError("resolution doit valoir 1 ou 60")
+                items = api_items(snapshot, name, resolution)
+            else:
+                items = api_items(snapshot, name)
+            predicates = api_predicates(name, params)
+            items = [item for item in items if all(predicate(item) for predicate in predicates)]
+            items.sort(key=api_sort_key(sort), reverse=order == "desc")
+            payload = {
+                "version": snapshot["version"],
+                "total": len(items),
+                "page": page,
+                "per_page": per_page,
+                "pages": (len(items) + per_page - 1) // per_page,
+                "sort": sort,
+                "order": order,
+                "items": items[(page - 1) * per_page:page * per_page],
+            }
+        status = 200
+    except ValueError as error:
+        payload, status = {"error": str(error)}, 400
+    body = json.dumps(payload, ensure_ascii=False).encode("utf8")
+    compressed = gzip.compress(body, compresslevel=6) if len(body) >= api_gzip_min_size else None
+    return status, body, compressed, hashlib.sha1(body).hexdigest()
+
+# Mesures au format texte de Prometheus
+# Compteur interne -> (nom Prometheus, description)
+counter_metrics = {
+    "lines_read": ("sae_lines_read_total", "Lignes (ou trames pcap) de capture lues"),
+    "packets_parsed": ("sae_packets_parsed_total", "Lignes ou trames reconnues comme paquets IP"),
+    "parse_errors": ("sae_parse_errors_total", "Lignes ou trames non reconnues (ARP, lignes tronquées, ...)"),
+    "bytes_read": ("sae_bytes_read_total", "Octets de capture lus (octets capturés des trames pcap)"),
+    "page_cache_hits": ("sae_page_cache_hits_total", "Pages servies depuis le cache"),
+    "page_cache_misses": ("sae_page_cache_misses_total", "Pages générées"),
+    "chart_query_cache_hits": ("sae_chart_query_cache_hits_total", "Données de graphiques filtrés servies depuis le cache"),
+    "chart_query_cache_misses": ("sae_chart_query_cache_misses_total", "Données de graphiques filtrés lues dans l'index"),
+    "chart_cache_hits": ("sae_chart_cache_hits_total", "Graphiques relus dans le cache sur disque"),
+    "chart_cache_misses": ("sae_chart_cache_misses_total", "Graphiques dessinés"),
+    "api_cache_hits": ("sae_api_cache_hits_total", "Réponses de l'API servies depuis le cache"),
+    "api_cache_misses": ("sae_api_cache_misses_total", "Réponses de l'API calculées"),
+    "responses_not_modified": ("sae_responses_not_modified_total", "Réponses 304 (ETag ou date inchangés)"),
+}
+
+def metrics_text():
+    with metrics_state["lock"]:
+        counters = Counter(metrics_state["counters"])
+        stages = {stage: tuple(totals) for stage, totals in metrics_state["stages"].items()}
+        requests = {route: (list(buckets), count, seconds) for route, (buckets, count, seconds) in metrics_state["requests"].items()}
+    # Statistiques des caches de pages depuis leur dernier vidage
+    for name, cache in (("page_cache", render_results), ("chart_query_cache", query_chart_data), ("api_cache", api_response)):
+        info = cache.cache_info()
+        counters[f"{name}_hits"] += info.hits
+        counters[f"{name}_misses"] += info.misses
+
+    lines = []
+    for key, (name, description) in counter_metrics.items():
+        lines += [f"# HELP {name} {description}", f"# TYPE {name} counter", f"{name} {counters[key]}"]
+    lines += ["# HELP sae_stage_seconds Temps cumulé par étape de l'analyse (count : appels, ou paquets pour les étapes par paquet)",
+              "# TYPE sae_stage_seconds summary"]
+    for stage, (calls, seconds) in sorted(stages.items()):
+        lines += [f'sae_stage_seconds_sum{{stage="{stage}"}} {seconds:.6f}', f'sae_stage_seconds_count{{stage="{stage}"}} {calls}']
+    lines += ["# HELP sae_request_seconds Temps de rendu des requêtes par route", "# TYPE sae_request_seconds histogram"]
+    for route, (buckets, count, seconds) in sorted(requests.items()):
+        for bound, bucket_count in zip(request_buckets, buckets):
+            lines.append(f'sae_request_seconds_bucket{{route="{route}",le="{bound}"}} {bucket_count}')
+        lines += [f'sae_request_seconds_bucket{{route="{route}",le="+Inf"}} {count}',
+                  f'sae_request_seconds_sum{{route="{route}"}} {seconds:.6f}', f'sae_request_seconds_count{{route="{route}"}} {count}']
+    return "\n".join(lines) + "\n"
 
 # Application Flask
 app = Flask(__name__)
 
+@app.route("/metrics")
+def metrics():
+    return Response(metrics_text(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+# Flux Server-Sent Events des mises à jour en direct
+@app.route("/events")
+def live_events():
+    def stream():
+        sequence = 0
+        while True:
+            with live_state["condition"]:
+                # Attente d'une nouvelle mise à jour, avec un message de maintien de connexion toutes les 15 s
+                live_state["condition"].wait_for(lambda: live_state["sequence"] != sequence, timeout=15)
+                sequence = live_state["sequence"]
+                update = live_state["update"]
+            if update is None:
+                yield ": attente\n\n"
+            else:
+                yield f"data: {json.dumps(update)}\n\n"
+
+    return Response(stream(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+
 @app.route("/", methods=["GET", "POST"])
 def display_results():
-    ip_filter = request.form.get("ip_filter", "")  # Récupère le filtre IP du formulaire
-    port_filter = request.form.get("port_filter", "")  # Récupère le filtre port du formulaire
+    start = time.perf_counter()
+    ip_filter = request.values.get("ip_filter", "").strip()  # Récupère le filtre IP du formulaire
+    port_filter = request.values.get("port_filter", "").strip()  # Récupère le filtre port du formulaire
+    page_text = request.values.get("page", "0")
+    # Chiffres ASCII seulement (isdigit accepte "²") ; un numéro trop grand est ramené à la dernière page
+    if re.fullmatch(r"[0-9]+", page_text):
+        page_number = int(page_text) if len(page_text) <= 18 else sys.maxsize
+    else:
+        page_number = 0
 
-    with open(markdown_output, "r") as md_file:
-        markdown_text = md_file.read()
+    version = current_version()
+    page, etag = render_results(ip_filter, port_filter, page_number, version)
 
-    filtered_content = []
-    for line in markdown_text.split("\n"):  # Filtre les lignes en fonction des filtres
-        if ip_filter and ip_filter not in line:
-            continue
-        if port_filter and port_filter not in line:
-            continue
-        filtered_content.append(line)
+    response = make_response(page)  # Affiche le contenu dans le modèle HTML
+    response.set_etag(etag)
+    if version:
+        response.last_modified = max(mtime for _, mtime, _ in version) / 1e9
+    response.cache_control.no_cache = True  # Le navigateur revalide avec If-None-Match / If-Modified-Since
+    response = response.make_conditional(request)
+    if response.status_code == 304:
+        add_counter("responses_not_modified")
+    observe_request("display_results", time.perf_counter() - start)
+    return response
 
-    markdown_text = "\n".join(filtered_content)
-    html_content = markdown.markdown(markdown_text)  # Convertit le Markdown en HTML
+# Graphique PNG pour les filtres de la page, rendu seulement s'il n'est pas déjà dans le cache
+@app.route("/charts/<name>.png")
+def chart(name):
+    if name not in charts:
+        abort(404)
+    start = time.perf_counter()
+    ip_filter = request.args.get("ip_filter", "").strip()
+    port_filter = request.args.get("port_filter", "").strip()
+    if (port_filter and not valid_port_filter(port_filter)) or (ip_filter and not valid_ip_filter(ip_filter)):
+        abort(400)
+    version = current_version()
+    if ip_filter or port_filter:
+        data = query_chart_data(index_output, ip_filter, port_filter, version)
+    else:
+        data = chart_state
+    png, key = cached_chart(name, ip_filter, port_filter, data[charts[name][1]])
+
+    response = make_response(png)
+    response.mimetype = "image/png"
+    response.set_etag(key)
+    response.cache_control.no_cache = True
+    response = response.make_conditional(request)
+    if response.status_code == 304:
+        add_counter("responses_not_modified")
+    observe_request("chart", time.perf_counter() - start)
+    return response
 
-    return render_template_string(html_template, content=html_content)  # Affiche le contenu dans le modèle HTML
+# API JSON : /api/summary, /api/ips, /api/ports, /api/subnets, /api/time_series, /api/flows, /api/alerts
+# Exemple : /api/ips?ip=10.0.0.0/8&sort=last_seen&page=2&per_page=100
+@app.route("/api/<name>")
+def api(name):
+    if name != "summary" and name not in api_endpoints:
+        abort(404)
+    start = time.perf_counter()
+    snapshot = api_state["snapshot"]
+    if snapshot is None:
+        response = make_response({"error": "Analyse en cours, aucune donnée publiée"}, 503)
+    else:
+        status, body, compressed, etag = api_response(name, tuple(sorted(request.args.items())), snapshot["version"])
+        if compressed is not None and request.accept_encodings["gzip"]:
+            response = make_response(compressed, status)
+            response.headers["Content-Encoding"] = "gzip"
+            etag += "-gzip"  # Une représentation différente a son propre ETag
+        else:
+            response = make_response(body, status)
+        response.mimetype = "application/json"
+        response.vary.add("Accept-Encoding")
+        response.set_etag(etag)
+        response.cache_control.no_cache = True
+        response = response.make_conditional(request)
+        if response.status_code == 304:
+            add_counter("responses_not_modified")
+    observe_request("api", time.perf_counter() - start)
+    return response
 
 if __name__ == "__main__":
-    app.run(debug=True)  # Lance l'application Flask
\ No newline at end of file
+    # Options de la ligne de commande
+    parser = argparse.ArgumentParser(description="SAE105 - Analyse Tcpdump")
+    parser.add_argument("input_file", nargs="?", default=input_file,
+                        help="Capture à analyser : texte tcpdump, pcap ou pcapng (éventuellement .gz), ou répertoire de captures")
+    parser.add_argument("--workers", type=int, default=1, help="Nombre de processus pour l'analyse (1 = séquentiel)")
+    parser.add_argument("--cache", default=batch_cache_output, help="Dossier des résultats par fichier pour l'analyse d'un répertoire")
+    parser.add_argument("--follow", action="store_true", help="Suivre le fichier pendant que tcpdump y écrit")
+    parser.add_argument("--interval", type=float, default=2.0, help="Délai en secondes entre deux lectures en mode suivi")
+    parser.add_argument("--live", metavar="SOURCE", help="Analyse en direct : '-' (entrée standard), 'tcpdump' ou une capture à rejouer")
+    parser.add_argument("--interface", default="any", help="Interface écoutée par tcpdump en mode direct")
+    parser.add_argument("--speed", type=float, default=1.0, help="Vitesse de rejeu d'une capture (0 = sans pause)")
+    parser.add_argument("--tick", type=float, default=0.5, help="Intervalle en secondes entre deux mises à jour en direct")
+    parser.add_argument("--approximate", action="store_true", help="Compteurs à mémoire bornée (Space-Saving et HyperLogLog)")
+    parser.add_argument("--sketch-size", type=int, default=10000, help="Nombre de clés suivies par compteur en mode approximatif")
+    parser.add_argument("--hll-precision", type=int, default=14, help="Précision HyperLogLog (2^p registres d'un octet)")
+    parser.add_argument("--rules", help="Fichier JSON des règles de détection (règles par défaut sinon)")
+    parser.add_argument("--no-index-lines", action="store_true", help="N'enregistre pas la ligne brute de chaque paquet dans l'index (index plus petit)")
+    parser.add_argument("--profile", metavar="FICHIER", help="Profile l'analyse du fichier avec cProfile et enregistre le profil dans FICHIER")
+    args = parser.parse_args()
+    sketch_settings = {"capacity": args.sketch_size, "precision": args.hll_precision} if args.approximate else None
+    rules = load_rules(args.rules) if args.rules else None
+    index_settings["lines"] = not args.no_index_lines
+    if args.follow and os.path.isdir(args.input_file):
+        parser.error(f"--follow suit un fichier, pas un répertoire : {args.input_file}")
+    # Le suivi et le rejeu lisent la capture ligne par ligne : ils ne prennent qu'une sortie texte non compressée
+    for mode, path in (("--follow", args.input_file if args.follow else None), ("--live", args.live)):
+        if path and path not in ("-", "tcpdump") and os.path.exists(path) and capture_format(path) != ("text", False):
+            parser.error(f"{mode} lit une sortie texte de tcpdump non compressée : {path}")
+
+    if args.live:
+        if args.live == "-":
+            lines = read_stdin_lines()
+        elif args.live == "tcpdump":
+            lines = read_tcpdump_lines(args.interface)
+        else:
+            lines = replay_dump_lines(args.live, args.speed)
+        live_state["enabled"] = True
+        print("Analyse en direct, mises à jour sur /events...")
+        capture = threading.Thread(
+            target=asyncio.run,
+            args=(live_capture(lines, csv_output, index_output, columns_output, flows_output, args.tick, sketch_settings, rules),),
+            daemon=True,
+        )
+        capture.start()
+        app.run(debug=True, use_reloader=False, threaded=True)
+    elif args.follow:
+        # Le suivi tourne dans un thread, l'application web dans le thread principal
+        print(f"Suivi du fichier {args.input_file} (état sauvegardé dans {checkpoint_output})...")
+        follower = threading.Thread(
+            target=follow_dump,
+            args=(args.input_file, csv_output, index_output, columns_output, flows_output, checkpoint_output, args.interval, sketch_settings, rules),
+            daemon=True,
+        )
+        follower.start()
+        app.run(debug=True, use_reloader=False)  # Le rechargement automatique lancerait un second suivi
+    else:
+        print("Analyse du fichier pour trouver les adresses IP, les ports et les activités suspectes...")
+        file_summaries = None
+        with profiled(args.profile):
+            if os.path.isdir(args.input_file):  # Un processus par fichier, résultats gardés dans args.cache
+                aggregates, file_summaries = analyse_directory(args.input_file, csv_output, index_output, columns_output, flows_output, args.cache, args.workers, sketch_settings, rules)
+            elif args.workers > 1:
+                aggregates = analyse_dump_parallel(args.input_file, csv_output, index_output, columns_output, flows_output, args.workers, sketch_settings, rules)
+            else:
+                aggregates = analyse_dump(args.input_file, csv_output, index_output, columns_output, flows_output, sketch_settings, rules)
+
+            generate_markdown(aggregates, markdown_output, index_output, file_summaries)
+        publish_chart_data(aggregates)
+        publish_api_data(aggregates)
+
+        app.run(debug=True)  # Lance l'application Flask
\ No newline at end of file
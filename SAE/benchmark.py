@@ -0,0 +1,162 @@
+# Mesures de performance de SAE105 sur des captures synthétiques (generateur.py)
+# Pour chaque taille : lignes par seconde, pic de mémoire (RSS) et temps par étape de l'analyse
+# Les temps par étape sont les mesures internes de SAE105 (celles de /metrics), toujours actives :
+# elles remplacent le chronométrage par remplacement des fonctions de SAE105, qui ralentissait l'analyse
+# et ne voyait pas le décodage des captures pcap (parse_line n'y est pas appelée)
+# Les résultats sont ajoutés à un fichier JSON Lines pour comparer les versions du code
+# Exemple : python benchmark.py --sizes 10k,100k,1M      puis      python benchmark.py --history
+import argparse  # Pour lire les options de la ligne de commande
+import json  # Pour enregistrer les résultats
+import os  # Pour les fichiers de travail
+import platform  # Pour noter la version de Python
+import resource  # Pour le pic de mémoire du processus de mesure
+import subprocess  # Pour noter le commit mesuré
+import time  # Pour les mesures de temps
+from concurrent.futures import ProcessPoolExecutor  # Un processus neuf par mesure : le pic de mémoire est propre à la mesure
+import SAE105 as sae
+from generateur import write_dump, write_pcap, parse_count
+
+results_output = "benchmark_results.jsonl"  # Historique des mesures
+work_directory = "benchmark_travail"  # Captures générées et fichiers produits pendant les mesures
+
+# Une mesure complète, exécutée dans un processus neuf
+def run_benchmark(dump_path, options):
+    os.chdir(options["work_directory"])
+    sketch_settings = {"capacity": options["sketch_size"], "precision": 14} if options["approximate"] else None
+
+    start = time.perf_counter()
+    if options["workers"] > 1:
+        aggregates = sae.analyse_dump_parallel(dump_path, sae.csv_output, sae.index_output, sae.columns_output, sae.flows_output, options["workers"], sketch_settings)
+    else:
+        aggregates = sae.analyse_dump(dump_path, sae.csv_output, sae.index_output, sae.columns_output, sae.flows_output, sketch_settings)
+    sae.generate_markdown(aggregates, sae.markdown_output, sae.index_output)
+
+    # Graphiques : premier rendu, sans le cache de l'application web
+    chart_start = time.perf_counter()
+    sae.publish_chart_data(aggregates)
+    for name, (_, data_name, _) in sae.charts.items():
+        sae.render_chart(name, sae.chart_state[data_name], "")
+    chart_seconds = time.perf_counter() - chart_start
+    elapsed = time.perf_counter() - start
+    timings = {}
+    if options["stages"]:
+        timings = {stage: seconds for stage, (_, seconds) in sae.metrics_snapshot()["stages"].items()}
+    timings["charts"] = chart_seconds
+    if options["stages"] and options["workers"] == 1:  # En parallèle, les temps des étapes sont additionnés sur tous les processus
+        timings["other"] = elapsed - sum(timings.values())  # Lecture du fichier texte, boucle de consume_records...
+
+    return {
+        "seconds": round(elapsed, 3),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),  # ru_maxrss est en Ko sous Linux
+        "stages": {stage: round(seconds, 3) for stage, seconds in timings.items()},
+        "alerts": len(aggregates["alerts"]),
+        "flows": aggregates["flow_count"],
+    }
+
+# Capture synthétique réutilisée d'une mesure à l'autre (son nom contient tous les paramètres)
+def synthetic_dump(lines, options):
+    extension = "pcap" if options["format"] == "pcap" else "txt"
+    name = f"dump_{lines}_{options['ips']}_{options['ports']}_{options['suspicious']}_{options['seed']}.{extension}"
+    path = os.path.abspath(os.path.join(options["work_directory"], name))
+    if not os.path.exists(path):
+        print(f"Génération de {path}...")
+        if options["format"] == "pcap":
+            with open(path + ".tmp", "wb") as dump_file:
+                write_pcap(dump_file, lines, options["ips"], options["ports"], options["suspicious"], options["seed"])
+        else:
+            with open(path + ".tmp", "w", encoding="utf8") as dump_file:
+                write_dump(dump_file, lines, options["ips"], options["ports"], options["suspicious"], options["seed"])
+        os.replace(path + ".tmp", path)
+    return path
+
+def current_commit():
+    try:
+        source_directory = os.path.dirname(os.path.abspath(__file__))
+        return subprocess.run(["git", "-C", source_directory, "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def benchmark(sizes, options, results_path):
+    os.makedirs(options["work_directory"], exist_ok=True)
+    for lines in sizes:
+        dump_path = synthetic_dump(lines, options)
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            measure = executor.submit(run_benchmark, dump_path, options).result()
+        result = {
+            "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "commit": current_commit(),
+            "python": platform.python_version(),
+            "lines": lines,
+            "format": options["format"],
+            "ips": options["ips"],
+            "ports": options["ports"],
+            "suspicious": options["suspicious"],
+            "seed": options["seed"],
+            "workers": options["workers"],
+            "approximate": options["approximate"],
+            "instrumented": options["stages"],
+            "lines_per_second": round(lines / measure["seconds"]) if measure["seconds"] else None,
+            **measure,
+        }
+        with open(results_path, "a", encoding="utf8") as results_file:
+            results_file.write(json.dumps(result, ensure_ascii=False) + "\n")
+        print(format_result(result))
+
+def format_result(result, previous=None):
+    text = f"{result['date']} {result['commit'] or '-':>8} {result.get('format', 'text'):>4} {result['lines']:>11} lignes : {result['lines_per_second']:>8} lignes/s,"
+    text += f" {result['peak_rss_mb']:>8} Mo, {result['seconds']:>9} s"
+    if previous:
+        change = (result["lines_per_second"] - previous["lines_per_second"]) / previous["lines_per_second"]
+        text += f" ({change:+.1%} lignes/s)"
+    if result["stages"]:
+        text += "\n    " + ", ".join(f"{stage} {seconds} s" for stage, seconds in sorted(result["stages"].items(), key=lambda item: -item[1]))
+    return text
+
+# Historique : chaque mesure est comparée à la précédente avec les mêmes paramètres
+# (les mesures avec et sans temps par étape ne sont pas comparées : avant les mesures internes de SAE105,
+# le chronométrage ralentissait l'analyse)
+def show_history(results_path):
+    if not os.path.exists(results_path):
+        print(f"Aucune mesure enregistrée dans {results_path}")
+        return
+    previous = {}
+    with open(results_path, encoding="utf8") as results_file:
+        for line in results_file:
+            result = json.loads(line)
+            key = (result["lines"], result.get("format", "text"), result["ips"], result["ports"], result["suspicious"], result["seed"], result["workers"], result["approximate"], result.get("instrumented", True))
+            print(format_result(result, previous.get(key)))
+            previous[key] = result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mesures de performance de SAE105")
+    parser.add_argument("--sizes", default="10k,100k,1M", help="Tailles des captures, séparées par des virgules (10k à 100M)")
+    parser.add_argument("--ips", type=int, default=10000, help="Nombre d'adresses IP différentes")
+    parser.add_argument("--ports", type=int, default=2000, help="Nombre de ports différents")
+    parser.add_argument("--suspicious", type=float, default=0.1, help="Part des paquets vers un port suspect")
+    parser.add_argument("--seed", type=int, default=105, help="Graine du générateur")
+    parser.add_argument("--format", choices=["text", "pcap"], default="text", help="Capture texte tcpdump ou pcap")
+    parser.add_argument("--workers", type=int, default=1, help="Processus d'analyse")
+    parser.add_argument("--approximate", action="store_true", help="Mesure le mode approximatif")
+    parser.add_argument("--sketch-size", type=int, default=10000, help="Taille des compteurs en mode approximatif")
+    parser.add_argument("--no-stages", action="store_true", help="Sans le détail des temps par étape (débit brut)")
+    parser.add_argument("--results", default=results_output, help="Fichier des résultats")
+    parser.add_argument("--history", action="store_true", help="Affiche les mesures enregistrées")
+    args = parser.parse_args()
+
+    results_path = os.path.abspath(args.results)
+    if args.history:
+        show_history(results_path)
+    else:
+        options = {
+            "work_directory": os.path.abspath(work_directory),
+            "format": args.format,
+            "ips": args.ips,
+            "ports": args.ports,
+            "suspicious": args.suspicious,
+            "seed": args.seed,
+            "workers": args.workers,
+            "approximate": args.approximate,
+            "sketch_size": args.sketch_size,
+            "stages": not args.no_stages,
+        }
+        benchmark([parse_count(size) for size in args.sizes.split(",")], options, results_path)
@@ -0,0 +1,137 @@
+# Générateur de captures tcpdump synthétiques pour mesurer les performances de SAE105
+# Le fichier produit ne dépend que des paramètres et de la graine : deux générations identiques donnent le même fichier
+# Exemple : python generateur.py 1000000 --ips 50000 --ports 2000 --suspicious 0.1 -o DumpFile.txt
+# Avec --format pcap, le même trafic est écrit au format pcap (comme tcpdump -w)
+import argparse  # Pour lire les options de la ligne de commande
+import os  # Pour écrire le pcap sur la sortie standard
+import random  # Pour un tirage reproductible (random.Random avec une graine)
+import socket  # Pour écrire les adresses IPv4 en binaire
+import struct  # Pour écrire les en-têtes pcap
+import sys  # Pour écrire sur la sortie standard
+
+suspicious_ports = [22, 80, 443, 50019]  # Ports des règles de détection par défaut de SAE105
+host_names = ["BP-Linux8", "par10s38-in-f3.1e100.net", "www.aggloroanne.fr", "mauves.univ-st-etienne.fr"]
+host_addresses = {"BP-Linux8": "192.168.190.130", "par10s38-in-f3.1e100.net": "216.58.198.195",
+                  "www.aggloroanne.fr": "185.31.40.11", "mauves.univ-st-etienne.fr": "161.3.1.71"}  # Au format pcap
+services = ["ssh", "https", "http", "domain"]
+service_ports = {"ssh": 22, "https": 443, "http": 80, "domain": 53}
+tcp_flag_bits = {"F": 1, "S": 2, "R": 4, "P": 8, ".": 16, "U": 32, "E": 64, "W": 128}
+pcap_epoch = 1700006400  # Minuit UTC du jour des paquets au format pcap
+flag_choices = ["S", "S.", ".", ".", "P.", "P.", "P.", "F.", "R."]  # Répartition proche d'une capture réelle
+lines_per_write = 10000  # Nombre de lignes écrites à la fois
+
+# Format HH:MM:SS.ffffff attendu par SAE105
+def format_timestamp(seconds):
+    microseconds = int(seconds * 1000000)
+    hours, remainder = divmod(microseconds, 3600000000)
+    minutes, remainder = divmod(remainder, 60000000)
+    return f"{hours:02d}:{minutes:02d}:{remainder // 1000000:02d}.{remainder % 1000000:06d}"
+
+# Génère line_count paquets répartis sur une journée (les timestamps tcpdump n'ont pas de date)
+# - ip_count adresses IP et port_count ports (hors ports suspects), les premiers plus fréquents que les derniers
+# - suspicious_share : part des paquets vers un port suspect
+# - environ 5 % d'extrémités avec un nom d'hôte et 5 % de paquets UDP (sans flags)
+# Un paquet est (secondes, source, port source, destination, port destination, flags, longueur, (nom d'hôte, service))
+def generate_packets(line_count, ip_count=1000, port_count=1000, suspicious_share=0.1, seed=105):
+    rng = random.Random(seed)
+    ips = [f"{rng.randrange(1, 224)}.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}" for _ in range(ip_count)]
+    ports = [rng.randrange(1024, 65536) for _ in range(port_count)]
+    step = 86400 / max(line_count, 1)
+    for i in range(line_count):
+        seconds = i * step
+        # Tirage biaisé vers le début des listes : quelques IP et ports concentrent le trafic
+        src = ips[int(ip_count * rng.random() ** 2)]
+        dst = ips[int(ip_count * rng.random() ** 2)]
+        src_port = ports[int(port_count * rng.random() ** 2)]
+        if rng.random() < suspicious_share:
+            dst_port = suspicious_ports[rng.randrange(len(suspicious_ports))]
+        else:
+            dst_port = ports[int(port_count * rng.random() ** 2)]
+        length = rng.choice((0, 0, 36, 108, 1448, rng.randrange(1, 1500)))
+        kind = rng.random()
+        if kind < 0.05:
+            host = host_names[rng.randrange(len(host_names))]
+            service = services[rng.randrange(len(services))]
+            yield seconds, host_addresses[host], service_ports[service], dst, src_port, rng.choice(flag_choices), length, (host, service)
+        elif kind < 0.10:
+            yield seconds, src, src_port, dst, 53, None, length, None
+        else:
+            yield seconds, src, src_port, dst, dst_port, rng.choice(flag_choices), length, None
+
+def format_line(packet):
+    seconds, src, src_port, dst, dst_port, flags, length, host = packet
+    timestamp = format_timestamp(seconds)
+    if host:
+        return f"{timestamp} IP {host[0]}.{host[1]} > {dst}.{dst_port}: Flags [{flags}], seq 1:{length + 1}, ack 1, win 312, length {length}\n"
+    if flags is None:
+        return f"{timestamp} IP {src}.{src_port} > {dst}.{dst_port}: UDP, length {length}\n"
+    return f"{timestamp} IP {src}.{src_port} > {dst}.{dst_port}: Flags [{flags}], seq 1:{length + 1}, ack 1, win 502, length {length}\n"
+
+def generate_lines(line_count, ip_count=1000, port_count=1000, suspicious_share=0.1, seed=105):
+    for packet in generate_packets(line_count, ip_count, port_count, suspicious_share, seed):
+        yield format_line(packet)
+
+# Enregistrement pcap d'un paquet : Ethernet, IPv4 et TCP ou UDP
+# Seuls les en-têtes sont enregistrés (comme avec un snaplen court) ; les longueurs des en-têtes restent celles du paquet complet
+def pcap_record(packet):
+    seconds, src, src_port, dst, dst_port, flags, length, _ = packet
+    if flags is None:
+        transport = struct.pack("!HHHH", src_port, dst_port, length + 8, 0)
+        protocol = 17
+    else:
+        flag_bits = sum(tcp_flag_bits[flag] for flag in flags)
+        transport = struct.pack("!HHIIBBHHH", src_port, dst_port, 1, 1, 5 << 4, flag_bits, 502, 0, 0)
+        protocol = 6
+    ip = struct.pack("!BBHHHBBH4s4s", 0x45, 0, 20 + len(transport) + length, 0, 0x4000, 64, protocol, 0,
+                     socket.inet_aton(src), socket.inet_aton(dst))
+    frame = b"\x00\x11\x22\x33\x44\x55\x66\x77\x88\x99\xaa\xbb\x08\x00" + ip + transport
+    whole, fraction = divmod(int(seconds * 1000000), 1000000)
+    return struct.pack("<IIII", pcap_epoch + whole, fraction, len(frame), len(frame) + length) + frame
+
+def write_dump(output, line_count, ip_count=1000, port_count=1000, suspicious_share=0.1, seed=105):
+    batch = []
+    for line in generate_lines(line_count, ip_count, port_count, suspicious_share, seed):
+        batch.append(line)
+        if len(batch) >= lines_per_write:
+            output.writelines(batch)
+            batch = []
+    output.writelines(batch)
+
+# Même trafic au format pcap (Ethernet) ; les extrémités avec un nom d'hôte deviennent l'adresse et le port du service
+def write_pcap(output, line_count, ip_count=1000, port_count=1000, suspicious_share=0.1, seed=105):
+    output.write(struct.pack("<IHHiIII", 0xa1b2c3d4, 2, 4, 0, 0, 65535, 1))
+    batch = []
+    for packet in generate_packets(line_count, ip_count, port_count, suspicious_share, seed):
+        batch.append(pcap_record(packet))
+        if len(batch) >= lines_per_write:
+            output.write(b"".join(batch))
+            batch = []
+    output.write(b"".join(batch))
+
+# Nombre de lignes avec suffixe : 10k, 1M, 100M
+def parse_count(text):
+    multipliers = {"k": 1000, "m": 1000000}
+    suffix = text[-1].lower()
+    if suffix in multipliers:
+        return int(float(text[:-1]) * multipliers[suffix])
+    return int(text)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Génère une capture tcpdump synthétique pour SAE105")
+    parser.add_argument("lines", type=parse_count, help="Nombre de lignes (ex. 10k, 1M, 100M)")
+    parser.add_argument("--ips", type=int, default=1000, help="Nombre d'adresses IP différentes")
+    parser.add_argument("--ports", type=int, default=1000, help="Nombre de ports différents (hors ports suspects)")
+    parser.add_argument("--suspicious", type=float, default=0.1, help="Part des paquets vers un port suspect (0 à 1)")
+    parser.add_argument("--seed", type=int, default=105, help="Graine du tirage aléatoire")
+    parser.add_argument("--format", choices=["text", "pcap"], default="text", help="Texte tcpdump ou fichier pcap")
+    parser.add_argument("-o", "--output", help="Fichier de sortie (sortie standard sinon)")
+    args = parser.parse_args()
+
+    if args.format == "pcap":
+        with open(args.output, "wb") if args.output else os.fdopen(sys.stdout.fileno(), "wb", closefd=False) as output_file:
+            write_pcap(output_file, args.lines, args.ips, args.ports, args.suspicious, args.seed)
+    elif args.output:
+        with open(args.output, "w", encoding="utf8") as output_file:
+            write_dump(output_file, args.lines, args.ips, args.ports, args.suspicious, args.seed)
+    else:
+        write_dump(sys.stdout, args.lines, args.ips, args.ports, args.suspicious, args.seed)
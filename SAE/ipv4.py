@@ -0,0 +1,199 @@
+# Adresses IPv4 représentées par des entiers sur 32 bits
+# - conversions texte <-> entier et lecture des filtres (adresse, préfixe "192.168." ou plage CIDR)
+# - IPv4Counter et IPv4Intervals : compteurs et intervalles de temps par adresse, rangés dans des tableaux numpy triés
+#   (12 à 20 octets par adresse au lieu de plusieurs centaines pour un dictionnaire de chaînes)
+# - regroupements par sous-réseau (/8, /16, /24) par décalage de bits
+import socket  # Pour la conversion texte -> entier (inet_pton refuse les octets > 255)
+from array import array  # Pour les ajouts en attente (un entier machine par ajout)
+import numpy as np  # Pour les tableaux triés et les regroupements
+
+pending_minimum = 1 << 16  # Nombre minimal d'ajouts en attente avant leur fusion dans les tableaux triés
+subnet_prefixes = (8, 16, 24)  # Longueurs de préfixe des regroupements par sous-réseau
+
+# Adresse IPv4 pointée -> entier (None si absente ou invalide, par exemple 192.168.1.300)
+def ip_to_int(ip):
+    try:
+        return int.from_bytes(socket.inet_pton(socket.AF_INET, ip), "big")
+    except (OSError, TypeError):
+        return None
+
+def int_to_ip(address):
+    return f"{address >> 24}.{address >> 16 & 255}.{address >> 8 & 255}.{address & 255}"
+
+# Affichage d'une clé d'adresse : entier IPv4, ou nom d'hôte / adresse IPv6 gardés en texte
+def format_address(address):
+    return int_to_ip(address) if isinstance(address, int) else address
+
+def network_label(network, prefix_length):
+    return f"{int_to_ip(network << (32 - prefix_length))}/{prefix_length}"
+
+# Filtre d'adresse -> (première adresse, dernière adresse, longueur de préfixe)
+# Accepte une adresse complète, une plage CIDR (10.0.0.0/8) ou un préfixe d'octets complets ("192.168." ou "192.168")
+# Lève ValueError si le texte n'est pas un filtre valide
+def parse_network(text):
+    address, slash, prefix_text = text.partition("/")
+    if slash:
+        if not prefix_text.isdigit() or not 0 <= int(prefix_text) <= 32:
+            raise ValueError(f"Longueur de préfixe invalide : {text}")
+        prefix_length = int(prefix_text)
+        octets = address.split(".")
+    else:
+        octets = address.rstrip(".").split(".")
+        prefix_length = 8 * len(octets)
+        octets += ["0"] * (4 - len(octets))
+    if len(octets) != 4 or not all(octet.isdigit() and int(octet) <= 255 for octet in octets):
+        raise ValueError(f"Adresse IP invalide : {text}")
+    value = int(octets[0]) << 24 | int(octets[1]) << 16 | int(octets[2]) << 8 | int(octets[3])
+    mask = (0xffffffff << (32 - prefix_length)) & 0xffffffff
+    low = value & mask
+    return low, low | (~mask & 0xffffffff), prefix_length
+
+# Compteur exact d'adresses IPv4, s'utilise comme un Counter : add(ip), most_common(n), update(other), counter[ip]
+# Les ajouts sont d'abord écrits à la suite dans un tableau, puis fusionnés par lots dans deux tableaux numpy :
+# adresses triées et totaux. Le lot grandit avec le nombre d'adresses, ce qui garde la fusion amortie.
+class IPv4Counter:
+    def __init__(self):
+        self.keys = np.empty(0, dtype=np.uint32)
+        self.counts = np.empty(0, dtype=np.uint64)
+        self.pending = array("I")
+
+    def add(self, address):
+        pending = self.pending
+        pending.append(address)
+        if len(pending) >= pending_minimum and len(pending) >= len(self.keys):
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        keys, counts = np.unique(np.frombuffer(self.pending, dtype=np.uint32), return_counts=True)
+        self.pending = array("I")
+        self.merge(keys, counts.astype(np.uint64))
+
+    def merge(self, keys, counts):
+        if len(self.keys):
+            keys = np.concatenate([self.keys, keys])
+            counts = np.concatenate([self.counts, counts])
+            order = np.argsort(keys, kind="stable")
+            keys, counts = keys[order], counts[order]
+            starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+            keys, counts = keys[starts], np.add.reduceat(counts, starts)
+        self.keys, self.counts = keys, counts
+
+    def __getitem__(self, address):
+        self.flush()
+        position = np.searchsorted(self.keys, address)
+        if position < len(self.keys) and self.keys[position] == address:
+            return int(self.counts[position])
+        return 0
+
+    def __contains__(self, address):
+        return self[address] > 0
+
+    def __len__(self):
+        self.flush()
+        return len(self.keys)
+
+    def items(self):
+        self.flush()
+        return zip(self.keys.tolist(), self.counts.tolist())
+
+    # Les n adresses les plus fréquentes, à égalité dans l'ordre des adresses
+    def most_common(self, n=None):
+        self.flush()
+        counts = self.counts
+        if n is None or n >= len(counts):
+            selected = np.arange(len(counts))
+        else:
+            selected = np.argpartition(counts, len(counts) - n)[len(counts) - n:]
+        selected = selected[np.lexsort((self.keys[selected], -counts[selected].astype(np.int64)))]
+        return list(zip(self.keys[selected].tolist(), counts[selected].tolist()))
+
+    # Fusion d'un autre compteur (analyse parallèle)
+    def update(self, other):
+        self.flush()
+        other.flush()
+        self.merge(other.keys, other.counts)
+
+    # Totaux par sous-réseau : les adresses étant triées, celles d'un même sous-réseau se suivent
+    def subnets(self, prefix_length):
+        self.flush()
+        networks = self.keys >> np.uint32(32 - prefix_length)
+        if not len(networks):
+            return {}
+        starts = np.flatnonzero(np.r_[True, networks[1:] != networks[:-1]])
+        return dict(zip(networks[starts].tolist(), np.add.reduceat(self.counts, starts).tolist()))
+
+# Première et dernière apparition (secondes depuis minuit) de chaque adresse IPv4
+# Même organisation qu'IPv4Counter : ajouts en attente puis fusion dans des tableaux triés
+class IPv4Intervals:
+    def __init__(self):
+        self.keys = np.empty(0, dtype=np.uint32)
+        self.first_seen = np.empty(0, dtype=np.float64)
+        self.last_seen = np.empty(0, dtype=np.float64)
+        self.pending = array("I")
+        self.pending_seconds = array("d")
+
+    def add(self, address, seconds):
+        self.pending.append(address)
+        self.pending_seconds.append(seconds)
+        if len(self.pending) >= pending_minimum and len(self.pending) >= len(self.keys):
+            self.flush()
+
+    # Nombre d'adresses connues, majoré sans fusionner les ajouts en attente
+    def size_bound(self):
+        return len(self.keys) + len(self.pending)
+
+    def flush(self):
+        if not self.pending:
+            return
+        keys = np.frombuffer(self.pending, dtype=np.uint32)
+        seconds = np.frombuffer(self.pending_seconds, dtype=np.float64)
+        self.merge(keys, seconds, seconds)
+        self.pending = array("I")
+        self.pending_seconds = array("d")
+
+    def merge(self, keys, first_seen, last_seen):
+        keys = np.concatenate([self.keys, keys])
+        first_seen = np.concatenate([self.first_seen, first_seen])
+        last_seen = np.concatenate([self.last_seen, last_seen])
+        order = np.argsort(keys, kind="stable")
+        keys, first_seen, last_seen = keys[order], first_seen[order], last_seen[order]
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.empty(0, dtype=np.intp)
+        self.keys = keys[starts]
+        self.first_seen = np.minimum.reduceat(first_seen, starts) if len(keys) else first_seen
+        self.last_seen = np.maximum.reduceat(last_seen, starts) if len(keys) else last_seen
+
+    # (première apparition, dernière apparition) ou None
+    def get(self, address):
+        self.flush()
+        position = np.searchsorted(self.keys, address)
+        if position < len(self.keys) and self.keys[position] == address:
+            return float(self.first_seen[position]), float(self.last_seen[position])
+        return None
+
+    # Même résultat que get pour une liste d'adresses, en une recherche vectorisée
+    def lookup(self, addresses):
+        self.flush()
+        addresses = np.fromiter(addresses, dtype=np.uint32)
+        positions = np.minimum(np.searchsorted(self.keys, addresses), max(len(self.keys) - 1, 0))
+        if not len(self.keys):
+            return [None] * len(addresses)
+        found = (self.keys[positions] == addresses).tolist()
+        return [(first, last) if present else None for present, first, last in
+                zip(found, self.first_seen[positions].tolist(), self.last_seen[positions].tolist())]
+
+    def __len__(self):
+        self.flush()
+        return len(self.keys)
+
+    def update(self, other):
+        self.flush()
+        other.flush()
+        self.merge(other.keys, other.first_seen, other.last_seen)
+
+    # Ne garde que les adresses données (mode approximatif : celles encore suivies par le compteur)
+    def retain(self, addresses):
+        self.flush()
+        kept = np.isin(self.keys, np.fromiter(addresses, dtype=np.uint32))
+        self.keys, self.first_seen, self.last_seen = self.keys[kept], self.first_seen[kept], self.last_seen[kept]
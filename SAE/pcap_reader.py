@@ -0,0 +1,316 @@
+# Lecture directe des captures pcap et pcapng (tcpdump -w, Wireshark, ...), sans passer par la sortie texte de tcpdump
+# Le fichier est projeté en mémoire (mmap) et chaque en-tête est décodé avec struct.unpack_from à sa position :
+# les paquets ne sont jamais copiés. Une capture compressée avec gzip est lue comme un flux, bloc par bloc.
+# Chaque paquet IP donne les champs affichés par tcpdump -n : adresses, ports, flags TCP et longueur des données
+import gzip  # Pour les captures compressées
+import ipaddress  # Pour l'écriture des adresses IPv6
+import mmap  # Pour lire le fichier sans le charger
+import os  # Pour la taille du fichier
+import struct  # Pour décoder les en-têtes binaires
+from functools import lru_cache  # Pour ne convertir chaque adresse qu'une fois
+
+gzip_magic = b"\x1f\x8b"
+pcapng_magic = b"\x0a\x0d\x0d\x0a"  # Type du Section Header Block, identique dans les deux ordres d'octets
+# 4 premiers octets d'un fichier pcap -> (ordre des octets, diviseur de la partie fractionnaire du timestamp)
+pcap_magics = {
+    b"\xd4\xc3\xb2\xa1": ("<", 1000000),
+    b"\xa1\xb2\xc3\xd4": (">", 1000000),
+    b"\x4d\x3c\xb2\xa1": ("<", 1000000000),  # Timestamps en nanosecondes
+    b"\xa1\xb2\x3c\x4d": (">", 1000000000),
+}
+pcapng_byte_orders = {b"\x4d\x3c\x2b\x1a": "<", b"\x1a\x2b\x3c\x4d": ">"}
+stream_chunk_size = 1 << 20  # Taille des blocs lus dans une capture compressée
+max_record_size = 1 << 26  # Au-delà, l'enregistrement est considéré comme corrompu
+
+# Types de lien (LINKTYPE_*) reconnus
+link_ethernet = 1
+link_null = 0  # Boucle locale BSD : famille d'adresses sur 4 octets dans l'ordre de la machine
+link_loop = 108  # Boucle locale OpenBSD : famille d'adresses sur 4 octets, ordre réseau
+link_raw = (101, 12, 14)  # IP brut (la version est lue dans le paquet)
+link_ipv4 = 228
+link_ipv6 = 229
+link_linux_sll = 113  # tcpdump -i any
+link_linux_sll2 = 276
+vlan_ethertypes = (0x8100, 0x88a8, 0x9100)
+ipv6_extension_headers = (0, 43, 60)  # Hop-by-hop, routage, options de destination
+
+# Flags TCP dans l'ordre d'affichage de tcpdump : octet des flags -> texte ("S.", "P.", "F.", ...)
+tcp_flag_letters = [(1, "F"), (2, "S"), (4, "R"), (8, "P"), (16, "."), (32, "U"), (64, "E"), (128, "W")]
+tcp_flags_text = ["".join(letter for bit, letter in tcp_flag_letters if value & bit) or "none" for value in range(256)]
+
+pcap_record_headers = {byte_order: struct.Struct(byte_order + "IIII") for byte_order in "<>"}
+ipv4_header = struct.Struct("!BxHxxHxBxxII")  # Version et longueur d'en-tête, longueur totale, fragment, protocole, adresses
+ipv6_header = struct.Struct("!4xHBx16s16s")  # Longueur des données, en-tête suivant, adresses
+tcp_header = struct.Struct("!HH8xBB")  # Ports, longueur de l'en-tête, flags
+udp_header = struct.Struct("!HHH")  # Ports, longueur
+ethertype_field = struct.Struct("!H")
+# Ethernet, IPv4 sans options et début de l'en-tête TCP (ou UDP) lus en un seul appel : cas le plus courant
+ethernet_ipv4_header = struct.Struct("!12xHBxHxxHxBxxIIHHIIBB")
+
+# Adresse IPv4 sur 32 bits -> texte pointé
+@lru_cache(maxsize=65536)
+def ipv4_text(address):
+    return f"{address >> 24}.{address >> 16 & 255}.{address >> 8 & 255}.{address & 255}"
+
+@lru_cache(maxsize=65536)
+def ipv6_text(address):
+    return ipaddress.IPv6Address(address).compressed
+
+# Format d'une capture : ("text" | "pcap" | "pcapng", compressée avec gzip ou non)
+def capture_format(path):
+    with open(path, "rb") as file:
+        magic = file.read(4)
+    compressed = magic[:2] == gzip_magic
+    if compressed:
+        with gzip.open(path, "rb") as file:
+            magic = file.read(4)
+    if magic in pcap_magics:
+        return "pcap", compressed
+    if magic == pcapng_magic:
+        return "pcapng", compressed
+    return "text", compressed
+
+# État de lecture au début d'une capture et position du premier enregistrement
+# pcap : ordre des octets, précision des timestamps et type de lien de l'en-tête global
+# pcapng : ordre des octets et interfaces (type de lien, résolution), lus au fil des blocs
+def read_header(buffer):
+    magic = bytes(buffer[:4])
+    if magic in pcap_magics:
+        byte_order, divisor = pcap_magics[magic]
+        link_type = struct.unpack_from(byte_order + "I", buffer, 20)[0] & 0xffff
+        return {"format": "pcap", "byte_order": byte_order, "divisor": divisor, "link_type": link_type, "offset": 24}, 24
+    if magic == pcapng_magic:
+        return {"format": "pcapng", "byte_order": "<", "interfaces": [], "offset": 0}, 0
+    raise ValueError("Ce fichier n'est pas une capture pcap ou pcapng")
+
+# Copie de l'état, pour commencer la lecture au milieu du fichier (analyse parallèle)
+def copy_state(state):
+    state = dict(state)
+    if "interfaces" in state:
+        state["interfaces"] = list(state["interfaces"])
+    return state
+
+# Trames d'un fichier pcap entre start et end :
+# (secondes depuis 1970, microsecondes, type de lien, position des données, octets capturés, fin de l'enregistrement)
+# Un enregistrement incomplet en fin de tampon n'est pas lu ; state["offset"] indique où reprendre
+def pcap_frames(buffer, start, end, state):
+    record_header = pcap_record_headers[state["byte_order"]]
+    to_microseconds = state["divisor"] // 1000000
+    link_type = state["link_type"]
+    offset = start
+    while offset + 16 <= end:
+        seconds, fraction, captured, _ = record_header.unpack_from(buffer, offset)
+        if captured > max_record_size:
+            raise ValueError(f"Enregistrement pcap invalide à l'octet {offset}")
+        data = offset + 16
+        if data + captured > end:
+            break
+        offset = data + captured
+        yield seconds, fraction // to_microseconds, link_type, data, captured, offset
+    state["offset"] = offset
+
+# Résolution des timestamps d'une interface pcapng (option if_tsresol, microseconde par défaut)
+def interface_resolution(buffer, start, end, byte_order):
+    offset = start
+    while offset + 4 <= end:
+        code, length = struct.unpack_from(byte_order + "HH", buffer, offset)
+        if code == 0:  # opt_endofopt
+            break
+        if code == 9 and length >= 1:  # if_tsresol
+            value = buffer[offset + 4]
+            return 2 ** (value & 0x7f) if value & 0x80 else 10 ** value
+        offset += 4 + (length + 3) // 4 * 4
+    return 1000000
+
+# Timestamp pcapng (en unités de la résolution de l'interface) -> (secondes, microsecondes)
+def split_ticks(ticks, resolution):
+    seconds, remainder = divmod(ticks, resolution)
+    return seconds, remainder * 1000000 // resolution
+
+# Trames d'un fichier pcapng : même forme que pcap_frames
+# Les blocs d'en-tête de section et de description d'interface mettent l'état à jour au passage
+def pcapng_frames(buffer, start, end, state):
+    offset = start
+    while offset + 12 <= end:
+        block_type_bytes = bytes(buffer[offset:offset + 4])
+        if block_type_bytes == pcapng_magic:
+            byte_order = pcapng_byte_orders.get(bytes(buffer[offset + 8:offset + 12]))
+            if byte_order is None:
+                raise ValueError(f"Section pcapng invalide à l'octet {offset}")
+            state["byte_order"] = byte_order
+            state["interfaces"] = []  # Les interfaces sont propres à chaque section
+        byte_order = state["byte_order"]
+        block_type, block_length = struct.unpack_from(byte_order + "II", buffer, offset)
+        if block_length < 12 or block_length % 4 or block_length > max_record_size:
+            raise ValueError(f"Bloc pcapng invalide à l'octet {offset}")
+        block_end = offset + block_length
+        if block_end > end:
+            break
+        if block_type == 6:  # Enhanced Packet Block
+            interface, high, low, captured = struct.unpack_from(byte_order + "IIII", buffer, offset + 8)
+            link_type, resolution = state["interfaces"][interface]
+            yield *split_ticks((high << 32) | low, resolution), link_type, offset + 28, captured, block_end
+        elif block_type == 3:  # Simple Packet Block : pas de timestamp
+            original = struct.unpack_from(byte_order + "I", buffer, offset + 8)[0]
+            yield 0, 0, state["interfaces"][0][0], offset + 12, min(original, block_length - 16), block_end
+        elif block_type == 2:  # Packet Block (obsolète)
+            interface, _, high, low, captured = struct.unpack_from(byte_order + "HHIII", buffer, offset + 8)
+            link_type, resolution = state["interfaces"][interface]
+            yield *split_ticks((high << 32) | low, resolution), link_type, offset + 28, captured, block_end
+        elif block_type == 1:  # Interface Description Block
+            link_type = struct.unpack_from(byte_order + "H", buffer, offset + 8)[0]
+            state["interfaces"].append((link_type, interface_resolution(buffer, offset + 16, block_end - 4, byte_order)))
+        offset = block_end
+    state["offset"] = offset
+
+def capture_frames(buffer, start, end, state):
+    if state["format"] == "pcap":
+        return pcap_frames(buffer, start, end, state)
+    return pcapng_frames(buffer, start, end, state)
+
+# Décodage d'une trame jusqu'à la couche transport
+# Retourne (version IP, adresse source, port source, adresse destination, port destination, protocole, flags, longueur)
+# ou None si la trame ne contient pas de paquet IP. Les adresses IPv4 sont des entiers sur 32 bits (ipv4_text pour
+# l'affichage), les adresses IPv6 sont écrites comme par tcpdump -n.
+# Comme tcpdump, la longueur est celle des données TCP ou UDP (de l'IP pour les autres protocoles),
+# lue dans les en-têtes : elle est juste même si la capture a été tronquée (snaplen)
+def decode_frame(buffer, link_type, offset, captured):
+    if link_type == link_ethernet and captured >= 48:
+        ethertype, version_length, total_length, fragment, protocol, src, dst, src_port, dst_port, sequence, _, data_offset, flags = \
+            ethernet_ipv4_header.unpack_from(buffer, offset)
+        if ethertype == 0x0800 and version_length == 0x45 and not fragment & 0x1fff:
+            if protocol == 6:
+                return 4, src, src_port, dst, dst_port, 6, tcp_flags_text[flags], total_length - 20 - (data_offset >> 4) * 4
+            if protocol == 17:  # Les deux premiers octets du « numéro de séquence » sont la longueur UDP
+                return 4, src, src_port, dst, dst_port, 17, None, (sequence >> 16) - 8
+
+    end = offset + captured
+    if link_type == link_ethernet:
+        if captured < 14:
+            return None
+        ethertype = ethertype_field.unpack_from(buffer, offset + 12)[0]
+        offset += 14
+        while ethertype in vlan_ethertypes and offset + 4 <= end:  # Étiquettes 802.1Q
+            ethertype = ethertype_field.unpack_from(buffer, offset + 2)[0]
+            offset += 4
+    elif link_type == link_linux_sll:
+        if captured < 16:
+            return None
+        ethertype = ethertype_field.unpack_from(buffer, offset + 14)[0]
+        offset += 16
+    elif link_type == link_linux_sll2:
+        if captured < 20:
+            return None
+        ethertype = ethertype_field.unpack_from(buffer, offset)[0]
+        offset += 20
+    elif link_type in (link_null, link_loop):
+        if captured < 4:
+            return None
+        family = struct.unpack_from("<I" if link_type == link_null else ">I", buffer, offset)[0]
+        if family > 0xffff:  # Capture lue sur une machine de l'autre boutisme
+            family = struct.unpack_from(">I" if link_type == link_null else "<I", buffer, offset)[0]
+        ethertype = 0x0800 if family == 2 else 0x86dd if family in (10, 24, 28, 30) else None
+        offset += 4
+    elif link_type in link_raw or link_type in (link_ipv4, link_ipv6):
+        if captured < 1:
+            return None
+        ethertype = 0x0800 if buffer[offset] >> 4 == 4 else 0x86dd if buffer[offset] >> 4 == 6 else None
+    else:
+        return None
+
+    if ethertype == 0x0800:
+        if offset + 20 > end:
+            return None
+        # Adresses IPv4 : entiers sur 32 bits (ipv4_text pour l'affichage)
+        version_length, total_length, fragment, protocol, src_address, dst_address = ipv4_header.unpack_from(buffer, offset)
+        header_length = (version_length & 15) * 4
+        version = 4
+        payload_length = total_length - header_length
+        transport = offset + header_length
+        if fragment & 0x1fff:  # Fragment suivant : pas d'en-tête transport
+            return version, src_address, None, dst_address, None, protocol, None, payload_length
+    elif ethertype == 0x86dd:
+        if offset + 40 > end:
+            return None
+        payload_length, protocol, src, dst = ipv6_header.unpack_from(buffer, offset)
+        version = 6
+        src_address = ipv6_text(src)  # Adresses IPv6 : texte, comme tcpdump -n
+        dst_address = ipv6_text(dst)
+        transport = offset + 40
+        while protocol in ipv6_extension_headers and transport + 8 <= end:
+            extension_length = (buffer[transport + 1] + 1) * 8
+            protocol = buffer[transport]
+            payload_length -= extension_length
+            transport += extension_length
+        if protocol == 44:  # Fragment IPv6
+            if transport + 8 > end:
+                return version, src_address, None, dst_address, None, protocol, None, payload_length
+            fragment = struct.unpack_from("!H", buffer, transport + 2)[0]
+            protocol = buffer[transport]
+            payload_length -= 8
+            transport += 8
+            if fragment & 0xfff8:
+                return version, src_address, None, dst_address, None, protocol, None, payload_length
+    else:
+        return None
+
+    if protocol == 6 and transport + 14 <= end:
+        src_port, dst_port, data_offset, flags = tcp_header.unpack_from(buffer, transport)
+        return version, src_address, src_port, dst_address, dst_port, protocol, tcp_flags_text[flags], payload_length - (data_offset >> 4) * 4
+    if protocol == 17 and transport + 8 <= end:
+        src_port, dst_port, udp_length = udp_header.unpack_from(buffer, transport)
+        return version, src_address, src_port, dst_address, dst_port, protocol, None, udp_length - 8
+    return version, src_address, None, dst_address, None, protocol, None, payload_length
+
+# Paquets d'une capture : (secondes depuis 1970, microsecondes, octets capturés, paquet décodé ou None)
+# Sans start/end, toute la capture est lue ; sinon seuls les enregistrements entre start et end, avec l'état
+# renvoyé par split_capture. Une capture compressée est lue par blocs de stream_chunk_size octets.
+def read_packets(path, start=None, end=None, state=None):
+    if os.path.getsize(path) == 0:
+        return
+    _, compressed = capture_format(path)
+    if compressed:
+        yield from read_compressed_packets(path)
+        return
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        if state is None:
+            state, start = read_header(buffer)
+            end = len(buffer)
+        else:
+            state = copy_state(state)
+        for seconds, microseconds, link_type, data, captured, _ in capture_frames(buffer, start, end, state):
+            yield seconds, microseconds, captured, decode_frame(buffer, link_type, data, captured)
+
+def read_compressed_packets(path):
+    with gzip.open(path, "rb") as file:
+        buffer = file.read(stream_chunk_size)
+        if len(buffer) < 24:
+            return
+        state, offset = read_header(buffer)
+        while True:
+            for seconds, microseconds, link_type, data, captured, _ in capture_frames(buffer, offset, len(buffer), state):
+                yield seconds, microseconds, captured, decode_frame(buffer, link_type, data, captured)
+            chunk = file.read(stream_chunk_size)
+            if not chunk:
+                break  # Un enregistrement incomplet en fin de fichier (capture interrompue) est ignoré
+            buffer = buffer[state["offset"]:] + chunk  # Seule la fin non lue du bloc précédent est recopiée
+            offset = 0
+
+# Découpe une capture non compressée en plages d'enregistrements de tailles proches
+# Retourne des (début, fin, état au début de la plage) pour read_packets
+def split_capture(path, chunk_count):
+    if os.path.getsize(path) == 0:
+        return []
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        state, start = read_header(buffer)
+        size = len(buffer)
+        ranges = []
+        range_start, range_state = start, copy_state(state)
+        target = size // chunk_count
+        for *_, next_offset in capture_frames(buffer, start, size, state):
+            if next_offset >= target and len(ranges) < chunk_count - 1:
+                ranges.append((range_start, next_offset, range_state))
+                range_start, range_state = next_offset, copy_state(state)
+                target = size * (len(ranges) + 1) // chunk_count
+        ranges.append((range_start, size, range_state))
+    return ranges
@@ -0,0 +1,140 @@
+# Structures approximatives à mémoire bornée pour l'analyse des grosses captures
+# - SpaceSaving : les clés les plus fréquentes (adresses IP, ports) avec une erreur maximale connue
+# - HyperLogLog : le nombre de clés distinctes (sources, destinations) avec quelques Ko de mémoire
+import hashlib  # Pour un hachage stable d'un processus à l'autre (hash() change à chaque lancement)
+import heapq  # Pour retrouver rapidement le compteur le plus petit
+import math  # Pour l'estimation HyperLogLog
+
+
+# Algorithme Space-Saving (Metwally et al.)
+# Au plus capacity clés sont suivies. Quand une nouvelle clé arrive et que le résumé est plein,
+# elle remplace la clé la moins comptée et hérite de son compteur : chaque compteur surestime
+# la valeur exacte d'au plus total / capacity.
+# La classe s'utilise comme un Counter dans l'analyse : counter[key] += 1 (ou add(key)), most_common(n), update(other)
+class SpaceSaving:
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.total = 0  # Nombre total d'occurrences vues
+        self.counts = {}  # Clé -> compteur (surestimé)
+        self.errors = {}  # Clé -> surestimation maximale de son compteur
+        self.heap = []  # (compteur, clé) ; une entrée par clé, éventuellement en retard sur counts
+
+    def __contains__(self, key):
+        return key in self.counts
+
+    def __len__(self):
+        return len(self.counts)
+
+    def __getitem__(self, key):
+        return self.counts.get(key, 0)
+
+    # Appelé par counter[key] += 1 : value vaut l'ancien compteur plus l'incrément
+    def __setitem__(self, key, value):
+        counts = self.counts
+        if key in counts:
+            self.total += value - counts[key]
+            counts[key] = value
+            return
+        self.total += value  # Clé absente : __getitem__ a renvoyé 0, value est l'incrément
+        if len(counts) < self.capacity:
+            counts[key] = value
+            self.errors[key] = 0
+            heapq.heappush(self.heap, (value, key))
+        else:
+            # La nouvelle clé remplace la clé la moins comptée et hérite de son compteur
+            minimum, evicted = self.pop_minimum()
+            del counts[evicted]
+            del self.errors[evicted]
+            counts[key] = minimum + value
+            self.errors[key] = minimum
+            heapq.heappush(self.heap, (minimum + value, key))
+
+    # Même interface qu'IPv4Counter.add
+    def add(self, key):
+        self[key] = self.counts.get(key, 0) + 1
+
+    # Retire la clé de plus petit compteur ; les entrées en retard du tas sont remises à jour au passage
+    def pop_minimum(self):
+        while True:
+            count, key = heapq.heappop(self.heap)
+            if self.counts[key] == count:
+                return count, key
+            heapq.heappush(self.heap, (self.counts[key], key))
+
+    def most_common(self, n=None):
+        items = sorted(self.counts.items(), key=lambda item: item[1], reverse=True)
+        return items if n is None else items[:n]
+
+    def items(self):
+        return self.counts.items()
+
+    # Erreur maximale sur n'importe quel compteur
+    def error_bound(self):
+        return self.total // self.capacity
+
+    # Compteur minimal d'un résumé plein : une clé absente a pu être comptée jusqu'à ce nombre de fois
+    # avant d'être remplacée. Un résumé pas encore plein n'a rien remplacé : 0
+    def minimum_count(self):
+        return min(self.counts.values()) if len(self.counts) >= self.capacity else 0
+
+    # Fusion d'un autre résumé (analyse parallèle) : les compteurs sont additionnés puis seules les
+    # capacity clés les plus comptées sont gardées. Une clé absente d'un résumé plein y reçoit le
+    # compteur minimal de ce résumé, ajouté aussi à son erreur : les compteurs fusionnés restent des
+    # surestimations. Les erreurs des deux résumés s'additionnent.
+    def update(self, other):
+        own_minimum = self.minimum_count()
+        other_minimum = other.minimum_count()
+        counts = {}
+        errors = {}
+        for key in {**self.counts, **other.counts}:
+            if key in self.counts:
+                count, error = self.counts[key], self.errors[key]
+            else:
+                count, error = own_minimum, own_minimum
+            if key in other.counts:
+                count += other.counts[key]
+                error += other.errors[key]
+            else:
+                count += other_minimum
+                error += other_minimum
+            counts[key] = count
+            errors[key] = error
+        kept = sorted(counts.items(), key=lambda item: item[1], reverse=True)[:self.capacity]
+        self.total += other.total
+        self.counts = dict(kept)
+        self.errors = {key: errors[key] for key in self.counts}
+        self.heap = [(count, key) for key, count in kept]
+        heapq.heapify(self.heap)
+
+
+# HyperLogLog : estimation du nombre de valeurs distinctes
+# 2 ** precision registres d'un octet ; erreur relative typique de 1.04 / sqrt(2 ** precision)
+# (precision = 14 : 16 Ko et environ 0.8 % d'erreur)
+class HyperLogLog:
+    def __init__(self, precision=14):
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(self.size)
+
+    def add(self, value):
+        hashed = int.from_bytes(hashlib.blake2b(str(value).encode("utf8"), digest_size=8).digest(), "little")
+        index = hashed & (self.size - 1)
+        remaining = hashed >> self.precision
+        rank = (64 - self.precision) - remaining.bit_length() + 1  # Position du premier bit à 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self):
+        alpha = 0.7213 / (1 + 1.079 / self.size)
+        estimate = alpha * self.size * self.size / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.size and zeros:
+            estimate = self.size * math.log(self.size / zeros)  # Correction pour les petites cardinalités
+        return round(estimate)
+
+    def relative_error(self):
+        return 1.04 / math.sqrt(self.size)
+
+    # Fusion : maximum registre par registre
+    def update(self, other):
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
@@ -0,0 +1,171 @@
+# Tests de SAE105 (python -m pytest)
+import sqlite3
+
+import pytest
+
+import SAE105
+from SAE105 import parse_line, new_histogram, merge_histogram, busiest_window, find_bursts, active_range
+from SAE105 import create_packet_index, insert_packets, finalize_packet_index, build_packet_filter, query_packet_index
+from SAE105 import new_aggregates, update_counters, compile_rules, detect_suspicious_activity, update_flows, flow_state
+from SAE105 import analyse_dump, analyse_dump_parallel, publish_api_data
+
+def test_parse_line_ipv4():
+    packet = parse_line("11:42:04.766656 IP 10.0.0.1.22 > 10.0.0.2.50019: Flags [P.], seq 1:37, ack 1, win 502, length 36\n")
+    assert (packet.src, packet.src_port, packet.dst, packet.dst_port) == ("10.0.0.1.22", 22, "10.0.0.2.50019", 50019)
+    assert (packet.flags, packet.length) == ("P.", 36)
+
+# Les ':' d'une adresse IPv6 ne terminent pas l'extrémité : seul le ':' suivi d'un blanc le fait
+def test_parse_line_ipv6():
+    packet = parse_line("11:42:04.766656 IP6 fe80::1.546 > ff02::1:2.547: UDP, length 100\n")
+    assert (packet.src, packet.src_port, packet.dst, packet.dst_port) == ("fe80::1.546", 546, "ff02::1:2.547", 547)
+    assert packet.src_ip is None and packet.dst_ip is None  # Pas d'entier IPv4 pour une adresse IPv6
+    assert packet.length == 100
+
+# Histogrammes : fenêtre la plus chargée (la plus tardive à égalité), pics et fusion
+def test_histogram_windows():
+    histogram = new_histogram(1)
+    packets = histogram["packets"]
+    for second, count in ((10, 4), (11, 4), (500, 8), (3600, 1)):
+        packets[second] = count
+    assert busiest_window(packets, 1) == (500, 8)
+    assert busiest_window(packets, 2) == (500, 8)  # Fenêtres 499-500 et 500-501 à égalité : la plus tardive
+    assert busiest_window(packets, 10) == (500, 8)
+    assert active_range(packets) == (10, 3600)
+    assert find_bursts(packets, factor=1.5) == [(500, 8)]
+    other = new_histogram(1)
+    other["packets"][10] = 6
+    merge_histogram(histogram, other)
+    assert packets[10] == 10 and busiest_window(packets, 2) == (10, 14)
+
+# Index de paquets : 1 paquet sur 50 vient de 10.0.0.1 (filtre étroit), 1 sur 2 va vers le port 443 (filtre large)
+def write_packet_index(db_path):
+    lines = []
+    for number in range(3000):
+        src = "10.0.0.1" if number % 50 == 0 else f"10.1.{number // 250}.{number % 250}"
+        port = 443 if number % 2 else 80
+        lines.append(f"12:00:{number % 60:02d}.{number:06d} IP {src}.40000 > 10.2.0.1.{port}: Flags [S], length {number}\n")
+    connection = create_packet_index(db_path)
+    insert_packets(connection, [parse_line(line) for line in lines])
+    finalize_packet_index(connection)
+
+# Pages lues par clé : mêmes lignes qu'avec LIMIT / OFFSET, y compris sans les lignes brutes
+def test_query_packet_index_pages(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "Paquets.sqlite")
+    write_packet_index(db_path)
+    connection = sqlite3.connect(db_path)
+    for ip_filter, port_filter in (("10.0.0.1", ""), ("", "443"), ("10.1.0.0/16", "80"), ("", "1")):
+        where, params = build_packet_filter(ip_filter, port_filter)
+        expected = [row[0] for row in connection.execute(f"SELECT line FROM packets WHERE {where} ORDER BY id", params)]
+        page_count = max((len(expected) + 99) // 100, 1)
+        for page_number in (0, 1, page_count // 2, page_count - 1, page_count + 5):
+            result = query_packet_index(db_path, ip_filter, port_filter, page_number, version="test")
+            assert result["count"] == len(expected)
+            assert result["page_number"] == min(page_number, page_count - 1)
+            assert result["lines"] == expected[result["offset"]:result["offset"] + 100]
+    connection.close()
+
+    monkeypatch.setitem(SAE105.index_settings, "lines", False)
+    db_path = str(tmp_path / "Paquets_sans_lignes.sqlite")
+    write_packet_index(db_path)
+    result = query_packet_index(db_path, "10.0.0.1", "", version="test")
+    assert result["count"] == 60
+    assert result["lines"][1] == "12:00:50.000050 IP 10.0.0.1.40000 > 10.2.0.1.80: Flags [S], length 50"
+
+def tcp_line(timestamp, src, dst, flags, length=0):
+    return parse_line(f"{timestamp} IP {src} > {dst}: Flags [{flags}], length {length}\n")
+
+# Règles : plages CIDR et de ports, flags présents et absents, débit de ports par source (une alerte par fenêtre)
+def test_rules():
+    rules = [
+        {"name": "X11", "ports": ["6000-6063"], "cidr": ["10.0.0.0/8"]},
+        {"name": "SYN sans ACK vers 80", "ports": [80], "flags": "S", "not_flags": "."},
+        {"name": "Scan", "flags": "S", "not_flags": ".", "distinct_ports": 3, "window": 1},
+    ]
+    aggregates = new_aggregates(rules=rules)
+    records = [
+        tcp_line("10:00:00.000000", "10.1.2.3.40000", "172.16.0.1.6010", "S"),
+        tcp_line("10:00:00.100000", "192.168.0.1.40000", "172.16.0.1.6010", "S"),  # Hors des plages CIDR
+        tcp_line("10:00:00.200000", "192.168.0.1.40000", "172.16.0.1.80", "S."),  # ACK présent
+        tcp_line("10:00:00.300000", "192.168.0.1.40001", "172.16.0.1.80", "S"),
+    ]
+    records += [tcp_line(f"10:00:01.{port:06d}", "192.168.0.9.40000", f"172.16.0.1.{port}", "S") for port in range(1, 9)]
+    records += [tcp_line(f"10:00:02.{port:06d}", "192.168.0.9.40000", f"172.16.0.1.{port}", "S") for port in range(9, 13)]
+    for record in records:
+        detect_suspicious_activity(aggregates, record)
+    assert aggregates["rule_hits"] == {"X11": 1, "SYN sans ACK vers 80": 1, "Scan": 2}  # Deux fenêtres au-dessus du seuil
+    assert {(alert["rule"], alert["source"], alert["port"], alert["count"]) for alert in aggregates["alerts"].values()} == {
+        ("X11", "10.1.2.3", 6010, 1), ("SYN sans ACK vers 80", "192.168.0.1", 80, 1), ("Scan", "192.168.0.9", None, 2),
+    }
+    with pytest.raises(ValueError):
+        compile_rules([{"name": "Ports", "ports": ["70000"]}])
+    with pytest.raises(ValueError):
+        compile_rules([{"name": "Clé inconnue", "port": 22}])
+
+# Flux : fermeture par FIN des deux côtés, expiration après inactivité et nombre maximal de flux ouverts
+def test_flows(monkeypatch):
+    aggregates = new_aggregates()
+    update_flows(aggregates, tcp_line("10:00:00.000000", "10.0.0.1.40000", "10.0.0.2.80", "S"))
+    update_flows(aggregates, tcp_line("10:00:00.100000", "10.0.0.2.80", "10.0.0.1.40000", "S."))
+    update_flows(aggregates, tcp_line("10:00:01.000000", "10.0.0.1.40000", "10.0.0.2.80", "F.", 100))
+    update_flows(aggregates, tcp_line("10:00:01.100000", "10.0.0.2.80", "10.0.0.1.40000", "F."))
+    update_flows(aggregates, tcp_line("10:00:01.200000", "10.0.0.3.40000", "10.0.0.2.22", "S"))
+    assert len(aggregates["closing_flows"]) == 1 and len(aggregates["flows"]) == 1
+    update_flows(aggregates, tcp_line("10:00:10.000000", "10.0.0.4.40000", "10.0.0.2.22", "S"))  # Après flow_closing_timeout
+    closed, = aggregates["finished_flows"]
+    assert (closed["source"], closed["packets"], closed["bytes"], flow_state(closed)) == ("10.0.0.1.40000", 4, 100, "fermé")
+    update_flows(aggregates, tcp_line("10:02:05.000000", "10.0.0.5.40000", "10.0.0.2.22", "S"))  # Après flow_idle_timeout
+    assert [flow["source"] for flow in aggregates["finished_flows"]] == ["10.0.0.1.40000", "10.0.0.3.40000"]
+
+    monkeypatch.setattr(SAE105, "max_flows", 2)
+    for host in range(6, 9):  # Les flux de 10.0.0.4 à 10.0.0.6, les moins récemment actifs, sont terminés
+        update_flows(aggregates, tcp_line("10:02:05.100000", f"10.0.0.{host}.40000", "10.0.0.2.22", "S"))
+    assert list(aggregates["flows"]) == [("10.0.0.2.22", "10.0.0.7.40000"), ("10.0.0.2.22", "10.0.0.8.40000")]
+    assert aggregates["flow_count"] == 5
+
+# Analyse parallèle : mêmes sorties et mêmes agrégats que l'analyse sur un seul processus
+def test_parallel_matches_serial(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with open("dump.txt", "w", encoding="utf8") as dump_file:
+        for number in range(2000):
+            port = (22, 80, 443, 53, 8080)[number % 5]
+            dump_file.write(f"10:{number // 60 % 60:02d}:{number % 60:02d}.{number:06d} IP 10.0.{number % 7}.{number % 11}.{40000 + number % 13}"
+                            f" > 192.168.{number % 3}.1.{port}: Flags [{'S' if number % 4 else 'P.'}], length {number % 1500}\n")
+            if number % 100 == 0:
+                dump_file.write("10:00:00.000000 ARP, Request who-has 10.0.0.1 tell 10.0.0.2, length 28\n")
+    results = {}
+    for mode in ("serial", "parallel"):
+        outputs = (f"{mode}.csv", f"{mode}.sqlite", f"{mode}_colonnes", f"{mode}_flux.csv")
+        if mode == "serial":
+            aggregates = analyse_dump("dump.txt", *outputs)
+        else:
+            aggregates = analyse_dump_parallel("dump.txt", *outputs, workers=2)
+        with open(outputs[0], encoding="utf8") as csv_file:
+            csv_text = csv_file.read()
+        connection = sqlite3.connect(outputs[1])
+        index_rows = connection.execute("SELECT * FROM packets ORDER BY id").fetchall()
+        connection.close()
+        results[mode] = (csv_text, index_rows, aggregates["ip_counter"].most_common(), aggregates["port_counter"].most_common(),
+                         aggregates["rule_hits"], {key: alert["count"] for key, alert in aggregates["alerts"].items()},
+                         list(aggregates["traffic_per_second"]["packets"]))
+    assert results["parallel"] == results["serial"]
+    assert len(results["serial"][1]) == 2000
+
+# API : les paramètres invalides donnent une erreur 400 avec un message JSON
+def test_api_bad_requests():
+    aggregates = new_aggregates()
+    for number in range(50):
+        record = tcp_line(f"10:00:{number:02d}.000000", f"10.0.0.{number}.40000", "192.168.0.1.443", "S", number)
+        detect_suspicious_activity(aggregates, record)
+        update_flows(aggregates, record)
+        update_counters(aggregates, record)
+    publish_api_data(aggregates)
+    client = SAE105.app.test_client()
+    assert client.get("/api/ips?per_page=10").get_json()["total"] == 51  # 50 sources et une destination
+    for query in ("/api/ips?page=0", "/api/ips?per_page=abc", "/api/ips?sort=port", "/api/ips?order=up", "/api/ips?inconnu=1",
+                  "/api/ips?ip=10.0.0.300", "/api/ports?port=70000", "/api/subnets?prefix=13", "/api/time_series?resolution=5",
+                  "/api/time_series?start=25h"):
+        response = client.get(query)
+        assert response.status_code == 400, query
+        assert "error" in response.get_json()
+    assert client.get("/api/inconnue").status_code == 404
+    assert client.get("/charts/top_ips.png?port_filter=abc").status_code == 400
@@ -0,0 +1,94 @@
+# Tests de la lecture des captures pcap et pcapng (python -m pytest)
+import gzip
+import struct
+
+from pcap_reader import capture_format, read_packets, split_capture, ipv4_text
+
+# Petite capture : trames Ethernet construites octet par octet
+source = bytes([10, 0, 0, 1])
+destination = bytes([192, 168, 1, 20])
+
+def ipv4_packet(protocol, transport, options=b""):
+    header_length = 20 + len(options)
+    return struct.pack("!BBHHHBBH4s4s", 0x40 | header_length // 4, 0, header_length + len(transport), 0, 0, 64,
+                       protocol, 0, source, destination) + options + transport
+
+def tcp_segment(src_port, dst_port, flags, payload):
+    return struct.pack("!HHIIBBHHH", src_port, dst_port, 1, 0, 5 << 4, flags, 502, 0, 0) + payload
+
+def udp_datagram(src_port, dst_port, payload):
+    return struct.pack("!HHHH", src_port, dst_port, 8 + len(payload), 0) + payload
+
+def ethernet_frame(ethertype, packet):
+    return b"\x00\x11\x22\x33\x44\x55" + b"\x66\x77\x88\x99\xaa\xbb" + struct.pack("!H", ethertype) + packet
+
+ipv6_source = bytes.fromhex("fe800000000000000000000000000001")
+ipv6_destination = bytes.fromhex("ff020000000000000000000000010002")
+frames = [
+    ethernet_frame(0x0800, ipv4_packet(6, tcp_segment(40000, 443, 0x18, b"x" * 36))),  # P.
+    ethernet_frame(0x0800, ipv4_packet(17, udp_datagram(5353, 53, b"y" * 12), options=b"\x01" * 4)),  # En-tête IP de 24 octets
+    ethernet_frame(0x8100, struct.pack("!HH", 10, 0x0800) + ipv4_packet(6, tcp_segment(22, 50019, 0x02, b""))),  # VLAN, S
+    ethernet_frame(0x86dd, struct.pack("!IHBB16s16s", 6 << 28, 8 + 100, 17, 64, ipv6_source, ipv6_destination)
+                   + udp_datagram(546, 547, b"z" * 100)),
+    ethernet_frame(0x0806, b"\x00" * 28),  # ARP : pas de paquet IP
+]
+expected = [
+    (4, "10.0.0.1", 40000, "192.168.1.20", 443, 6, "P.", 36),
+    (4, "10.0.0.1", 5353, "192.168.1.20", 53, 17, None, 12),
+    (4, "10.0.0.1", 22, "192.168.1.20", 50019, 6, "S", 0),
+    (6, "fe80::1", 546, "ff02::1:2", 547, 17, None, 100),
+    None,
+]
+
+def pcap_bytes():
+    data = struct.pack("<IHHiIII", 0xa1b2c3d4, 2, 4, 0, 0, 65535, 1)
+    for number, frame in enumerate(frames):
+        data += struct.pack("<IIII", 1700000000 + number, 250000, len(frame), len(frame)) + frame
+    return data
+
+def pcapng_block(block_type, body):
+    body += b"\x00" * (-len(body) % 4)
+    return struct.pack("<II", block_type, len(body) + 12) + body + struct.pack("<I", len(body) + 12)
+
+def pcapng_bytes():
+    data = pcapng_block(0x0a0d0d0a, struct.pack("<IHHq", 0x1a2b3c4d, 1, 0, -1))
+    # Interface en nanosecondes (option if_tsresol = 9)
+    data += pcapng_block(1, struct.pack("<HHI", 1, 0, 65535) + struct.pack("<HHB3x", 9, 1, 9) + struct.pack("<HH", 0, 0))
+    for number, frame in enumerate(frames):
+        ticks = (1700000000 + number) * 1000000000 + 250000000
+        data += pcapng_block(6, struct.pack("<IIIII", 0, ticks >> 32, ticks & 0xffffffff, len(frame), len(frame)) + frame)
+    return data
+
+def decoded(path, *selection):
+    packets = []
+    for seconds, microseconds, captured, packet in read_packets(path, *selection):
+        if packet is not None and packet[0] == 4:
+            packet = (4, ipv4_text(packet[1]), packet[2], ipv4_text(packet[3]), *packet[4:])
+        packets.append((seconds, microseconds, packet))
+    return packets
+
+def test_read_packets(tmp_path):
+    for name, data, file_format in (("capture.pcap", pcap_bytes(), "pcap"), ("capture.pcapng", pcapng_bytes(), "pcapng")):
+        path = tmp_path / name
+        path.write_bytes(data)
+        assert capture_format(str(path)) == (file_format, False)
+        assert decoded(str(path)) == [(1700000000 + number, 250000, packet) for number, packet in enumerate(expected)]
+
+def test_read_compressed_and_split_capture(tmp_path):
+    for name, data in (("capture.pcap", pcap_bytes()), ("capture.pcapng", pcapng_bytes())):
+        path = tmp_path / name
+        path.write_bytes(data)
+        compressed = tmp_path / (name + ".gz")
+        compressed.write_bytes(gzip.compress(data))
+        assert capture_format(str(compressed))[1]
+        assert decoded(str(compressed)) == decoded(str(path))
+        # Les plages de l'analyse parallèle couvrent chaque paquet une seule fois
+        ranges = split_capture(str(path), 3)
+        assert len(ranges) == 3
+        assert [packet for start, end, state in ranges for packet in decoded(str(path), start, end, state)] == decoded(str(path))
+
+# Capture interrompue : l'enregistrement incomplet de la fin est ignoré
+def test_read_truncated_capture(tmp_path):
+    path = tmp_path / "capture.pcap"
+    path.write_bytes(pcap_bytes()[:-10])
+    assert [packet for *_, packet in decoded(str(path))] == expected[:-1]
@@ -0,0 +1,54 @@
+# Tests des structures approximatives (python -m pytest)
+from collections import Counter
+import random
+
+from sketches import SpaceSaving, HyperLogLog
+
+# Flux déséquilibré : quelques clés très fréquentes et une longue traîne de clés rares
+def skewed_stream(length, keys, seed):
+    generator = random.Random(seed)
+    weights = [1 / (rank + 1) ** 1.2 for rank in range(keys)]
+    return generator.choices(range(keys), weights=weights, k=length)
+
+def summarize(stream, capacity):
+    summary = SpaceSaving(capacity)
+    for key in stream:
+        summary.add(key)
+    return summary
+
+def test_space_saving_overestimates():
+    stream = skewed_stream(20000, 2000, seed=1)
+    exact = Counter(stream)
+    summary = summarize(stream, 50)
+    for key, count in summary.items():
+        assert exact[key] <= count <= exact[key] + summary.errors[key]
+
+# Fusion de résumés pleins (trois processus de l'analyse parallèle) : aucun compteur sous la valeur exacte
+def test_space_saving_merge_overestimates():
+    stream = skewed_stream(30000, 2000, seed=2)
+    exact = Counter(stream)
+    for capacity in (50, 200):
+        merged = summarize(stream[:10000], capacity)
+        merged.update(summarize(stream[10000:20000], capacity))
+        merged.update(summarize(stream[20000:], capacity))
+        assert merged.total == len(stream)
+        assert len(merged) == capacity
+        for key, count in merged.items():
+            assert exact[key] <= count <= exact[key] + merged.errors[key]
+        # Les clés les plus fréquentes sont toujours suivies
+        assert {key for key, _ in exact.most_common(5)} <= set(merged.counts)
+
+def test_space_saving_merge_not_full_is_exact():
+    merged = summarize([1, 1, 2], 10)
+    merged.update(summarize([2, 3], 10))
+    assert dict(merged.items()) == {1: 2, 2: 2, 3: 1}
+    assert set(merged.errors.values()) == {0}
+
+def test_hyperloglog_merge():
+    first = HyperLogLog(12)
+    second = HyperLogLog(12)
+    for value in range(5000):
+        first.add(value)
+        second.add(value + 2500)
+    first.update(second)
+    assert abs(first.count() - 7500) <= 7500 * 4 * first.relative_error()
@@ -1,27 +1,21 @@
-import re
+from contextlib import closing
+from ics_parser import iter_events, extract_fields
 
 def parse_ics_to_csv(file_path):
     """
     Lis un fichier ICS contenant un événement et le convertit en pseudo-CSV.
     """
 
-    # Lire le fichier ICS et charger son contenu dans une variable
-    with open(file_path, 'r', encoding='utf-8') as file:
-        content = file.read()
-
-    # Définir une expression régulière pour capturer un bloc d'événement unique
-    # Les événements sont délimités par les balises BEGIN:VEVENT et END:VEVENT
-    event_pattern = re.compile(r'BEGIN:VEVENT(.*?)END:VEVENT', re.DOTALL)
-    event_match = event_pattern.search(content)
+    # Lire le premier événement du fichier ICS (la lecture s'arrête à la fin de cet événement)
+    # closing ferme le générateur, et donc le fichier, sans attendre la fin de la lecture
+    with closing(iter_events(file_path)) as events:
+        event = next(events, None)
 
     # Vérifier si un événement est trouvé dans le fichier
-    if not event_match:
+    if event is None:
         # Si aucun événement n'est trouvé, lever une exception
         raise ValueError("Aucun événement trouvé dans le fichier ICS.")
 
-    # Extraire le contenu de l'événement
-    event = event_match.group(1)
-
     # Initialiser un dictionnaire pour stocker les données extraites
     csv_data = {
         'UID': None,          # Identifiant unique de l'événement
@@ -32,24 +26,8 @@ def parse_ics_to_csv(file_path):
         'LOCATION': None,     # Lieu où l'événement se déroule
     }
 
-    # Définir des expressions régulières pour extraire des champs spécifiques
-    patterns = {
-        'UID': r'UID:(\S+)',                       # Identifiant unique
-        'DTSTART': r'DTSTART:(\d{8}T\d{6}Z)',     # Date et heure de début au format UTC
-        'DTEND': r'DTEND:(\d{8}T\d{6}Z)',         # Date et heure de fin au format UTC
-        'SUMMARY': r'SUMMARY:(.+)',               # Résumé de l'événement
-        'LOCATION': r'LOCATION:(.+)',             # Lieu de l'événement
-        'DESCRIPTION': r'DESCRIPTION:(.+)'        # Description détaillée (souvent multiligne)
-    }
-
-    # Dictionnaire temporaire pour stocker les données extraites
-    extracted_data = {}
-    for key, pattern in patterns.items():
-        # Rechercher chaque champ dans le bloc d'événement
-        match = re.search(pattern, event)
-        if match:
-            # Si une correspondance est trouvée, la nettoyer et la stocker
-            extracted_data[key] = match.group(1).strip()
+    # Extraire les champs utiles de l'événement (lignes repliées déjà recollées)
+    extracted_data = extract_fields(event)
 
     # Calculer la durée (DTEND - DTSTART)
     if 'DTSTART' in extracted_data and 'DTEND' in extracted_data:
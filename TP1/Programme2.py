@@ -1,104 +1,138 @@
-import re
-from datetime import datetime
+import os
+from ics_parser import iter_events, extract_fields, parse_datetime
+
+# Liste des en-têtes pour les colonnes pseudo-CSV
+csv_headers = ['UID', 'DATE', 'HEURE', 'DUREE', 'MODALITE', 'SUMMARY', 'LOCATION']
+
+
+def event_to_csv_line(event):
+    """
+    Convertit un événement (propriétés lues par iter_events) en ligne pseudo-CSV, sans fin de ligne.
+    """
+    # Initialiser un dictionnaire avec des valeurs par défaut "vide" pour chaque colonne
+    csv_data = {header: "vide" for header in csv_headers}
+
+    # Extraire les données importantes de l'événement (lignes repliées déjà recollées)
+    extracted_data = extract_fields(event)
+    dtstart = parse_datetime(extracted_data.get('DTSTART'))  # Convertir DTSTART en objet datetime
+    dtend = parse_datetime(extracted_data.get('DTEND'))  # Convertir DTEND en objet datetime
+
+    # Calculer la durée de l'événement si DTSTART et DTEND sont disponibles
+    if dtstart and dtend:
+        duration = dtend - dtstart  # Calculer la différence entre début et fin
+
+        # Extraire les heures et minutes de la durée
+        hours, remainder = divmod(duration.seconds, 3600)
+        minutes = remainder // 60
+        csv_data['DUREE'] = f"{hours:02}:{minutes:02}"  # Formater la durée en HH:MM
+
+    # Mapper les données extraites aux colonnes pseudo-CSV
+    csv_data['UID'] = extracted_data.get('UID', 'vide')  # Identifiant unique
+
+    if dtstart:
+        # Si DTSTART est disponible, extraire la date et l'heure
+        csv_data['DATE'] = dtstart.strftime('%d-%m-%Y')  # Formater la date en JJ-MM-AAAA
+        csv_data['HEURE'] = dtstart.strftime('%H:%M')  # Formater l'heure en HH:MM
+
+    # La modalité est supposée être le premier mot du champ SUMMARY
+    csv_data['MODALITE'] = extracted_data.get('SUMMARY', 'vide').split(' ')[0] if 'SUMMARY' in extracted_data else 'vide'
+    csv_data['SUMMARY'] = extracted_data.get('SUMMARY', 'vide')  # Résumé complet
+    csv_data['LOCATION'] = extracted_data.get('LOCATION', 'vide')  # Lieu
+
+    # Construire une ligne pseudo-CSV avec les données formatées
+    csv_line = (
+        f"{csv_data['UID']};{csv_data['DATE']};{csv_data['HEURE']};{csv_data['DUREE']};"
+        f"{csv_data['MODALITE']};{csv_data['SUMMARY']};{csv_data['LOCATION']};"
+    )
+
+    return csv_line
+
+
+def csv_key(csv_line):
+    """
+    Identifiant d'une ligne pseudo-CSV : son UID (entre guillemets dans les fichiers passés par un tableur),
+    ou la ligne complète pour un événement sans UID.
+    """
+    uid = csv_line.split(';', 1)[0].strip('"')
+    return csv_line if uid == 'vide' else uid
+
+
+def read_csv_index(output_csv):
+    """
+    Lit le fichier CSV existant dans un index UID -> ligne (sans fin de ligne), voir csv_key.
+    Les lignes en double (anciens ajouts répétés) ne sont pas indexées : elles disparaîtront à la réécriture.
+    Retourne l'index et le nombre de lignes du fichier.
+    """
+    csv_index = {}
+    line_count = 0
+    try:
+        with open(output_csv, 'r', encoding='utf-8') as file:
+            for line in file:
+                line = line.rstrip('\r\n')
+                if not line:
+                    continue
+                line_count += 1
+                csv_index.setdefault(csv_key(line), line)
+    except FileNotFoundError:
+        pass
+    return csv_index, line_count
+
 
 def parse_ics_to_csv(file_path, output_csv):
     """
-    Lit un fichier ICS contenant plusieurs événements et les convertit en pseudo-CSV.
-    Ajoute les lignes pseudo-CSV à la fin du fichier CSV existant.
+    Lit un fichier ICS contenant plusieurs événements et synchronise le fichier CSV avec ses événements.
+    Chaque événement est retrouvé dans le CSV par son UID : seules les lignes nouvelles, modifiées ou
+    supprimées changent, et relancer le programme sur le même export ne modifie plus le fichier.
+    Le fichier est réécrit à côté puis renommé : une interruption ne laisse jamais un CSV incomplet.
+    Retourne le nombre de lignes ajoutées, modifiées, supprimées et inchangées.
     """
-    # Lire le contenu du fichier ICS
-    with open(file_path, 'r', encoding='utf-8') as file:
-        content = file.read()
+    # Index des lignes déjà présentes dans le CSV
+    csv_index, line_count = read_csv_index(output_csv)
 
-    # Expression régulière pour capturer tous les blocs d'événements dans le fichier
-    event_pattern = re.compile(r'BEGIN:VEVENT(.*?)END:VEVENT', re.DOTALL)
-    events = event_pattern.findall(content)  # Trouve tous les événements dans le fichier
+    # Lignes du nouveau fichier, dans l'ordre de l'export
+    csv_lines = []
+    counts = {'ajoutées': 0, 'modifiées': 0, 'supprimées': 0, 'inchangées': 0}
+
+    # Parcourir les événements au fil de la lecture du fichier ICS
+    for event in iter_events(file_path):
+        csv_line = event_to_csv_line(event)
+        previous_line = csv_index.pop(csv_key(csv_line), None)
+
+        # SEQUENCE et LAST-MODIFIED ne suffisent pas : ADE leur donne la même valeur pour tous les
+        # événements d'un export. On compare donc la ligne produite à celle du fichier.
+        if previous_line is None:
+            counts['ajoutées'] += 1
+        elif previous_line != csv_line:
+            counts['modifiées'] += 1
+        else:
+            counts['inchangées'] += 1
+        csv_lines.append(csv_line)
 
-    if not events:
+    if not csv_lines:
         # Si aucun événement n'est trouvé, on lève une erreur
         raise ValueError("Aucun événement trouvé dans le fichier ICS.")
 
-    # Liste pour stocker les lignes pseudo-CSV de tous les événements
-    csv_lines = []
+    # Les UID restants ne sont plus dans l'export ; les doublons sont aussi supprimés
+    counts['supprimées'] = line_count - counts['modifiées'] - counts['inchangées']
 
-    # Liste des en-têtes pour les colonnes pseudo-CSV
-    csv_headers = ['UID', 'DATE', 'HEURE', 'DUREE', 'MODALITE', 'SUMMARY', 'LOCATION']
-
-    # Parcourir chaque événement extrait
-    for event in events:
-        # Initialiser un dictionnaire avec des valeurs par défaut "vide" pour chaque colonne
-        csv_data = {header: "vide" for header in csv_headers}
-
-        # Définir les expressions régulières pour extraire les données importantes
-        patterns = {
-            'UID': r'UID:(\S+)',  # Correspond à la ligne contenant l'identifiant unique de l'événement
-            'DTSTART': r'DTSTART:(\d{8}T\d{6}Z)',  # Date et heure de début
-            'DTEND': r'DTEND:(\d{8}T\d{6}Z)',  # Date et heure de fin
-            'SUMMARY': r'SUMMARY:(.+)',  # Résumé de l'événement
-            'LOCATION': r'LOCATION:(.+)',  # Lieu de l'événement
-            'DESCRIPTION': r'DESCRIPTION:(.+)'  # Description contenant des détails supplémentaires
-        }
-
-        # Extraire les données de l'événement en utilisant les expressions régulières
-        extracted_data = {}
-        for key, pattern in patterns.items():
-            match = re.search(pattern, event)
-            if match:
-                # Si une correspondance est trouvée, l'ajouter au dictionnaire des données extraites
-                extracted_data[key] = match.group(1).strip()
-
-        # Calculer la durée de l'événement si DTSTART et DTEND sont disponibles
-        if 'DTSTART' in extracted_data and 'DTEND' in extracted_data:
-            dtstart = datetime.strptime(extracted_data['DTSTART'], '%Y%m%dT%H%M%SZ')  # Convertir DTSTART en objet datetime
-            dtend = datetime.strptime(extracted_data['DTEND'], '%Y%m%dT%H%M%SZ')  # Convertir DTEND en objet datetime
-            duration = dtend - dtstart  # Calculer la différence entre début et fin
-
-            # Extraire les heures et minutes de la durée
-            hours, remainder = divmod(duration.seconds, 3600)
-            minutes = remainder // 60
-            csv_data['DUREE'] = f"{hours:02}:{minutes:02}"  # Formater la durée en HH:MM
-
-        # Mapper les données extraites aux colonnes pseudo-CSV
-        csv_data['UID'] = extracted_data.get('UID', 'vide')  # Identifiant unique
-
-        if 'DTSTART' in extracted_data:
-            # Si DTSTART est disponible, extraire la date et l'heure
-            dtstart = datetime.strptime(extracted_data['DTSTART'], '%Y%m%dT%H%M%SZ')
-            csv_data['DATE'] = dtstart.strftime('%d-%m-%Y')  # Formater la date en JJ-MM-AAAA
-            csv_data['HEURE'] = dtstart.strftime('%H:%M')  # Formater l'heure en HH:MM
-
-        # La modalité est supposée être le premier mot du champ SUMMARY
-        csv_data['MODALITE'] = extracted_data.get('SUMMARY', 'vide').split(' ')[0] if 'SUMMARY' in extracted_data else 'vide'
-        csv_data['SUMMARY'] = extracted_data.get('SUMMARY', 'vide')  # Résumé complet
-        csv_data['LOCATION'] = extracted_data.get('LOCATION', 'vide')  # Lieu
-
-        # Extraire les informations sur les professeurs et les groupes à partir de DESCRIPTION
-        description = extracted_data.get('DESCRIPTION', '')
-        description_parts = description.split('\n')  # Diviser la description par ligne
-
-        # Construire une ligne pseudo-CSV avec les données formatées
-        csv_line = (
-            f"{csv_data['UID']};{csv_data['DATE']};{csv_data['HEURE']};{csv_data['DUREE']};"
-            f"{csv_data['MODALITE']};{csv_data['SUMMARY']};{csv_data['LOCATION']};"
-        )
-
-        # Ajouter la ligne formatée à la liste des résultats
-        csv_lines.append(csv_line)
+    # Réécrire le fichier CSV seulement s'il change
+    if counts['ajoutées'] or counts['modifiées'] or counts['supprimées']:
+        temporary_csv = output_csv + '.tmp'
+        with open(temporary_csv, 'w', encoding='utf-8') as file:
+            for line in csv_lines:
+                file.write(line + '\n')
+        os.replace(temporary_csv, output_csv)
 
-    # Ajouter les lignes au fichier CSV
-    with open(output_csv, 'a', encoding='utf-8') as file:
-        for line in csv_lines:
-            file.write(line + '\n')
+    return counts
 
-    return csv_lines  # Retourner toutes les lignes pseudo-CSV
 
 # Exemple d'utilisation
 file_path = 'ADE_RT1_Septembre2023_Decembre2023.ics'  # Remplacez par le chemin de votre fichier ICS
 output_csv = 'ADE_RT1_Septembre2023_Decembre2023.csv'  # Fichier CSV de sortie
 
 try:
-    pseudo_csv_lines = parse_ics_to_csv(file_path, output_csv)
-    print("Les données ont été ajoutées avec succès au fichier CSV.")
+    counts = parse_ics_to_csv(file_path, output_csv)
+    print("Le fichier CSV est synchronisé :", ", ".join(f"{count} lignes {state}" for state, count in counts.items()))
 except Exception as e:
     # Gérer les erreurs et afficher un message approprié
     print("Erreur:", e)
@@ -1,13 +1,11 @@
 import matplotlib.pyplot as plt
-import datetime
-from icalendar import Calendar
+from ics_parser import load_events
 
 # Chargement du fichier ICS
 # Chemin du fichier ICS contenant les événements. Vous pourriez rendre ce chemin configurable.
 file_path = 'ADE_RT1_Septembre2023_Decembre2023.ics'
-with open(file_path, 'r') as f:
-    # Lecture et parsing du fichier ICS
-    calendar = Calendar.from_ical(f.read())
+# Lecture des événements, depuis le cache enregistré à côté du fichier ICS s'il n'a pas changé
+events = load_events(file_path)
 
 # Extraction des événements pour identifier les séances de TP
 # Liste des mois concernés par l'analyse
@@ -15,24 +13,15 @@ months = ['Septembre', 'Octobre', 'Novembre', 'Décembre']
 # Initialisation d'un dictionnaire pour compter les séances par mois
 session_counts = {month: 0 for month in months}
 
-# Traduction des noms de mois de l'anglais au français
-month_translation = {
-    'September': 'Septembre',
-    'October': 'Octobre',
-    'November': 'Novembre',
-    'December': 'Décembre'
-}
+# Noms français des mois, par numéro de mois
+month_names = {9: 'Septembre', 10: 'Octobre', 11: 'Novembre', 12: 'Décembre'}
 
 # Inspection et comptage des événements
-for event in calendar.walk('VEVENT'):
-    summary = event.get('SUMMARY')
-    dtstart = event.get('DTSTART').dt
-
+for event in events:
     # Vérifier que c'est une séance de TP
-    if 'TP' in summary:  # Remplacer "A1" par des critères adaptés si nécessaire
-        # Récupération et traduction du nom du mois de l'événement
-        month_name = dtstart.strftime('%B')
-        month_name = month_translation.get(month_name, month_name)
+    if event.session_type == 'TP' and event.start is not None:  # Remplacer par des critères adaptés si nécessaire (event.groups...)
+        # Nom français du mois de l'événement
+        month_name = month_names.get(event.start.month)
         if month_name in session_counts:
             # Incrémentation du compteur pour le mois correspondant
             session_counts[month_name] += 1
@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+from ics_parser import load_events
+from event_index import build_index, merge_timelines, free_rooms, free_slots, conflicts
+
+# Les horaires de l'export ADE sont en UTC : les questions sont posées en heure de Saint-Étienne
+local_zone = ZoneInfo('Europe/Paris')
+
+
+def format_time(moment):
+    """
+    Formate une date et heure en heure locale (JJ-MM-AAAA HH:MM).
+    """
+    return moment.astimezone(local_zone).strftime('%d-%m-%Y %H:%M')
+
+
+# Chemin du fichier ICS
+file_path = 'ADE_RT1_Septembre2023_Decembre2023.ics'
+
+try:
+    # Étape 1 : Lecture des événements (depuis le cache si le fichier ICS n'a pas changé) et index par salle et par groupe
+    index = build_index(load_events(file_path))
+
+    # Étape 2 : Salles G_0xx libres le jeudi 12 octobre 2023 de 14:00 à 16:00
+    start = datetime(2023, 10, 12, 14, 0, tzinfo=local_zone)
+    end = datetime(2023, 10, 12, 16, 0, tzinfo=local_zone)
+    print(f"Salles G_0xx libres du {format_time(start)} au {format_time(end)} :", ", ".join(free_rooms(index, start, end, 'G_0')) or "aucune")
+
+    # Étape 3 : Créneaux libres d'au moins une heure en G_019 ce jour-là, entre 08:00 et 18:00
+    day_start = datetime(2023, 10, 12, 8, 0, tzinfo=local_zone)
+    day_end = datetime(2023, 10, 12, 18, 0, tzinfo=local_zone)
+    print("Créneaux libres en G_019 :")
+    for slot_start, slot_end in free_slots(index['rooms']['G_019'], day_start, day_end, timedelta(hours=1)):
+        print(f"  {format_time(slot_start)} - {format_time(slot_end)}")
+
+    # Étape 4 : Conflits du groupe TP B1, qui suit aussi les séances du TD B et de toute la promotion
+    timeline = merge_timelines(index['groups'][group] for group in ('RT1-TP B1', 'RT1-TD B', 'RT1-S1') if group in index['groups'])
+    group_conflicts = conflicts(timeline)
+    if group_conflicts:
+        print("Séances qui se chevauchent pour le groupe TP B1 :")
+        for first, second in group_conflicts:
+            print(f"  {first.summary} ({format_time(first.start)}) et {second.summary} ({format_time(second.start)})")
+    else:
+        print("Aucune séance qui se chevauche pour le groupe TP B1.")
+
+except Exception as e:
+    print("Erreur :", e)
@@ -0,0 +1,159 @@
+from bisect import bisect_left, bisect_right
+from collections import defaultdict, namedtuple
+from datetime import timedelta
+
+# Séances d'une ressource (salle ou groupe), triées par début
+# - starts : débuts triés, pour les recherches par bisect
+# - events : Event dans le même ordre
+# - max_duration : durée de la plus longue séance ; une séance qui chevauche [début, fin[
+#   commence forcément après début - max_duration, ce qui borne la recherche vers le passé
+Timeline = namedtuple('Timeline', ['starts', 'events', 'max_duration'])
+
+
+def build_timeline(events):
+    """
+    Construit la frise d'une ressource à partir de ses séances.
+
+    Args:
+        events (iterable): Event de la ressource (les doublons et les séances sans horaire sont ignorés).
+
+    Returns:
+        Timeline: Séances triées par début.
+    """
+    events = sorted((event for event in dict.fromkeys(events) if event.start and event.end and event.end > event.start),
+                    key=lambda event: event.start)
+    return Timeline(
+        starts=[event.start for event in events],
+        events=events,
+        max_duration=max((event.end - event.start for event in events), default=timedelta(0)),
+    )
+
+
+def build_index(events):
+    """
+    Indexe les séances par salle et par groupe.
+
+    Une séance dans plusieurs salles (LOCATION "G_002,D_110,...") ou pour plusieurs groupes
+    figure dans la frise de chacun.
+
+    Args:
+        events (list): Liste d'Event (voir ics_parser.load_events).
+
+    Returns:
+        dict: {'rooms': {salle: Timeline}, 'groups': {groupe: Timeline}}.
+    """
+    rooms = defaultdict(list)
+    groups = defaultdict(list)
+    for event in events:
+        for room in event.rooms:
+            rooms[room].append(event)
+        for group in event.groups:
+            groups[group].append(event)
+
+    return {
+        'rooms': {room: build_timeline(room_events) for room, room_events in rooms.items()},
+        'groups': {group: build_timeline(group_events) for group, group_events in groups.items()},
+    }
+
+
+def merge_timelines(timelines):
+    """
+    Réunit plusieurs frises, par exemple celles d'un groupe de TP, de son groupe de TD et de sa promotion.
+
+    Args:
+        timelines (iterable): Timeline à réunir.
+
+    Returns:
+        Timeline: Séances de toutes les frises, chacune une seule fois.
+    """
+    return build_timeline(event for timeline in timelines for event in timeline.events)
+
+
+def overlapping(timeline, start, end):
+    """
+    Séances qui chevauchent l'intervalle [start, end[.
+
+    Deux recherches par bisect délimitent les séances commencées entre start - max_duration et end :
+    le coût est logarithmique en nombre de séances, plus le nombre de séances de cette fenêtre.
+
+    Args:
+        timeline (Timeline): Frise de la ressource.
+        start (datetime): Début de l'intervalle.
+        end (datetime): Fin de l'intervalle.
+
+    Returns:
+        list: Event qui chevauchent l'intervalle, triés par début.
+    """
+    first = bisect_right(timeline.starts, start - timeline.max_duration)
+    last = bisect_left(timeline.starts, end)
+    return [event for event in timeline.events[first:last] if event.end > start]
+
+
+def is_free(timeline, start, end):
+    """
+    Indique si la ressource n'a aucune séance pendant [start, end[.
+    """
+    return not overlapping(timeline, start, end)
+
+
+def free_rooms(index, start, end, prefix=''):
+    """
+    Salles libres pendant [start, end[.
+
+    Args:
+        index (dict): Index renvoyé par build_index.
+        start (datetime): Début du créneau.
+        end (datetime): Fin du créneau.
+        prefix (str): Garde seulement les salles dont le nom commence ainsi (ex. 'G_0').
+
+    Returns:
+        list: Noms des salles libres, triés.
+    """
+    return sorted(room for room, timeline in index['rooms'].items()
+                  if room.startswith(prefix) and is_free(timeline, start, end))
+
+
+def free_slots(timeline, start, end, min_duration=timedelta(0)):
+    """
+    Créneaux libres de la ressource entre start et end.
+
+    Args:
+        timeline (Timeline): Frise de la ressource.
+        start (datetime): Début de la période étudiée.
+        end (datetime): Fin de la période étudiée.
+        min_duration (timedelta): Durée minimale d'un créneau libre.
+
+    Returns:
+        list: Couples (début, fin) des créneaux libres, dans l'ordre.
+    """
+    slots = []
+    free_from = start
+    for event in overlapping(timeline, start, end):
+        if event.start > free_from and event.start - free_from >= min_duration:
+            slots.append((free_from, event.start))
+        free_from = max(free_from, event.end)
+    if end > free_from and end - free_from >= min_duration:
+        slots.append((free_from, end))
+    return slots
+
+
+def conflicts(timeline):
+    """
+    Paires de séances qui se chevauchent dans une frise (conflits d'emploi du temps).
+
+    Les séances sont parcourues par début croissant en gardant celles encore en cours :
+    le coût est linéaire en nombre de séances, plus le nombre de conflits.
+
+    Args:
+        timeline (Timeline): Frise d'une ressource (ou réunion de frises, voir merge_timelines).
+
+    Returns:
+        list: Couples (séance, séance suivante qui la chevauche).
+    """
+    found = []
+    running = []  # Séances pas encore terminées au début de la séance courante
+    for event in timeline.events:
+        running = [other for other in running if other.end > event.start]
+        found.extend((other, event) for other in running)
+        running.append(event)
+    return found
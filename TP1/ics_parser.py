@@ -0,0 +1,342 @@
+from collections import namedtuple
+from datetime import datetime, timezone
+import hashlib
+from itertools import chain
+import os
+import pickle
+import re
+
+# Date et heure UTC au format ICS (AAAAMMJJTHHMMSSZ), seule forme utilisée par l'export ADE
+utc_datetime_pattern = re.compile(r'\d{8}T\d{6}Z')
+
+# Date et heure ICS, en UTC (suffixe Z) ou en heure locale
+datetime_pattern = re.compile(r'\d{8}T\d{6}Z?$')
+
+# Caractères échappés dans les valeurs texte (RFC 5545, 3.3.11)
+escape_pattern = re.compile(r'\\([\\;,Nn])')
+unescaped_characters = {'\\': '\\', ';': ';', ',': ',', 'N': '\n', 'n': '\n'}
+
+# Lignes de DESCRIPTION qui désignent un groupe d'étudiants (RT1-TP B1, RT2-S3, BUT RT 1A...)
+group_pattern = re.compile(r'RT\d-|BUT ')
+
+# Types de séance reconnus dans SUMMARY, par priorité : un DS en TP compte comme un TP
+session_types = ('TP', 'TD', 'CM', 'DS')
+
+# Cache des événements lus, enregistré à côté du fichier ICS (ADE_....ics -> ADE_....ics.events.pickle)
+cache_suffix = '.events.pickle'
+cache_version = 2  # À augmenter quand parse_event change : les caches existants sont alors ignorés (les champs d'Event sont vérifiés à part)
+hash_chunk_size = 1 << 20  # Taille des blocs lus pour l'empreinte du fichier
+
+# Erreurs possibles à la lecture d'un cache abîmé ou écrit par une ancienne version (clé absente, Event
+# avec d'autres champs, classe disparue...) : le calendrier est alors relu et le cache remplacé
+cache_errors = (OSError, pickle.UnpicklingError, EOFError, ValueError, KeyError, TypeError, AttributeError, ImportError)
+
+# Événement du calendrier, construit une seule fois puis partagé par tous les traitements
+# - start, end : datetime (avec fuseau UTC pour l'export ADE), None si absent
+# - module : premier mot de SUMMARY (R1.07, SAE1.01...)
+# - session_type : 'TP', 'TD', 'CM', 'DS' ou None
+# - groups, teachers, rooms : tuples de chaînes
+Event = namedtuple('Event', ['uid', 'start', 'end', 'summary', 'module', 'session_type', 'groups', 'teachers', 'rooms'])
+
+
+def split_property(line):
+    """
+    Sépare une ligne logique en nom, paramètres et valeur.
+
+    Le nom s'arrête au premier ':' ou ';'. Les paramètres (TZID=..., LANGUAGE=...) vont jusqu'au
+    premier ':' placé hors guillemets ; la valeur est le reste de la ligne, sans modification.
+
+    Args:
+        line (str): Ligne logique (dépliée).
+
+    Returns:
+        tuple: (nom en majuscules, paramètres, valeur), ou None si la ligne n'est pas une propriété.
+    """
+    colon = line.find(':')
+    if colon < 0:
+        return None
+    semicolon = line.find(';', 0, colon)
+    if semicolon < 0:
+        return line[:colon].upper(), '', line[colon + 1:]
+
+    # Un paramètre entre guillemets peut contenir ':' (ALTREP="http://...")
+    if '"' in line[semicolon:colon]:
+        quoted = False
+        for position in range(semicolon, len(line)):
+            character = line[position]
+            if character == '"':
+                quoted = not quoted
+            elif character == ':' and not quoted:
+                colon = position
+                break
+        else:
+            return None
+    return line[:semicolon].upper(), line[semicolon + 1:colon], line[colon + 1:]
+
+
+def iter_events(file_path):
+    """
+    Parcourt les événements (VEVENT) d'un fichier ICS un par un, en une seule lecture.
+
+    Le fichier est lu ligne par ligne : la mémoire utilisée dépend de la taille d'un événement,
+    pas de celle de l'export. Une ligne de plus de 75 octets est repliée : sa suite commence à la
+    ligne suivante par un espace ou une tabulation, retiré avant de recoller les morceaux (RFC 5545, 3.1).
+
+    Args:
+        file_path (str): Chemin vers le fichier ICS.
+
+    Yields:
+        dict: Propriétés de l'événement (nom -> valeur brute). Seule la première occurrence
+        d'une propriété est gardée, les paramètres et les composants imbriqués (VALARM) sont ignorés.
+    """
+    with open(file_path, 'r', encoding='utf-8') as file:
+        event = None  # Événement en cours de lecture
+        depth = 0     # Profondeur des composants imbriqués dans l'événement
+        current = ''  # Ligne logique en cours, complétée par ses lignes de continuation
+
+        # Une ligne vide ajoutée à la fin termine la dernière ligne logique
+        for line in chain(file, ('\n',)):
+            if line[0] in ' \t':
+                current += line[1:].rstrip('\r\n')
+                continue
+
+            if current:
+                # La ligne logique précédente est complète : séparation du nom et de la valeur
+                name, colon, value = current.partition(':')
+                if ';' in name:
+                    name, _, value = split_property(current) or ('', '', '')
+                elif not colon:
+                    name = ''  # Ligne sans ':' : ce n'est pas une propriété
+                name = name.upper()
+
+                if event is None:
+                    if name == 'BEGIN' and value.upper() == 'VEVENT':
+                        event = {}
+                elif name == 'BEGIN':
+                    depth += 1
+                elif name == 'END':
+                    if depth:
+                        depth -= 1
+                    else:
+                        yield event
+                        event = None
+                elif name and not depth and name not in event:
+                    event[name] = value
+
+            current = line.rstrip('\r\n')
+
+
+def extract_fields(event):
+    """
+    Extrait d'un événement les champs utilisés par les programmes du TP.
+
+    Les règles sont celles des anciennes expressions régulières : UID jusqu'au premier blanc,
+    DTSTART et DTEND seulement au format UTC, textes sans blancs aux extrémités.
+
+    Args:
+        event (dict): Événement renvoyé par iter_events.
+
+    Returns:
+        dict: Champs UID, DTSTART, DTEND, SUMMARY, LOCATION et DESCRIPTION présents dans l'événement.
+    """
+    extracted_data = {}
+
+    uid = event.get('UID', '').split()
+    if uid:
+        extracted_data['UID'] = uid[0]
+
+    for key in ('DTSTART', 'DTEND'):
+        match = utc_datetime_pattern.match(event.get(key, ''))
+        if match:
+            extracted_data[key] = match.group()
+
+    for key in ('SUMMARY', 'LOCATION', 'DESCRIPTION'):
+        if event.get(key):
+            extracted_data[key] = event[key].strip()
+
+    return extracted_data
+
+
+def unescape_text(value):
+    """
+    Remplace les séquences d'échappement d'une valeur texte ICS (\\n, \\, et \\;).
+
+    Args:
+        value (str): Valeur brute.
+
+    Returns:
+        str: Valeur sans échappement.
+    """
+    if '\\' not in value:
+        return value
+    return escape_pattern.sub(lambda match: unescaped_characters[match.group(1)], value)
+
+
+def parse_datetime(value):
+    """
+    Convertit une date et heure ICS (AAAAMMJJTHHMMSS, suivie de Z en UTC) en datetime.
+
+    Le découpage direct de la chaîne est bien plus rapide que datetime.strptime.
+
+    Args:
+        value (str): Valeur brute de DTSTART ou DTEND.
+
+    Returns:
+        datetime: Date et heure (avec le fuseau UTC si la valeur finit par Z), ou None si le format n'est pas reconnu.
+    """
+    if not value or not datetime_pattern.match(value):
+        return None
+    return datetime(int(value[0:4]), int(value[4:6]), int(value[6:8]),
+                    int(value[9:11]), int(value[11:13]), int(value[13:15]),
+                    tzinfo=timezone.utc if value.endswith('Z') else None)
+
+
+def parse_event(event):
+    """
+    Construit un Event à partir des propriétés brutes renvoyées par iter_events.
+
+    DESCRIPTION contient une ligne par ressource ADE : les groupes (RT1-TP B1...) et les
+    enseignants (NOM PRÉNOM en majuscules) sont gardés, le matériel et la date d'export ignorés.
+    LOCATION peut citer plusieurs salles séparées par des virgules.
+
+    Args:
+        event (dict): Propriétés de l'événement.
+
+    Returns:
+        Event: Événement typé.
+    """
+    summary = unescape_text(event.get('SUMMARY', '')).strip()
+    words = summary.replace('(', ' ').replace(')', ' ').split()
+
+    groups = []
+    teachers = []
+    for line in unescape_text(event.get('DESCRIPTION', '')).split('\n'):
+        line = line.strip()
+        if group_pattern.match(line):
+            groups.append(line)
+        elif line.isupper() and not line.startswith('('):
+            teachers.append(line)
+
+    location = unescape_text(event.get('LOCATION', ''))
+    rooms = tuple(room.strip() for room in location.split(',') if room.strip())
+
+    return Event(
+        uid=event.get('UID', '').strip(),
+        start=parse_datetime(event.get('DTSTART')),
+        end=parse_datetime(event.get('DTEND')),
+        summary=summary,
+        module=words[0] if words else '',
+        session_type=next((kind for kind in session_types if kind in words[1:]), None),
+        groups=tuple(groups),
+        teachers=tuple(teachers),
+        rooms=rooms,
+    )
+
+
+def file_digest(file_path):
+    """
+    Calcule l'empreinte SHA-256 du contenu d'un fichier.
+
+    Args:
+        file_path (str): Chemin vers le fichier.
+
+    Returns:
+        str: Empreinte en hexadécimal.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(hash_chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_cache(cache_file):
+    """
+    Lit l'en-tête du cache puis, à la demande, les événements enregistrés.
+
+    Un cache écrit par une autre version du module (autre cache_version ou autres champs d'Event)
+    est ignoré, comme un cache illisible.
+
+    Args:
+        cache_file: Fichier de cache ouvert en lecture binaire.
+
+    Returns:
+        dict: En-tête (version, champs d'Event, chemin, taille, date de modification, empreinte), ou None s'il est illisible.
+    """
+    try:
+        header = pickle.load(cache_file)
+    except cache_errors:
+        return None
+    if not isinstance(header, dict) or header.get('version') != cache_version or header.get('fields') != Event._fields:
+        return None
+    return header
+
+
+def write_cache(file_path, header, events):
+    """
+    Enregistre les événements d'un fichier ICS dans son cache.
+
+    L'en-tête est écrit avant les événements : il se lit sans charger toute la liste.
+    Le fichier est écrit à côté puis renommé, un cache à moitié écrit n'est jamais lu.
+    Un dossier en lecture seule n'empêche pas la lecture du calendrier : le cache est alors ignoré.
+
+    Args:
+        file_path (str): Chemin vers le fichier ICS.
+        header (dict): En-tête du cache.
+        events (list): Liste d'Event.
+    """
+    temporary_path = file_path + cache_suffix + '.tmp'
+    try:
+        with open(temporary_path, 'wb') as cache_file:
+            pickle.dump(header, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(events, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, file_path + cache_suffix)
+    except OSError:
+        pass
+
+
+def load_events(file_path, use_cache=True):
+    """
+    Lit tous les événements d'un fichier ICS sous forme d'Event.
+
+    Avec use_cache, les événements lus sont enregistrés à côté du fichier ICS (voir cache_suffix).
+    Le cache est réutilisé tant que le chemin, la taille et la date de modification du fichier
+    n'ont pas changé. Si seule la date a changé (fichier copié ou retéléchargé à l'identique),
+    l'empreinte du contenu décide. Sinon le fichier est relu et le cache remplacé.
+
+    Args:
+        file_path (str): Chemin vers le fichier ICS.
+        use_cache (bool): Utilise et met à jour le cache des événements.
+
+    Returns:
+        list: Liste d'Event, dans l'ordre du fichier.
+    """
+    if use_cache:
+        stat = os.stat(file_path)  # Avant la lecture : une modification pendant la lecture invalidera le cache
+        header = {'version': cache_version, 'fields': Event._fields, 'path': os.path.abspath(file_path),
+                  'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+        digest = None
+        try:
+            with open(file_path + cache_suffix, 'rb') as cache_file:
+                cached = read_cache(cache_file)
+                if cached is not None and cached['size'] == stat.st_size:
+                    same_file = cached['path'] == header['path'] and cached['mtime_ns'] == stat.st_mtime_ns
+                    if not same_file:
+                        digest = file_digest(file_path)
+                    if same_file or cached['sha256'] == digest:
+                        events = pickle.load(cache_file)
+                        if not isinstance(events, list) or not all(isinstance(event, Event) for event in events):
+                            raise TypeError("Cache des événements d'un autre format")
+                        if not same_file:
+                            write_cache(file_path, {**header, 'sha256': digest}, events)
+                        return events
+        except cache_errors:
+            pass
+
+    events = [parse_event(event) for event in iter_events(file_path)]
+    if not events:
+        raise ValueError("Aucun événement trouvé dans le fichier ICS.")
+
+    if use_cache:
+        write_cache(file_path, {**header, 'sha256': digest or file_digest(file_path)}, events)
+    return events
@@ -0,0 +1,45 @@
+# Tests de la synchronisation du CSV par Programme2 (python -m pytest)
+import importlib
+import os
+
+from test_ics_parser import calendar, write_calendar
+
+
+# Le module lance une synchronisation d'exemple à l'import : il est importé depuis un dossier vide
+def import_programme2(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return importlib.import_module('Programme2')
+
+
+def test_sync_is_idempotent(tmp_path, monkeypatch):
+    programme2 = import_programme2(tmp_path, monkeypatch)
+    path = write_calendar(tmp_path)
+    output_csv = str(tmp_path / 'calendrier.csv')
+    assert programme2.parse_ics_to_csv(path, output_csv) == {'ajoutées': 2, 'modifiées': 0, 'supprimées': 0, 'inchangées': 0}
+    with open(output_csv, encoding='utf-8') as file:
+        content = file.read()
+    assert content.splitlines()[0].startswith('ADE-1;12-10-2023;12:00;02:00;R1.07;R1.07 TP;G_019\\,G_020;')
+
+    # Deuxième passage : rien ne change, le fichier n'est pas réécrit
+    os.utime(output_csv, ns=(0, 0))
+    assert programme2.parse_ics_to_csv(path, output_csv) == {'ajoutées': 0, 'modifiées': 0, 'supprimées': 0, 'inchangées': 2}
+    assert os.stat(output_csv).st_mtime_ns == 0
+    with open(output_csv, encoding='utf-8') as file:
+        assert file.read() == content
+
+
+def test_sync_changes(tmp_path, monkeypatch):
+    programme2 = import_programme2(tmp_path, monkeypatch)
+    path = write_calendar(tmp_path)
+    output_csv = str(tmp_path / 'calendrier.csv')
+    programme2.parse_ics_to_csv(path, output_csv)
+    with open(output_csv, encoding='utf-8') as file:
+        first, second = file.read().splitlines()
+    # UID entre guillemets (passage par un tableur), ligne en double et événement disparu de l'export
+    with open(output_csv, 'w', encoding='utf-8') as file:
+        file.write('"ADE-1"' + first[len('ADE-1'):] + '\n' + second + '\n' + second + '\n' + 'ADE-3;vide;vide;vide;vide;vide;vide;\n')
+    changed = calendar.replace('SUMMARY:R1.07 TP', 'SUMMARY:R1.07 TD')
+    (tmp_path / 'calendrier.ics').write_text(changed, encoding='utf-8', newline='')
+    assert programme2.parse_ics_to_csv(path, output_csv) == {'ajoutées': 0, 'modifiées': 1, 'supprimées': 2, 'inchangées': 1}
+    with open(output_csv, encoding='utf-8') as file:
+        assert file.read().splitlines() == [first.replace('R1.07 TP', 'R1.07 TD'), second]
@@ -0,0 +1,48 @@
+# Tests de l'index des séances par salle et par groupe (python -m pytest)
+from datetime import datetime, timedelta, timezone
+
+from ics_parser import Event
+from event_index import build_index, merge_timelines, overlapping, free_rooms, free_slots, conflicts
+
+
+def at(hour, minute=0):
+    return datetime(2023, 10, 12, hour, minute, tzinfo=timezone.utc)
+
+
+def session(uid, start, end, rooms=(), groups=()):
+    return Event(uid, start, end, uid, None, None, tuple(groups), (), tuple(rooms))
+
+
+events = [
+    session('amphi', at(8), at(12), rooms=('G_001',), groups=('RT1-S1',)),  # Longue séance : borne max_duration
+    session('tp', at(13), at(15), rooms=('G_019', 'G_020'), groups=('RT1-TP B1',)),
+    session('td', at(14), at(16), rooms=('G_019',), groups=('RT1-TD B',)),
+    session('soir', at(16, 30), at(17), rooms=('G_020',), groups=('RT1-TP B1',)),
+    session('sans horaire', None, None, rooms=('G_019',)),
+]
+index = build_index(events + events[:1])  # Une séance en double n'apparaît qu'une fois
+
+
+def test_overlapping():
+    g_019 = index['rooms']['G_019']
+    assert [event.uid for event in g_019.events] == ['tp', 'td']
+    assert [event.uid for event in overlapping(g_019, at(14, 30), at(14, 45))] == ['tp', 'td']
+    assert overlapping(g_019, at(15), at(14)) == []
+    assert overlapping(g_019, at(16), at(18)) == []  # Fin exclue : la séance de 14:00 à 16:00 est terminée
+    # Commencée longtemps avant l'intervalle
+    assert [event.uid for event in overlapping(index['rooms']['G_001'], at(11, 59), at(13))] == ['amphi']
+
+
+def test_free_rooms_and_slots():
+    assert free_rooms(index, at(12), at(13), 'G_0') == ['G_001', 'G_019', 'G_020']
+    assert free_rooms(index, at(14), at(16), 'G_0') == ['G_001']
+    assert free_rooms(index, at(16), at(17), 'G_01') == ['G_019']
+    assert free_slots(index['rooms']['G_019'], at(8), at(18)) == [(at(8), at(13)), (at(16), at(18))]
+    assert free_slots(index['rooms']['G_020'], at(12), at(18), timedelta(minutes=90)) == [(at(15), at(16, 30))]
+
+
+def test_conflicts():
+    assert conflicts(index['groups']['RT1-TP B1']) == []
+    timeline = merge_timelines(index['groups'][group] for group in ('RT1-TP B1', 'RT1-TD B', 'RT1-S1'))
+    assert [event.uid for event in timeline.events] == ['amphi', 'tp', 'td', 'soir']
+    assert [(first.uid, second.uid) for first, second in conflicts(timeline)] == [('tp', 'td')]
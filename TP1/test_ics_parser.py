@@ -0,0 +1,97 @@
+# Tests de la lecture des fichiers ICS et de son cache (python -m pytest)
+from collections import namedtuple
+from contextlib import closing
+import os
+import pickle
+import shutil
+
+import ics_parser
+from ics_parser import iter_events, load_events, parse_event, write_cache, cache_suffix, cache_version, Event
+
+calendar = (
+    'BEGIN:VCALENDAR\r\n'
+    'BEGIN:VEVENT\r\n'
+    'UID:ADE-1\r\n'
+    'DTSTART:20231012T120000Z\r\n'
+    'DTEND:20231012T140000Z\r\n'
+    'SUMMARY:R1.07 TP\r\n'
+    'LOCATION:G_019\\,G_020\r\n'
+    'DESCRIPTION:\\n\\nRT1-TP B1\\nDUPONT JEAN\\n(Exporté le:10/01/20\r\n'
+    ' 24 06:32)\\n\r\n'
+    'BEGIN:VALARM\r\n'
+    'SUMMARY:Rappel\r\n'
+    'END:VALARM\r\n'
+    'END:VEVENT\r\n'
+    'BEGIN:VEVENT\r\n'
+    'UID:ADE-2\r\n'
+    'DTSTART;TZID="Europe/Paris":20231013T080000\r\n'
+    'SUMMARY:SAE1.05 (CM) sur une ligne repliée en\r\n'
+    '\t deux morceaux\r\n'
+    'END:VEVENT\r\n'
+    'END:VCALENDAR\r\n'
+)
+
+
+def write_calendar(tmp_path, name='calendrier.ics'):
+    path = tmp_path / name
+    path.write_text(calendar, encoding='utf-8', newline='')
+    return str(path)
+
+
+def test_iter_events_unfolds_lines(tmp_path):
+    first, second = iter_events(write_calendar(tmp_path))
+    assert first['DESCRIPTION'] == '\\n\\nRT1-TP B1\\nDUPONT JEAN\\n(Exporté le:10/01/2024 06:32)\\n'
+    assert first['SUMMARY'] == 'R1.07 TP'  # Celui de VALARM est ignoré
+    assert second['SUMMARY'] == 'SAE1.05 (CM) sur une ligne repliée en deux morceaux'
+    assert second['DTSTART'] == '20231013T080000'  # Paramètre TZID retiré
+
+
+def test_parse_event(tmp_path):
+    with closing(iter_events(write_calendar(tmp_path))) as events:
+        event = parse_event(next(events))
+    assert (event.uid, event.module, event.session_type) == ('ADE-1', 'R1.07', 'TP')
+    assert event.rooms == ('G_019', 'G_020')
+    assert (event.groups, event.teachers) == (('RT1-TP B1',), ('DUPONT JEAN',))
+    assert (event.end - event.start).total_seconds() == 7200
+
+
+def test_load_events_uses_cache(tmp_path):
+    path = write_calendar(tmp_path)
+    events = load_events(path)
+    assert os.path.exists(path + cache_suffix)
+    with open(path + cache_suffix, 'rb') as cache_file:
+        header = pickle.load(cache_file)
+    header['marker'] = True  # Relu tel quel tant que le fichier ICS n'a pas changé
+    write_cache(path, header, events[:1])
+    assert load_events(path) == events[:1]
+    assert load_events(path, use_cache=False) == events
+
+
+# Copie à l'identique (autre chemin, autre date) : l'empreinte du contenu décide
+def test_load_events_copied_file(tmp_path):
+    path = write_calendar(tmp_path)
+    events = load_events(path)
+    copy = str(tmp_path / 'copie.ics')
+    shutil.copy(path, copy)
+    shutil.copy(path + cache_suffix, copy + cache_suffix)
+    os.utime(copy, ns=(0, 0))
+    assert load_events(copy) == events
+
+
+# Cache d'une ancienne version : en-tête sans empreinte, Event avec d'autres champs, autre version
+def test_load_events_ignores_old_caches(tmp_path, monkeypatch):
+    path = write_calendar(tmp_path)
+    events = load_events(path, use_cache=False)
+    header = {'version': cache_version, 'fields': Event._fields, 'path': 'ailleurs', 'size': os.path.getsize(path), 'mtime_ns': 0}
+    write_cache(path, header, events)  # Sans 'sha256' : KeyError
+    assert load_events(path) == events
+
+    stat = os.stat(path)
+    with monkeypatch.context() as patch:
+        # Ancien Event : enregistré par référence à ics_parser.Event, relu avec le nouveau (TypeError)
+        patch.setattr(ics_parser, 'Event', namedtuple('Event', ['uid', 'start'], module='ics_parser'))
+        write_cache(path, {**header, 'path': os.path.abspath(path), 'mtime_ns': stat.st_mtime_ns}, [ics_parser.Event('ADE-1', None)])
+    assert load_events(path) == events
+
+    write_cache(path, {**header, 'version': cache_version - 1}, [])
+    assert load_events(path) == events